@@ -0,0 +1,119 @@
+import json
+import logging
+import re
+
+from langchain_core.runnables import RunnableConfig
+from langchain_core.messages import AIMessage
+
+from app.prompts.intent_classification_prompt import intent_classification_prompt
+from config import config
+
+logger = logging.getLogger(__name__)
+
+INTENTS = ("conversational", "retrieve", "action", "hybrid")
+
+# Messages that are clearly small talk and can be routed without calling a model
+CONVERSATIONAL_PATTERN = re.compile(
+    r"^\s*(hi|hello|hey|hiya|yo|thanks|thank you|thank you so much|thanks a lot|thx|ty|cheers|"
+    r"good (morning|afternoon|evening|night)|bye|goodbye|see you|have a (good|nice|great) (day|one)|"
+    r"how are you|who are you|what can you do)"
+    r"(\s+(threadweaver|again|so much|a lot))?\s*[!.?\s:)]*$",
+    re.IGNORECASE,
+)
+
+
+def _classify_with_rules(user_query: str) -> tuple[str, float] | None:
+    """
+    Classify messages that don't need a model call
+
+    Args:
+        user_query: The user's latest message
+
+    Returns:
+        tuple[str, float] | None: Intent and confidence, or None if the rules are inconclusive
+    """
+    if CONVERSATIONAL_PATTERN.match(user_query):
+        return "conversational", 0.95
+    return None
+
+
+async def _classify_with_model(anthropic_client, state: dict) -> tuple[str, float]:
+    """
+    Classify the latest message with a small, fast model
+
+    Args:
+        anthropic_client: AsyncAnthropic client
+        state: Router state with the conversation and the user's latest message
+
+    Returns:
+        tuple[str, float]: Intent and confidence
+    """
+    # A few earlier turns are enough to resolve references like "do it"
+    history = "\n".join(
+        f"{'Assistant' if isinstance(message, AIMessage) else 'User'}: {message.content[:500]}"
+        for message in (state.get("message") or [])[-5:-1]
+    )
+    prompt = f"<history>\n{history}\n</history>\n\n<message>\n{state['user_query']}\n</message>" if history else state["user_query"]
+
+    response = await anthropic_client.messages.create(
+        model=config.intent_classifier_model,
+        max_tokens=50,
+        system=intent_classification_prompt,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    text = "".join(block.text for block in response.content if block.type == "text")
+    result = json.loads(text[text.index("{"):text.rindex("}") + 1])
+
+    intent = result.get("intent")
+    if intent not in INTENTS:
+        raise ValueError(f"Unknown intent: {intent}")
+    return intent, float(result.get("confidence", 0.5))
+
+
+async def _classify(state: dict, anthropic_client, timings=None) -> tuple[str, float]:
+    """
+    Classify the latest message, trying cheap rules before the model
+
+    Low-confidence or failed classifications take the hybrid route, which runs
+    the full pipeline.
+
+    Args:
+        state: Router state with the conversation and the user's latest message
+        anthropic_client: AsyncAnthropic client
+        timings: Optional RequestTimings to record the model call in
+
+    Returns:
+        tuple[str, float]: Intent and confidence
+    """
+    rule_result = _classify_with_rules(state["user_query"])
+    if rule_result is not None:
+        return rule_result
+
+    try:
+        classification = _classify_with_model(anthropic_client, state)
+        intent, confidence = await (timings.measure("intent", classification) if timings is not None else classification)
+    except Exception as e:
+        logger.error(f"Error classifying intent, using the hybrid route: {e}")
+        return "hybrid", 0.0
+
+    if confidence < config.intent_confidence_threshold and intent != "hybrid":
+        logger.info(f"Intent {intent} below confidence threshold ({confidence}), using the hybrid route")
+        return "hybrid", confidence
+    return intent, confidence
+
+
+async def classify_intent(state: dict, config: RunnableConfig) -> dict:
+    """
+    Intent classifier node
+
+    Args:
+        state: Router state with the user's latest message
+        config: Runnable config whose configurable["anthropic_client"] is an AsyncAnthropic client
+
+    Returns:
+        dict: State update with intent and confidence_score
+    """
+    configurable = config.get("configurable", {})
+    intent, confidence = await _classify(state, configurable["anthropic_client"], configurable.get("timings"))
+    logger.info(f"Classified intent: {intent} ({confidence})")
+    return {"intent": intent, "confidence_score": confidence}
@@ -8,6 +8,22 @@ from langgraph.graph import StateGraph, START, END
 from typing import TypedDict, Literal, List, Dict, Any, Optional
 from app.prompts.intent_classification_prompt import intent_classification_prompt
 from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, BaseMessage
+from langchain_core.runnables import RunnableConfig
+
+from app.agents.intent_classifier import INTENTS, classify_intent
+from app.agents.rag_retrieval import retrieve_documents
+from app.agents.relevancy_checker import check_relevancy
+from app.agents.tool_selector import select_tools
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages each route runs; every other stage is skipped
+ROUTE_STAGES: Dict[str, List[str]] = {
+    "conversational": [],
+    "retrieve": ["retrieval"],
+    "action": ["tools"],
+    "hybrid": ["retrieval", "tools"],
+}
 
 class InputRouterState(TypedDict):
     """ Input state for the agentic workflow """
@@ -20,10 +36,11 @@ class InputRouterState(TypedDict):
 
     # Routing Decisions
     is_doc_relevant: Optional[bool]
-    intent: Optional[Literal["retreive", "action", "hybrid", "conversational"]]
+    intent: Optional[Literal["retrieve", "action", "hybrid", "conversational"]]
     confidence_score: Optional[float]
 
     # Retreived Context 
+    query_embedding: Optional[List[float]]
     rag_results: Optional[List[dict]]
     notion_tools: Optional[List[dict]]
 
@@ -41,4 +58,123 @@ class OutputRouterState(TypedDict):
     tool_calls_made: Optional[List[dict]]
     sources_used: Optional[List[str]]
 
-    
\ No newline at end of file
+
+class RouteStats:
+    """
+    Route counters and running averages of the stages a route can skip.
+
+    The time a route saves is estimated from the averages of the stages it
+    skipped. Retrieval and tool loading run concurrently, so skipping both
+    saves the longer of the two rather than their sum. A model classification
+    runs before either stage, so its latency is subtracted from the saving,
+    which is negative when routing cost more than it skipped.
+    """
+    def __init__(self, smoothing: float = 0.2):
+        """
+        Initialize the stats
+
+        Args:
+            smoothing: Weight of the newest sample in the stage duration averages
+        """
+        self.smoothing = smoothing
+        self.route_counts: Dict[str, int] = {intent: 0 for intent in INTENTS}
+        self.stage_averages: Dict[str, float] = {}
+        self.time_saved_ms = 0.0
+        self.classifier_ms = 0.0
+
+    def record(self, intent: str, stage_timings: Dict[str, float]) -> float:
+        """
+        Record a routed request
+
+        Args:
+            intent: The route taken
+            stage_timings: Stage durations of the request in milliseconds, including the
+                "intent" stage when the message was classified by the model
+
+        Returns:
+            float: Estimated milliseconds saved by the stages the route skipped, net of the classifier call
+        """
+        self.route_counts[intent] = self.route_counts.get(intent, 0) + 1
+        for stage in ROUTE_STAGES[intent]:
+            if stage in stage_timings:
+                average = self.stage_averages.get(stage)
+                self.stage_averages[stage] = stage_timings[stage] if average is None else (
+                    self.smoothing * stage_timings[stage] + (1 - self.smoothing) * average
+                )
+
+        skipped = [stage for stage in ROUTE_STAGES["hybrid"] if stage not in ROUTE_STAGES[intent]]
+        classifier_ms = stage_timings.get("intent", 0.0)
+        time_saved_ms = max((self.stage_averages.get(stage, 0.0) for stage in skipped), default=0.0) - classifier_ms
+        self.classifier_ms += classifier_ms
+        self.time_saved_ms += time_saved_ms
+        return round(time_saved_ms, 1)
+
+    def stats(self) -> dict:
+        """
+        Get routing statistics
+
+        Returns:
+            dict: Requests per route, average stage durations, total time spent in model
+                classification and total estimated time saved net of it
+        """
+        return {
+            "routes": dict(self.route_counts),
+            "stage_averages_ms": {stage: round(average, 1) for stage, average in self.stage_averages.items()},
+            "classifier_ms": round(self.classifier_ms, 1),
+            "time_saved_ms": round(self.time_saved_ms, 1),
+        }
+
+
+async def classify_or_keep_intent(state: InputRouterState, config: RunnableConfig) -> dict:
+    """
+    Classify the intent unless the caller already chose a route
+    """
+    if state.get("intent"):
+        return {}
+    return await classify_intent(state, config)
+
+
+def route_after_classification(state: InputRouterState) -> List[str] | str:
+    """
+    Pick the nodes to run for the classified intent
+
+    Retrieval and tool selection are independent, so the hybrid route fans out
+    to both and LangGraph runs them concurrently.
+    """
+    stages = ROUTE_STAGES[state["intent"]]
+    nodes = []
+    if "retrieval" in stages:
+        nodes.append("rag_retrieval")
+    if "tools" in stages:
+        nodes.append("tool_selector")
+    return nodes or END
+
+
+def build_intent_router_graph():
+    """
+    Build the intent router graph
+
+    START -> classify_intent -> [rag_retrieval -> relevancy_checker] and/or [tool_selector] -> END
+
+    Nodes read their dependencies from the runnable config's "configurable" dict:
+    anthropic_client, rag_service, load_tools and (optionally) timings.
+
+    Returns:
+        CompiledStateGraph: The compiled router graph
+    """
+    graph = StateGraph(InputRouterState)
+    graph.add_node("classify_intent", classify_or_keep_intent)
+    graph.add_node("rag_retrieval", retrieve_documents)
+    graph.add_node("relevancy_checker", check_relevancy)
+    graph.add_node("tool_selector", select_tools)
+
+    graph.add_edge(START, "classify_intent")
+    graph.add_conditional_edges("classify_intent", route_after_classification, ["rag_retrieval", "tool_selector", END])
+    graph.add_edge("rag_retrieval", "relevancy_checker")
+    graph.add_edge("relevancy_checker", END)
+    graph.add_edge("tool_selector", END)
+    return graph.compile()
+
+
+intent_router_graph = build_intent_router_graph()
+route_stats = RouteStats()
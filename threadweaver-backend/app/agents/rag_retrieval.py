@@ -0,0 +1,57 @@
+import logging
+
+from langchain_core.runnables import RunnableConfig
+
+from app.services.context_packer import context_packer
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+async def _search(rag_service, user_query: str, user_id: str) -> tuple[list[float], list]:
+    """
+    Over-fetch candidates for the query, then diversify, merge and pack them into passages
+    """
+    # Keep the embedding in the state so it can be reused as the semantic cache key
+    query_embedding = await rag_service.embed_query(user_query)
+    rag_results = await rag_service.search(
+        query=user_query,
+        match_threshold=0.25,
+        top_k=config.rag_candidate_count,
+        query_embedding=query_embedding,
+        user_id=user_id,
+    )
+    candidates = rag_results.results
+    if len(candidates) <= 1:
+        return query_embedding, candidates
+
+    try:
+        embeddings = await rag_service.get_chunk_embeddings([result.chunk_id for result in candidates if result.chunk_id])
+    except Exception as e:
+        # Without embeddings MMR cannot run; adjacent merging and packing still apply
+        logger.error(f"Skipping MMR: {e}")
+        embeddings = {}
+    return query_embedding, context_packer.prepare(query_embedding, candidates, embeddings)
+
+
+async def retrieve_documents(state: dict, config: RunnableConfig) -> dict:
+    """
+    RAG retrieval node
+
+    Args:
+        state: Router state with the user's latest message
+        config: Runnable config whose configurable["rag_service"] is a RAGService
+
+    Returns:
+        dict: State update with the query_embedding and rag_results as a list of search result dicts
+    """
+    configurable = config.get("configurable", {})
+    rag_service = configurable["rag_service"]
+    timings = configurable.get("timings")
+
+    search = _search(rag_service, state["user_query"], state.get("user_id"))
+    query_embedding, rag_results = await (timings.measure("retrieval", search) if timings is not None else search)
+    return {
+        "query_embedding": query_embedding,
+        "rag_results": [result.model_dump() for result in rag_results],
+    }
@@ -0,0 +1,22 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def check_relevancy(state: dict) -> dict:
+    """
+    Relevancy checker node
+
+    Retrieval already applies a similarity threshold, so any result that came
+    back is relevant enough to add as context.
+
+    Args:
+        state: Router state with rag_results
+
+    Returns:
+        dict: State update with is_doc_relevant
+    """
+    is_doc_relevant = bool(state.get("rag_results"))
+    if not is_doc_relevant:
+        logger.info(f"No relevant results found from the RAG search for user query: {state['user_query']}")
+    return {"is_doc_relevant": is_doc_relevant}
@@ -0,0 +1,25 @@
+import logging
+
+from langchain_core.runnables import RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+
+async def select_tools(state: dict, config: RunnableConfig) -> dict:
+    """
+    Tool selector node
+
+    Args:
+        state: Router state
+        config: Runnable config whose configurable["load_tools"] is a coroutine
+            function returning the tools in Anthropic format
+
+    Returns:
+        dict: State update with notion_tools
+    """
+    configurable = config.get("configurable", {})
+    load_tools = configurable["load_tools"]
+    timings = configurable.get("timings")
+
+    notion_tools = await (timings.measure("tools", load_tools()) if timings is not None else load_tools())
+    return {"notion_tools": notion_tools}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from app.schemas.requests import ChatRequest, ChatResponse, ChatMessage, MessageType, MessageListResponse
 from app.db.supabase_client import get_supabase_connection
 from config import config
@@ -6,6 +7,8 @@ from app.services.llm_chat_service import LLMChatService
 from supabase import Client
 from datetime import datetime
 from app.auth.dependencies import get_current_user_id
+import asyncio
+import json
 import logging
 
 
@@ -21,36 +24,28 @@ async def chat(request: ChatRequest, current_user_id: str = Depends(get_current_
     logger.info(f"Received request: {request}")
     logger.info(f"Current user id: {current_user_id}")
 
-    # Check if the session exists and belongs to the current user
-    session = supabase_client.table("chat_sessions")\
-        .select("id")\
-        .eq("id", request.session_id)\
-        .eq("user_id", current_user_id)\
-        .single()\
-        .execute()
-
-    if not session.data:
-        raise HTTPException(status_code=404, detail="Session not found")
-    
-    # Insert the user message into the messages table
-    insert_user_message(supabase_client, request)
-    
     llm_chat_service = LLMChatService()
+
+    async def load_session():
+        # Check if the session exists and belongs to the current user, then save the user message.
+        # Runs concurrently with retrieval and tool loading inside the chat pipeline.
+        await asyncio.to_thread(verify_session, supabase_client, request.session_id, current_user_id)
+        await asyncio.to_thread(insert_user_message, supabase_client, request)
     
     # Possible failure points:
     # - LLM API call fails
     try:
-        response = await llm_chat_service.chat(request)
+        response = await llm_chat_service.chat(request, load_session, current_user_id)
         logger.info(f"Response: {response}")
 
         # Insert the assistant message into the messages table
-        insert_assistant_message(supabase_client, response)
+        await asyncio.to_thread(insert_assistant_message, supabase_client, response)
         return response
     # Re-raise HTTPExceptions handled by helper functions
     except HTTPException:
         raise
     # Handle client-side errors
-    except (ValueError, IndexError, KeyError):
+    except (ValueError, IndexError, KeyError) as e:
         logger.error(f"Client-side error: {e}")
         raise HTTPException(status_code=400, detail="Invalid request data")
     # Handle database errors
@@ -58,6 +53,70 @@ async def chat(request: ChatRequest, current_user_id: str = Depends(get_current_
         logger.error(f"Database error: {e}")
         raise HTTPException(status_code=503, detail="A database error occurred while processing your request")
 
+@router.post("/chat/stream")
+async def chat_stream(request: ChatRequest, current_user_id: str = Depends(get_current_user_id)) -> StreamingResponse:
+    """
+    Chat with the model, streaming progress as server-sent events
+
+    Emits route, retrieval, tool_call, tool_result and text events while the response is
+    generated, then a done event with the full ChatResponse (or an error event).
+    """
+    supabase_client = get_supabase_connection()
+    logger.info(f"Received streaming request: {request}")
+    logger.info(f"Current user id: {current_user_id}")
+
+    # Check if the session exists and belongs to the current user before the stream starts
+    await asyncio.to_thread(verify_session, supabase_client, request.session_id, current_user_id)
+
+    llm_chat_service = LLMChatService()
+
+    async def load_session():
+        # Insert the user message into the messages table while retrieval and tool loading run
+        await asyncio.to_thread(insert_user_message, supabase_client, request)
+
+    async def event_stream():
+        try:
+            async for event in llm_chat_service.chat_events(request, load_session, current_user_id):
+                if event["event"] == "done":
+                    # Persist the assembled assistant message before telling the client we are done
+                    response = ChatResponse(**event["data"])
+                    await asyncio.to_thread(insert_assistant_message, supabase_client, response)
+                yield format_sse_event(event["event"], event["data"])
+        except HTTPException as e:
+            yield format_sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}")
+            yield format_sse_event("error", {"detail": "An error occurred while processing your request"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def format_sse_event(event: str, data: dict) -> str:
+    """
+    Format a server-sent event
+    """
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def verify_session(supabase_client: Client, session_id: str, user_id: str):
+    """
+    Check that the session exists and belongs to the user
+
+    Raises:
+        HTTPException: If the session is not found
+    """
+    session = supabase_client.table("chat_sessions")\
+        .select("id")\
+        .eq("id", session_id)\
+        .eq("user_id", user_id)\
+        .single()\
+        .execute()
+
+    if not session.data:
+        raise HTTPException(status_code=404, detail="Session not found")
+
 def insert_user_message(supabase_client: Client, request: ChatRequest):
     """
     Insert the user message into the messages table
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+import asyncio
+import uuid
+from typing import Optional
 
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, Depends
 
 from app.auth.dependencies import get_current_user_id
+from app.db.chunk_writer import chunk_bulk_writer
 from app.db.supabase_client import get_supabase_connection
-from app.schemas.requests import DocumentUploadResponse
+from app.schemas.requests import DocumentStatusResponse, DocumentUploadResponse
+from app.services.extractors import get_extractor, supported_extensions
+from app.services.ingestion import ingestion_pipeline
+from app.services.ingestion_jobs import IngestionQueueFull, ingestion_job_queue
 from config import config
 import logging
 
@@ -13,125 +19,134 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1", tags=["documents"])
 
 
-@router.post("/documents/upload", response_model=DocumentUploadResponse)
-async def upload_document(file: UploadFile = File(...), current_user_id: str = Depends(get_current_user_id)) -> DocumentUploadResponse:
+@router.post("/documents/upload", response_model=DocumentUploadResponse, status_code=202)
+async def upload_document(
+    file: UploadFile = File(...),
+    upsert: bool = Form(default=False),
+    external_id: Optional[str] = Form(default=None),
+    current_user_id: str = Depends(get_current_user_id),
+) -> DocumentUploadResponse:
     """
-    Upload a document to the database and process it for RAG
+    Upload a document and queue it for RAG processing
+
+    The document row is created right away; chunking, embedding and storing the
+    chunks happen in a background ingestion job whose progress is reported by
+    GET /documents/{document_id}/status.
+
+    With upsert, a re-upload of a document the user already has (same external id,
+    or same filename when no external id is given) updates it in place: only the
+    chunks that changed are embedded, inserted or deleted.
 
     Args:
         file: The file to upload
+        upsert: Whether to update the user's existing document instead of adding another
+        external_id: Caller-supplied id identifying the document across uploads
 
     Returns:
-        str: A success message
+        DocumentUploadResponse: The document id, ingestion job id and status URL
 
     Raises:
-        HTTPException: If the file is not a text file or if there is an error uploading the document
-        Exception: If there is an error chunking the document
+        HTTPException: If the file type is not supported, the document is already being
+            processed, too many uploads are queued, or there is an error uploading the document
     """
     logger.info(f"Uploading document: {file.filename}")
     supabase_client = get_supabase_connection()
-    
+    document_id = None
+    existing_document_id = None
 
     try:
         # Upload the file to the database
-        if not file.filename.endswith(('.txt')):
-            raise HTTPException(status_code=400, detail="Only text files are supported")
-        
-        # Read the file content
-        file_content = await file.read()
-        text_content = file_content.decode("utf-8")
-
-         # Insert the document into the database
-        response = supabase_client.table("documents").insert({
+        if get_extractor(file.filename) is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported file type. Supported types: {', '.join(supported_extensions())}",
+            )
+
+        if upsert:
+            existing_document_id = await asyncio.to_thread(ingestion_pipeline.find_upload, current_user_id, file.filename, external_id)
+
+        if existing_document_id:
+            # Two jobs diffing the same document at once would undo each other's changes
+            status = await ingestion_job_queue.get_status(existing_document_id)
+            if status and status["state"] in ("queued", "running"):
+                raise HTTPException(status_code=409, detail="The document is already being processed")
+
+            await asyncio.to_thread(supabase_client.table("documents").update({
+                "original_filename": file.filename,
+                "mime_type": file.content_type,
+                "file_size_bytes": file.size,
+                "title": file.filename
+            }).eq("id", existing_document_id).execute)
+
+            job_id = await ingestion_job_queue.enqueue(existing_document_id, current_user_id, file, upsert=True)
+            return DocumentUploadResponse(
+                message="Document update queued for processing",
+                document_id=existing_document_id,
+                job_id=job_id,
+                status_url=f"{router.prefix}/documents/{existing_document_id}/status",
+                updated=True,
+            )
+
+        document = {
             "user_id": current_user_id,
             "original_filename": file.filename,
             "mime_type": file.content_type,
             "file_size_bytes": file.size,
             "integration_type": "upload",
             "integration_id": None,
-            "external_id": None,
+            "external_id": external_id,
             "content_type": "file",
             "title": file.filename
-        }).execute()
-
-        document_id = response.data[0]["id"]
-
-        # Chunk and embed the content
-        chunked_content = _chunk_document(text_content)
-        embedded_content = _embed_chunks(chunked_content)
-
-        # Insert the chunks into the database
-        chunk_records = []
-        for i ,(chunk, embedding) in enumerate(zip(chunked_content, embedded_content)):
-            chunk_records.append({
-                "document_id": document_id,
-                "user_id": current_user_id,  
-                "integration_type": "upload",
-                "chunk_index": i,
-                "original_text": chunk,
-                "embedding": embedding,
-            })
-            logger.info(f"Chunk {i} uploaded successfully")
-
-        response = supabase_client.table("chunks").insert(chunk_records).execute()
-        logger.info(f"Stored {len(chunk_records)} chunks in database")
-    
-        # Return the document and chunks
+        }
+
+        if chunk_bulk_writer.enabled:
+            # The ingestion job inserts the document row in the same transaction as its chunks
+            queued_document_id = str(uuid.uuid4())
+            job_id = await ingestion_job_queue.enqueue(queued_document_id, current_user_id, file, document=document)
+        else:
+            # Insert the document into the database
+            response = await asyncio.to_thread(supabase_client.table("documents").insert(document).execute)
+            document_id = queued_document_id = response.data[0]["id"]
+
+            # Chunking, embedding and inserting run in the background
+            job_id = await ingestion_job_queue.enqueue(document_id, current_user_id, file)
+
         return DocumentUploadResponse(
-            message="Document and chunks uploaded successfully",
-            document_id=document_id,
-            chunks_created=len(chunk_records)
+            message="Document uploaded and queued for processing",
+            document_id=queued_document_id,
+            job_id=job_id,
+            status_url=f"{router.prefix}/documents/{queued_document_id}/status",
         )
-    # Possible failure points:
-    # - Error chunking the document
-    # - Error embedding the chunks
-    # - Error inserting the chunks into the database
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error uploading document: {e}")
+        if document_id:
+            # Don't leave a document behind that will never be processed
+            try:
+                await asyncio.to_thread(ingestion_pipeline.delete_document, document_id, current_user_id)
+            except Exception as cleanup_error:
+                logger.error(f"Error deleting unqueued document {document_id}: {cleanup_error}")
+        if isinstance(e, IngestionQueueFull):
+            raise HTTPException(status_code=429, detail="Too many documents are being processed. Please try again later.")
         raise HTTPException(status_code=503, detail="Unable to upload document. Please try again later.")
 
-def _chunk_document(file_content: str) -> list[str]:
+
+@router.get("/documents/{document_id}/status", response_model=DocumentStatusResponse)
+async def get_document_status(document_id: str, current_user_id: str = Depends(get_current_user_id)) -> DocumentStatusResponse:
     """
-    Chunk the document into smaller pieces
+    Get the ingestion status of an uploaded document
 
     Args:
-        file_content: The content of the file
+        document_id: The document
 
     Returns:
-        list[str]: A list of chunks
+        DocumentStatusResponse: Job state, attempts, chunks done and timings
 
     Raises:
-        ValueError: If the file content is empty
+        HTTPException: If the document has no ingestion job for the current user
     """
-
-    if not file_content:
-        raise ValueError("File content is empty")
-    
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=700,
-        chunk_overlap=100,
-    )
-    chunks = text_splitter.split_text(file_content)
-
-    logger.info(f"Document chunked successfully: {chunks}")
-    return chunks
-
-
-def _embed_chunks(chunks: list[str]) -> list[list[float]]:
-    """
-    Embed the chunks
-
-    Args:
-        chunks: The chunks to embed
-
-    Returns:
-        list[list[float]]: A list of embeddings
-    """
-    if not chunks:
-        raise ValueError("Chunks are empty")
-
-    embeddings = config.get_embedding_model().embed_documents(chunks)
-    logger.info(f"Chunks embedded successfully: Generated {len(embeddings)} embeddings of size {len(embeddings[0])}")
-    return embeddings
\ No newline at end of file
+    status = await ingestion_job_queue.get_status(document_id)
+    if status is None or status["user_id"] != current_user_id:
+        raise HTTPException(status_code=404, detail="Document not found")
+    return DocumentStatusResponse(**status)
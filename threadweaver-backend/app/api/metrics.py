@@ -0,0 +1,41 @@
+from fastapi import APIRouter
+
+from app.agents.intent_router_graph import route_stats
+from app.db.chunk_writer import chunk_bulk_writer
+from app.integrations.NotionMCPClient import notion_mcp_pool
+from app.services.embedding_cache import query_embedding_cache
+from app.services.embedding_executor import embedding_executor
+from app.services.embedding_store import chunk_embedding_store
+from app.services.extraction_pool import chunk_extraction_pool
+from app.services.ingestion_jobs import ingestion_job_queue
+from app.services.llm_chat_service import prompt_cache_stats
+from app.services.semantic_cache import semantic_response_cache
+from app.services.tool_catalog import tool_catalog
+from app.services.tool_result_cache import tool_result_cache
+from app.services.vector_index import local_vector_index
+import logging
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/v1", tags=["metrics"])
+
+
+@router.get("/metrics")
+async def get_metrics() -> dict:
+    """
+    Get in-process cache and connection pool statistics
+    """
+    return {
+        "tool_catalog": tool_catalog.stats(),
+        "tool_result_cache": tool_result_cache.stats(),
+        "prompt_cache": prompt_cache_stats.stats(),
+        "notion_mcp_pool": notion_mcp_pool.stats(),
+        "intent_router": route_stats.stats(),
+        "semantic_cache": semantic_response_cache.stats(),
+        "query_embedding_cache": query_embedding_cache.stats(),
+        "local_vector_index": local_vector_index.stats(),
+        "ingestion_jobs": ingestion_job_queue.stats(),
+        "embedding_executor": embedding_executor.stats(),
+        "embedding_store": chunk_embedding_store.stats(),
+        "chunk_bulk_writer": chunk_bulk_writer.stats(),
+        "chunk_extraction_pool": chunk_extraction_pool.stats(),
+    }
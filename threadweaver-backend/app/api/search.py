@@ -1,7 +1,9 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File
+from fastapi import APIRouter, HTTPException, UploadFile, File, Depends
+
+from app.auth.dependencies import get_current_user_id
 
 from app.db.supabase_client import get_supabase_connection
-from app.schemas.requests import SearchResponse, SearchResult
+from app.schemas.requests import BatchSearchRequest, BatchSearchResponse, BatchSearchResult, SearchMode, SearchResponse, SearchResult
 from app.services.rag_service import RAGService
 from config import config
 import logging
@@ -13,17 +15,44 @@ supabase_client = get_supabase_connection()
 
 # USED FOR TESTING RAG SEARCH RESULTS ONLY
 @router.get("/search")
-def search(query: str) -> SearchResponse:
+async def search(query: str, mode: SearchMode = SearchMode.VECTOR, current_user_id: str = Depends(get_current_user_id)) -> SearchResponse:
     """
     Search the database for documents
+
+    Args:
+        query: The search query
+        mode: vector (cosine similarity), keyword (full-text) or hybrid (both, fused with RRF)
     """
     logger.info(f"Searching for documents: {query}")
     rag_service = RAGService()
     try:
-        search_results = rag_service.search(query=query)
+        search_results = await rag_service.search(query=query, user_id=current_user_id, mode=mode)
         return search_results
     except HTTPException:
         raise
     except Exception as e:
         logger.error(f"Error searching for documents: {e}")
         raise HTTPException(status_code=500, detail="Unable to search for documents. Please try again later.")
+
+
+@router.post("/search/batch")
+async def search_batch(request: BatchSearchRequest, current_user_id: str = Depends(get_current_user_id)) -> BatchSearchResponse:
+    """
+    Search the database for several queries in one call
+
+    Args:
+        request: The queries, search mode and number of results per query
+    """
+    logger.info(f"Searching for documents for {len(request.queries)} queries")
+    rag_service = RAGService()
+    try:
+        responses = await rag_service.search_many(request.queries, top_k=request.top_k, user_id=current_user_id, mode=request.mode)
+        return BatchSearchResponse(results=[
+            BatchSearchResult(query=query, results=response.results)
+            for query, response in zip(request.queries, responses)
+        ])
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error searching for documents: {e}")
+        raise HTTPException(status_code=500, detail="Unable to search for documents. Please try again later.")
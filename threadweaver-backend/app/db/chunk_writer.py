@@ -0,0 +1,197 @@
+import asyncio
+import logging
+import struct
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import asyncpg
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Chunk columns written by COPY, in order
+CHUNK_COLUMNS = (
+    "id", "document_id", "user_id", "integration_type", "chunk_index", "original_text", "content_hash", "embedding",
+)
+
+
+def encode_vector(embedding: list[float]) -> bytes:
+    """
+    Encode an embedding in pgvector's binary format
+
+    Args:
+        embedding: The embedding
+
+    Returns:
+        bytes: int16 dimensions, int16 unused, then float32 values, all big-endian
+    """
+    values = np.asarray(embedding, dtype=">f4")
+    return struct.pack(">HH", len(values), 0) + values.tobytes()
+
+
+def decode_vector(data: bytes) -> list[float]:
+    """
+    Decode an embedding from pgvector's binary format
+
+    Args:
+        data: The binary value
+
+    Returns:
+        list[float]: The embedding
+    """
+    dimensions, _ = struct.unpack_from(">HH", data)
+    return np.frombuffer(data, dtype=">f4", count=dimensions, offset=4).tolist()
+
+
+class ChunkWriteTransaction:
+    """
+    Writes a document and its chunks on one connection inside an open transaction
+    """
+    def __init__(self, connection: asyncpg.Connection):
+        self.connection = connection
+
+    async def insert_document(self, record: dict) -> str:
+        """
+        Insert a documents row
+
+        Args:
+            record: Column values of the document
+
+        Returns:
+            str: The document id
+        """
+        columns = ", ".join(record)
+        placeholders = ", ".join(f"${position}" for position in range(1, len(record) + 1))
+        document_id = await self.connection.fetchval(
+            f"INSERT INTO documents ({columns}) VALUES ({placeholders}) RETURNING id", *record.values()
+        )
+        return str(document_id)
+
+    async def copy_chunks(self, records: list[dict]):
+        """
+        Write chunk records with a binary COPY
+
+        Args:
+            records: Chunk records with every column in CHUNK_COLUMNS, embeddings as lists of floats
+        """
+        await self.connection.copy_records_to_table(
+            "chunks",
+            records=[tuple(record[column] for column in CHUNK_COLUMNS) for record in records],
+            columns=CHUNK_COLUMNS,
+        )
+
+    async def apply_chunk_diff(self, document_id: str, delete_ids: list[str], moves: dict[str, int]):
+        """
+        Delete removed chunks of a document and renumber moved ones
+
+        Args:
+            document_id: The document
+            delete_ids: Ids of the chunks to delete
+            moves: New chunk_index by chunk id
+        """
+        await self.connection.execute(
+            "SELECT apply_chunk_diff($1::uuid, $2::uuid[], $3::uuid[], $4::int[])",
+            document_id, delete_ids, list(moves), list(moves.values()),
+        )
+
+
+class ChunkBulkWriter:
+    """
+    Writes chunks straight to Postgres over an asyncpg pool.
+
+    Chunk rows go over binary COPY, so embeddings are sent as 4-byte floats
+    instead of a JSON body of decimal strings, and the document row is inserted
+    in the same transaction as its chunks, so a failed ingestion leaves nothing
+    behind. Only used when a direct database URL is configured.
+    """
+    def __init__(self, dsn: Optional[str], min_size: int, max_size: int):
+        """
+        Initialize the writer
+
+        Args:
+            dsn: Postgres connection string, or None to disable the writer
+            min_size: Connections the pool keeps open
+            max_size: Maximum connections in the pool
+        """
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool: Optional[asyncpg.Pool] = None
+        self._pool_lock = asyncio.Lock()
+        self.transactions = 0
+
+    @property
+    def enabled(self) -> bool:
+        """ Whether a database URL is configured """
+        return bool(self.dsn)
+
+    @staticmethod
+    async def _init_connection(connection: asyncpg.Connection):
+        """ Register the pgvector binary codec on a new connection """
+        # Supabase may install the extension in the extensions schema rather than public
+        schema = await connection.fetchval(
+            "SELECT n.nspname FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace WHERE t.typname = 'vector'"
+        )
+        await connection.set_type_codec(
+            "vector", schema=schema, encoder=encode_vector, decoder=decode_vector, format="binary"
+        )
+
+    async def _get_pool(self) -> asyncpg.Pool:
+        """ Create the connection pool on first use """
+        async with self._pool_lock:
+            if self._pool is None:
+                logger.info(f"Opening Postgres pool for bulk chunk writes ({self.min_size}-{self.max_size} connections)")
+                self._pool = await asyncpg.create_pool(
+                    self.dsn,
+                    min_size=self.min_size,
+                    max_size=self.max_size,
+                    init=self._init_connection,
+                    # Prepared statements don't survive transaction-mode poolers (e.g. Supavisor on port 6543)
+                    statement_cache_size=0,
+                )
+        return self._pool
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[ChunkWriteTransaction]:
+        """
+        Open a transaction for writing a document and its chunks
+
+        Yields:
+            ChunkWriteTransaction: Writer bound to the transaction, committed when the block
+                exits and rolled back if it raises
+        """
+        pool = await self._get_pool()
+        async with pool.acquire() as connection:
+            async with connection.transaction():
+                yield ChunkWriteTransaction(connection)
+        self.transactions += 1
+
+    async def close(self):
+        """
+        Close the connection pool
+        """
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    def stats(self) -> dict:
+        """
+        Get writer statistics
+
+        Returns:
+            dict: Whether the writer is enabled, committed transactions and pool size
+        """
+        return {
+            "enabled": self.enabled,
+            "transactions": self.transactions,
+            "pool_size": self._pool.get_size() if self._pool is not None else 0,
+        }
+
+
+chunk_bulk_writer = ChunkBulkWriter(
+    dsn=config.database_url,
+    min_size=config.database_pool_min_size,
+    max_size=config.database_pool_max_size,
+)
@@ -0,0 +1,33 @@
+import json
+
+import numpy as np
+
+
+def to_pgvector_literal(embedding: list[float]) -> str:
+    """
+    Serialize an embedding as a pgvector text literal at float32 precision
+
+    pgvector stores float32, so the shortest float32 representation of each
+    value is lossless and roughly halves the payload compared with the float64
+    JSON list the embeddings API returns.
+
+    Args:
+        embedding: The embedding
+
+    Returns:
+        str: The embedding as "[v1,v2,...]"
+    """
+    return "[" + ",".join(str(value) for value in np.asarray(embedding, dtype=np.float32)) + "]"
+
+
+def from_pgvector_literal(embedding) -> list[float]:
+    """
+    Parse a pgvector column as returned by PostgREST
+
+    Args:
+        embedding: The embedding as a "[v1,v2,...]" string, or already a list
+
+    Returns:
+        list[float]: The embedding
+    """
+    return json.loads(embedding) if isinstance(embedding, str) else embedding
@@ -1,16 +1,20 @@
 import asyncio
+import logging
 import os
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from typing import AsyncIterator, Optional
 
 from pydantic import AnyUrl
 
 from mcp import ClientSession, StdioServerParameters, types
 from mcp.client.stdio import stdio_client
 from mcp.shared.context import RequestContext
+from mcp.shared.exceptions import McpError
 
 from config import config
 
+logger = logging.getLogger(__name__)
+
 
 server_params = StdioServerParameters(
     command="npx",
@@ -36,6 +40,301 @@ async def connect_to_notion_mcp_server() -> AsyncIterator[ClientSession]:
             yield session
 
 
+class _PooledSession:
+    """
+    A single long-lived Notion MCP server process and its client session.
+
+    The stdio transport and the client session are anyio context managers that
+    must be entered and exited from the same task, so each pooled session owns a
+    background task that holds the connection open until it is closed.
+    """
+    def __init__(self, slot: int):
+        """
+        Initialize the pooled session
+
+        Args:
+            slot: Index of the pool slot this session occupies (used for logging)
+        """
+        self.slot = slot
+        self.session: Optional[ClientSession] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._error: Optional[BaseException] = None
+
+    @property
+    def alive(self) -> bool:
+        """ Whether the server process is running and the session is initialized """
+        return self.session is not None and self._task is not None and not self._task.done()
+
+    async def start(self, timeout: float):
+        """
+        Spawn the MCP server and wait for the session to initialize
+
+        Args:
+            timeout: Seconds to wait for the server to become ready
+
+        Raises:
+            ConnectionError: If the server fails to start or initialize in time
+        """
+        self._task = asyncio.create_task(self._run(), name=f"notion-mcp-session-{self.slot}")
+        try:
+            await asyncio.wait_for(self._ready.wait(), timeout)
+        except asyncio.TimeoutError:
+            await self.close(timeout=1.0)
+            raise ConnectionError(f"Notion MCP session {self.slot} did not start within {timeout} seconds")
+
+        if not self.alive:
+            raise ConnectionError(f"Notion MCP session {self.slot} failed to start: {self._error}")
+
+    async def _run(self):
+        """
+        Hold the MCP connection open until the session is closed
+        """
+        try:
+            async with connect_to_notion_mcp_server() as session:
+                self.session = session
+                self._ready.set()
+                logger.info(f"Notion MCP session {self.slot} started")
+                await self._closing.wait()
+        except Exception as e:
+            self._error = e
+            logger.warning(f"Notion MCP session {self.slot} exited with error: {e}")
+        finally:
+            self.session = None
+            self._ready.set()
+
+    async def ping(self, timeout: float) -> bool:
+        """
+        Check that the server process still answers requests
+
+        Args:
+            timeout: Seconds to wait for the ping response
+
+        Returns:
+            bool: True if the session is healthy, False otherwise
+        """
+        if not self.alive:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception as e:
+            logger.warning(f"Notion MCP session {self.slot} failed health check: {e}")
+            return False
+
+    async def close(self, timeout: float = 5.0):
+        """
+        Shut down the server process
+
+        Args:
+            timeout: Seconds to wait for a clean exit before cancelling the task
+        """
+        self._closing.set()
+        if self._task is None or self._task.done():
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._task), timeout)
+        except (asyncio.TimeoutError, Exception):
+            self._task.cancel()
+            try:
+                await self._task
+            except BaseException:
+                pass
+
+
+class NotionMCPSessionPool:
+    """
+    Pool of long-lived Notion MCP sessions.
+
+    Spawning `npx @notionhq/notion-mcp-server` and initializing a session takes
+    seconds, so the pool keeps a fixed number of servers running and lends their
+    sessions out to requests. Idle sessions are pinged periodically and crashed
+    servers are respawned on the next health check or borrow.
+    Usage:
+        async with notion_mcp_pool.session() as session:
+            tools = await session.list_tools()
+    """
+    def __init__(
+        self,
+        size: Optional[int] = None,
+        startup_timeout: Optional[float] = None,
+        acquire_timeout: Optional[float] = None,
+        health_check_interval: Optional[float] = None,
+        ping_timeout: Optional[float] = None,
+    ):
+        """
+        Initialize the pool (servers are not spawned until start() or first use)
+
+        Args:
+            size: Number of MCP server sessions to keep running
+            startup_timeout: Seconds to wait for a server to start and initialize
+            acquire_timeout: Seconds to wait for a free session
+            health_check_interval: Seconds between health checks of idle sessions
+            ping_timeout: Seconds to wait for a ping response
+        """
+        self.size = max(1, size or config.notion_mcp_pool_size)
+        self.startup_timeout = startup_timeout or config.notion_mcp_startup_timeout_seconds
+        self.acquire_timeout = acquire_timeout or config.notion_mcp_acquire_timeout_seconds
+        self.health_check_interval = health_check_interval or config.notion_mcp_health_check_interval_seconds
+        self.ping_timeout = ping_timeout or config.notion_mcp_ping_timeout_seconds
+
+        self._idle: Optional[asyncio.Queue] = None
+        self._slots: list[_PooledSession] = []
+        self._health_task: Optional[asyncio.Task] = None
+        self._start_lock = asyncio.Lock()
+        self._started = False
+        self._closed = False
+        self.respawn_count = 0
+
+    async def start(self):
+        """
+        Spawn all MCP servers and start the health check loop
+
+        Servers that fail to start are kept as dead slots and respawned on use,
+        so a temporarily unavailable Notion server does not prevent startup.
+        """
+        async with self._start_lock:
+            if self._started:
+                return
+            self._closed = False
+            self._idle = asyncio.Queue()
+            self._slots = [_PooledSession(slot) for slot in range(self.size)]
+
+            results = await asyncio.gather(
+                *(pooled.start(self.startup_timeout) for pooled in self._slots),
+                return_exceptions=True,
+            )
+            for pooled, result in zip(self._slots, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Error starting Notion MCP session {pooled.slot}: {result}")
+                self._idle.put_nowait(pooled)
+
+            self._health_task = asyncio.create_task(self._health_check_loop(), name="notion-mcp-health-check")
+            self._started = True
+            logger.info(f"Notion MCP session pool started with {sum(p.alive for p in self._slots)}/{self.size} live sessions")
+
+    async def close(self):
+        """
+        Stop the health check loop and shut down every MCP server
+        """
+        async with self._start_lock:
+            if not self._started:
+                return
+            self._closed = True
+            self._started = False
+            if self._health_task:
+                self._health_task.cancel()
+                try:
+                    await self._health_task
+                except asyncio.CancelledError:
+                    pass
+                self._health_task = None
+
+            await asyncio.gather(*(pooled.close() for pooled in self._slots), return_exceptions=True)
+            self._slots = []
+            logger.info("Notion MCP session pool closed")
+
+    @asynccontextmanager
+    async def session(self) -> AsyncIterator[ClientSession]:
+        """
+        Borrow a session from the pool for the duration of the context
+
+        Yields:
+            ClientSession: An initialized MCP client session
+
+        Raises:
+            TimeoutError: If no session becomes free within the acquire timeout
+            ConnectionError: If the pool is closed or a crashed server cannot be respawned
+        """
+        if self._closed:
+            raise ConnectionError("Notion MCP session pool is closed")
+        if not self._started:
+            await self.start()
+
+        try:
+            pooled = await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"No Notion MCP session available within {self.acquire_timeout} seconds")
+
+        try:
+            if not pooled.alive:
+                pooled = await self._respawn(pooled)
+                if not pooled.alive:
+                    raise ConnectionError(f"Unable to start Notion MCP session {pooled.slot}")
+            try:
+                yield pooled.session
+            except McpError:
+                # Tool-level errors come from a healthy server
+                raise
+            except Exception:
+                # Transport errors may mean the server died mid-request
+                if not await pooled.ping(self.ping_timeout):
+                    pooled = await self._respawn(pooled)
+                raise
+        finally:
+            self._idle.put_nowait(pooled)
+
+    async def _respawn(self, pooled: _PooledSession) -> _PooledSession:
+        """
+        Replace a dead session with a freshly spawned server
+
+        Args:
+            pooled: The dead pooled session
+
+        Returns:
+            _PooledSession: The replacement session, which is not alive if the server failed to start
+        """
+        logger.warning(f"Respawning Notion MCP session {pooled.slot}")
+        await pooled.close(timeout=1.0)
+
+        replacement = _PooledSession(pooled.slot)
+        self._slots[pooled.slot] = replacement
+        self.respawn_count += 1
+        try:
+            await replacement.start(self.startup_timeout)
+        except Exception as e:
+            logger.error(f"Error respawning Notion MCP session {pooled.slot}: {e}")
+        return replacement
+
+    async def _health_check_loop(self):
+        """
+        Periodically ping idle sessions and respawn the ones that stopped responding
+        """
+        while True:
+            await asyncio.sleep(self.health_check_interval)
+            # Only check sessions that are idle right now; borrowed ones are checked on error
+            for _ in range(self._idle.qsize()):
+                try:
+                    pooled = self._idle.get_nowait()
+                except asyncio.QueueEmpty:
+                    break
+                try:
+                    if not await pooled.ping(self.ping_timeout):
+                        pooled = await self._respawn(pooled)
+                except Exception as e:
+                    logger.error(f"Error during Notion MCP health check: {e}")
+                finally:
+                    self._idle.put_nowait(pooled)
+
+    def stats(self) -> dict:
+        """
+        Get pool statistics
+
+        Returns:
+            dict: Pool size, live and idle session counts, and respawns so far
+        """
+        return {
+            "size": self.size,
+            "live": sum(pooled.alive for pooled in self._slots),
+            "idle": self._idle.qsize() if self._idle else 0,
+            "respawns": self.respawn_count,
+        }
+
+
+notion_mcp_pool = NotionMCPSessionPool()
+
+
 async def main():
     """Example usage of the Notion MCP client"""
     async with connect_to_notion_mcp_server() as session:
@@ -46,4 +345,4 @@ async def main():
         result = await session.call_tool("API-post-search", {"query": "when was the page created?"})
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
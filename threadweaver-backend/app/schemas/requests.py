@@ -14,6 +14,15 @@ class MessageType(str, Enum):
     SYSTEM = "system"
 
 
+class SearchMode(str, Enum):
+    """
+    Document search mode enum
+    """
+    VECTOR = "vector"
+    KEYWORD = "keyword"
+    HYBRID = "hybrid"
+
+
 class ChatMessage(BaseModel):
     """
     Chat message schema
@@ -28,6 +37,15 @@ class ChatRequest(BaseModel):
     session_id: str = Field(..., description="The session id")
     messages: List[ChatMessage] = Field(..., description="The messages to chat")
     
+class ChatUsage(BaseModel):
+    """
+    Token usage schema, summed over every model call made for a chat turn
+    """
+    input_tokens: int = Field(default=0, description="Uncached input tokens")
+    output_tokens: int = Field(default=0, description="Output tokens")
+    cache_creation_input_tokens: int = Field(default=0, description="Input tokens written to the prompt cache")
+    cache_read_input_tokens: int = Field(default=0, description="Input tokens read from the prompt cache")
+
 class ChatResponse(BaseModel):
     """
     Chat response schema
@@ -35,6 +53,10 @@ class ChatResponse(BaseModel):
     session_id: str = Field(..., description="The session id")
     response_message: ChatMessage = Field(..., description="The message to chat")
     query_used: str = Field(..., description="The query used to generate the response")
+    route: Optional[str] = Field(default=None, description="The intent route taken: conversational, retrieve, action or hybrid")
+    cached: bool = Field(default=False, description="Whether the response was served from the semantic response cache")
+    usage: Optional[ChatUsage] = Field(default=None, description="Token usage for the chat turn")
+    timings: Optional[Dict[str, float]] = Field(default=None, description="Per-stage timings for the chat turn in milliseconds")
 
 class SessionCreateRequest(BaseModel):
     """
@@ -63,7 +85,32 @@ class DocumentUploadResponse(BaseModel):
     """
     message: str = Field(..., description="Success message")
     document_id: str = Field(..., description="The ID of the uploaded document")
-    chunks_created: int = Field(..., description="Number of chunks created")
+    job_id: str = Field(..., description="The ID of the ingestion job processing the document")
+    status_url: str = Field(..., description="URL reporting the ingestion status")
+    updated: bool = Field(default=False, description="Whether an existing document is being updated in place")
+
+class DocumentStatusTimings(BaseModel):
+    """
+    Ingestion job timings schema
+    """
+    queued_ms: float = Field(..., description="Time the job waited before its latest attempt started")
+    processing_ms: Optional[float] = Field(default=None, description="Time spent on the latest attempt so far")
+
+class DocumentStatusResponse(BaseModel):
+    """
+    Document ingestion status schema
+    """
+    document_id: str = Field(..., description="The ID of the document")
+    job_id: str = Field(..., description="The ID of the ingestion job")
+    state: str = Field(..., description="Job state: queued, running, succeeded or failed")
+    attempts: int = Field(..., description="Attempts started so far")
+    chunks_done: int = Field(..., description="Chunks stored so far")
+    chunks_reused: int = Field(default=0, description="Chunks whose embedding was reused from the embedding store")
+    chunks_embedded: int = Field(default=0, description="Chunks sent to the embeddings API")
+    bytes_read: Optional[int] = Field(default=None, description="Bytes of the upload read so far, while running")
+    total_bytes: Optional[int] = Field(default=None, description="Size of the upload")
+    error: Optional[str] = Field(default=None, description="Error of the latest failed attempt")
+    timings: DocumentStatusTimings = Field(..., description="Job timings")
 
 class SearchResult(BaseModel):
     """
@@ -73,9 +120,31 @@ class SearchResult(BaseModel):
     chunk_index: int = Field(..., description="The index of the chunk")
     similarity_score: float = Field(..., description="The similarity score of the chunk")
     document_id: str = Field(..., description="The id of the document the chunk belongs to")
+    chunk_id: Optional[str] = Field(default=None, description="The id of the chunk")
 
 class SearchResponse(BaseModel):
     """
     Search response schema
     """
-    results: List[SearchResult] = Field(..., description="The search results")
\ No newline at end of file
+    results: List[SearchResult] = Field(..., description="The search results")
+
+class BatchSearchRequest(BaseModel):
+    """
+    Batch search request schema
+    """
+    queries: List[str] = Field(..., min_length=1, max_length=20, description="The search queries")
+    mode: SearchMode = Field(default=SearchMode.VECTOR, description="The search mode used for every query")
+    top_k: int = Field(default=5, ge=1, le=50, description="Maximum number of chunks returned per query")
+
+class BatchSearchResult(BaseModel):
+    """
+    Results of one query in a batch search
+    """
+    query: str = Field(..., description="The search query")
+    results: List[SearchResult] = Field(..., description="The search results")
+
+class BatchSearchResponse(BaseModel):
+    """
+    Batch search response schema
+    """
+    results: List[BatchSearchResult] = Field(..., description="The results of each query, in request order")
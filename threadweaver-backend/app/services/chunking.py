@@ -0,0 +1,247 @@
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from app.services.context_manager import CHARS_PER_TOKEN
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Structural boundaries, strongest first: blank line (paragraph), line break, sentence end.
+# The separator stays at the end of the segment before it
+BOUNDARY = re.compile(r"\n[ \t]*\n\s*|\n|(?<=[.!?])[ \t]+")
+WORD = re.compile(r"\S+\s*|\s+")
+PARAGRAPH, LINE, SENTENCE, SPACE = 3, 2, 1, 0
+
+
+class StreamingChunker:
+    """
+    Splits a text stream into chunks while holding only a bounded buffer.
+
+    Incoming text is buffered until it holds several chunks' worth, then
+    split; every chunk but the last is emitted, and the buffer restarts at the
+    last chunk, which may continue in text that has not arrived yet. Overlap
+    between chunks is unaffected because the splitter sees the last chunk again.
+    """
+    def __init__(self, chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None, buffer_chunks: int = 8):
+        """
+        Initialize the chunker
+
+        Args:
+            chunk_size: Maximum characters per chunk
+            chunk_overlap: Characters shared between neighbouring chunks
+            buffer_chunks: Chunks' worth of text buffered before splitting
+        """
+        chunk_size = chunk_size or config.chunk_size
+        self.splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap if chunk_overlap is not None else config.chunk_overlap,
+        )
+        self.buffer_chars = chunk_size * buffer_chunks
+
+    def _split_buffer(self, buffer: str) -> tuple[list[str], str]:
+        """ Split a full buffer into the finished chunks and the text to keep buffering """
+        chunks = self.splitter.split_text(buffer)
+        if not chunks:
+            return [], buffer
+        # Keep the raw text of the last chunk, including whitespace the splitter stripped
+        return chunks[:-1], buffer[buffer.rfind(chunks[-1]):]
+
+    def chunk_iter(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk text pieces
+
+        Args:
+            pieces: Text, in pieces of any size
+
+        Yields:
+            str: Chunks in document order
+        """
+        buffer = ""
+        for text in pieces:
+            buffer += text
+            if len(buffer) >= self.buffer_chars:
+                chunks, buffer = self._split_buffer(buffer)
+                yield from chunks
+        yield from self.splitter.split_text(buffer)
+
+
+@lru_cache
+def token_counter(encoding_name: str) -> Callable[[str], int]:
+    """
+    Get a function counting the tokens of a text
+
+    Args:
+        encoding_name: tiktoken encoding, e.g. cl100k_base (used by text-embedding-3 models)
+
+    Returns:
+        Callable[[str], int]: The counter; an estimate from characters if the encoding can't be
+            loaded (tiktoken downloads it on first use)
+    """
+    try:
+        encoding = tiktoken.get_encoding(encoding_name)
+    except Exception as e:
+        logger.warning(f"Tokenizer {encoding_name} unavailable, estimating tokens from characters: {e}")
+        return lambda text: -(-len(text) // CHARS_PER_TOKEN)
+    return lambda text: len(encoding.encode_ordinary(text))
+
+
+class TokenChunker:
+    """
+    Splits text into chunks measured in model tokens, in a single pass.
+
+    Text is cut into segments at structural boundaries (paragraphs, lines,
+    sentences) as it streams in, and each segment is tokenized once. Segments
+    are packed greedily; when the next one doesn't fit, the chunk is cut at
+    its strongest boundary past the half-full mark, and the segments after the
+    cut carry over. Chunks overlap by whole trailing segments of up to
+    overlap_tokens. A segment longer than a chunk is split between words.
+    """
+    def __init__(
+        self,
+        chunk_tokens: Optional[int] = None,
+        overlap_tokens: Optional[int] = None,
+        encoding_name: str = "cl100k_base",
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Initialize the chunker
+
+        Args:
+            chunk_tokens: Maximum tokens per chunk
+            overlap_tokens: Maximum tokens shared between neighbouring chunks (at most half a chunk)
+            encoding_name: tiktoken encoding used to count tokens
+            count_tokens: Token counter to use instead of the encoding
+        """
+        self.chunk_tokens = chunk_tokens or config.chunk_tokens
+        overlap_tokens = overlap_tokens if overlap_tokens is not None else config.chunk_overlap_tokens
+        self.overlap_tokens = min(overlap_tokens, self.chunk_tokens // 2)
+        self.encoding_name = encoding_name
+        self._count_tokens = count_tokens
+        # Text with no boundary at all is cut between words after this many characters
+        self.max_segment_chars = self.chunk_tokens * CHARS_PER_TOKEN * 4
+
+    def count_tokens(self, text: str) -> int:
+        """ Count the tokens of a text """
+        # Resolved lazily, so the chunker can be pickled to a worker process before first use
+        if self._count_tokens is None:
+            self._count_tokens = token_counter(self.encoding_name)
+        return self._count_tokens(text)
+
+    @staticmethod
+    def _strength(separator: str) -> int:
+        if separator.count("\n") >= 2:
+            return PARAGRAPH
+        return LINE if "\n" in separator else SENTENCE
+
+    def _segments(self, pieces: Iterable[str]) -> Iterator[tuple[str, int]]:
+        """ Split text pieces at structural boundaries into (text, strength of the boundary ending it) """
+        pending = ""
+        for piece in pieces:
+            pending += piece
+            start = 0
+            for match in BOUNDARY.finditer(pending):
+                # A boundary at the very end may grow with the next piece (e.g. a line break into a blank line)
+                if match.end() == len(pending):
+                    break
+                yield pending[start:match.end()], self._strength(match.group())
+                start = match.end()
+            pending = pending[start:]
+            while len(pending) > self.max_segment_chars:
+                cut = pending.rfind(" ", 0, self.max_segment_chars) + 1 or self.max_segment_chars
+                yield pending[:cut], SPACE
+                pending = pending[cut:]
+        if pending:
+            yield pending, PARAGRAPH
+
+    def _fit(self, text: str, strength: int) -> Iterator[tuple[str, int, int]]:
+        """ Tokenize a segment as (text, tokens, strength), splitting it if it is longer than a chunk """
+        tokens = self.count_tokens(text)
+        if tokens <= self.chunk_tokens:
+            yield text, tokens, strength
+            return
+
+        words = WORD.findall(text)
+        for index, word in enumerate(words):
+            word_strength = strength if index == len(words) - 1 else SPACE
+            word_tokens = self.count_tokens(word)
+            if word_tokens <= self.chunk_tokens:
+                yield word, word_tokens, word_strength
+                continue
+            # A single "word" longer than a chunk (e.g. an encoded blob) is cut by characters
+            step = max(1, len(word) * self.chunk_tokens // (word_tokens + 1))
+            for start in range(0, len(word), step):
+                part = word[start:start + step]
+                yield part, self.count_tokens(part), word_strength if start + step >= len(word) else SPACE
+
+    def _cut_point(self, current: list[tuple[str, int, int]], carried: int) -> int:
+        """ Where to cut a full chunk: after the strongest boundary once it is at least half full """
+        cut, cut_strength = len(current), -1
+        tokens = 0
+        for index, (_, segment_tokens, strength) in enumerate(current, start=1):
+            tokens += segment_tokens
+            # The chunk must contain more than the overlap carried from the previous one
+            if index > carried and tokens >= self.chunk_tokens // 2 and strength >= cut_strength:
+                cut, cut_strength = index, strength
+        return cut
+
+    def _overlap(self, emitted: list[tuple[str, int, int]]) -> list[tuple[str, int, int]]:
+        """ Trailing segments of an emitted chunk that fit in overlap_tokens """
+        tokens = 0
+        start = len(emitted)
+        while start > 0 and tokens + emitted[start - 1][1] <= self.overlap_tokens:
+            start -= 1
+            tokens += emitted[start][1]
+        return emitted[start:]
+
+    def chunk_iter(self, pieces: Iterable[str]) -> Iterator[str]:
+        """
+        Chunk text pieces
+
+        Args:
+            pieces: Text, in pieces of any size
+
+        Yields:
+            str: Chunks in document order, each at most chunk_tokens tokens (as counted per segment)
+        """
+        current: list[tuple[str, int, int]] = []
+        total = 0
+        # Leading segments of current that were already emitted, as overlap
+        carried = 0
+        for text, strength in self._segments(pieces):
+            for segment in self._fit(text, strength):
+                while current and total + segment[1] > self.chunk_tokens:
+                    if carried == len(current):
+                        # Only overlap is left and it doesn't leave room; give it up
+                        total -= current.pop(0)[1]
+                        carried -= 1
+                        continue
+                    cut = self._cut_point(current, carried)
+                    if chunk := "".join(segment_text for segment_text, _, _ in current[:cut]).strip():
+                        yield chunk
+                    overlap = self._overlap(current[:cut])
+                    current = overlap + current[cut:]
+                    total = sum(tokens for _, tokens, _ in current)
+                    carried = len(overlap)
+                current.append(segment)
+                total += segment[1]
+
+        if carried < len(current):
+            if chunk := "".join(segment_text for segment_text, _, _ in current).strip():
+                yield chunk
+
+
+def create_chunker() -> Union[TokenChunker, StreamingChunker]:
+    """
+    Create the chunker selected by the chunking_strategy setting
+
+    Returns:
+        Union[TokenChunker, StreamingChunker]: A chunker with a chunk_iter method
+    """
+    if config.chunking_strategy == "characters":
+        return StreamingChunker()
+    return TokenChunker()
@@ -0,0 +1,191 @@
+import json
+import logging
+from typing import Any, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Rough characters-per-token ratio for English text and JSON with Claude's tokenizer
+CHARS_PER_TOKEN = 4
+# Per-message overhead for role and formatting tokens
+MESSAGE_OVERHEAD_TOKENS = 4
+
+
+class ContextManager:
+    """
+    Keeps the messages sent to Claude within a token budget.
+
+    Oversized tool results are truncated when they enter the conversation, and
+    before each model call older turns of the client-supplied history are
+    collapsed into a rolling summary that is prepended to the oldest turn kept.
+    The current user turn and the tool loop that follows it are never dropped.
+
+    Token counts are estimates (CHARS_PER_TOKEN characters per token), which
+    avoids a network round trip to the token counting API on every call.
+    """
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        tool_result_token_limit: Optional[int] = None,
+        summary_token_budget: Optional[int] = None,
+    ):
+        """
+        Initialize the context manager
+
+        Args:
+            token_budget: Maximum estimated tokens for the messages of one model call
+            tool_result_token_limit: Maximum estimated tokens kept from a single tool result
+            summary_token_budget: Maximum estimated tokens for the summary of older turns
+        """
+        self.token_budget = token_budget or config.context_token_budget
+        self.tool_result_token_limit = tool_result_token_limit or config.tool_result_token_limit
+        self.summary_token_budget = summary_token_budget or config.context_summary_token_budget
+
+    @staticmethod
+    def count_tokens(content: Any) -> int:
+        """
+        Estimate the tokens in message content
+
+        Args:
+            content: A string, or a list of content blocks (dicts or Anthropic SDK objects)
+
+        Returns:
+            int: Estimated token count
+        """
+        if isinstance(content, str):
+            return len(content) // CHARS_PER_TOKEN + 1
+
+        characters = 0
+        for block in content or []:
+            if hasattr(block, "model_dump"):
+                block = block.model_dump()
+            characters += len(block) if isinstance(block, str) else len(json.dumps(block, default=str))
+        return characters // CHARS_PER_TOKEN + 1
+
+    def message_tokens(self, message: dict) -> int:
+        """ Estimate the tokens in a single message """
+        return self.count_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+    @staticmethod
+    def truncate_text(text: str, max_tokens: int) -> str:
+        """
+        Shorten text to a token limit, keeping its beginning and end
+
+        Args:
+            text: Text to shorten
+            max_tokens: Maximum estimated tokens to keep
+
+        Returns:
+            str: The text itself if it fits, otherwise its head and tail with a truncation marker
+        """
+        max_chars = max_tokens * CHARS_PER_TOKEN
+        if len(text) <= max_chars:
+            return text
+
+        head_chars = max_chars * 3 // 4
+        tail_chars = max_chars - head_chars
+        omitted_tokens = (len(text) - max_chars) // CHARS_PER_TOKEN
+        return f"{text[:head_chars]}\n\n[... {omitted_tokens} tokens truncated ...]\n\n{text[len(text) - tail_chars:]}"
+
+    def truncate_tool_result(self, tool_result: dict, max_tokens: Optional[int] = None) -> dict:
+        """
+        Truncate the content of a tool_result block that exceeds the limit
+
+        Args:
+            tool_result: tool_result content block with string content
+            max_tokens: Token limit (defaults to the configured tool result limit)
+
+        Returns:
+            dict: The block, with its content truncated if needed
+        """
+        content = tool_result.get("content")
+        if isinstance(content, str):
+            tool_result = {**tool_result, "content": self.truncate_text(content, max_tokens or self.tool_result_token_limit)}
+        return tool_result
+
+    def _summarize(self, messages: list[dict]) -> str:
+        """
+        Build an extractive summary of older turns within the summary budget
+
+        Each turn contributes its opening; when the budget is exceeded the oldest
+        turns are dropped first, so the summary rolls forward with the conversation.
+        """
+        per_turn_chars = 300
+        lines = []
+        for message in messages:
+            content = message["content"]
+            if not isinstance(content, str):
+                # Tool calls from earlier turns are summarized by their text only
+                content = " ".join(getattr(block, "text", None) or (block.get("text", "") if isinstance(block, dict) else "") for block in content)
+            content = " ".join(content.split())
+            if len(content) > per_turn_chars:
+                content = content[:per_turn_chars] + "..."
+            if content:
+                lines.append(f"- {message['role'].capitalize()}: {content}")
+
+        budget_chars = self.summary_token_budget * CHARS_PER_TOKEN
+        while lines and sum(len(line) + 1 for line in lines) > budget_chars:
+            lines.pop(0)
+        return "\n".join(lines)
+
+    def fit(self, messages: list[dict], current_turn_index: int) -> list[dict]:
+        """
+        Compact messages so they fit the token budget
+
+        Args:
+            messages: Conversation in Anthropic format
+            current_turn_index: Index of the current user message; it and every
+                message after it (the tool loop) are always kept
+
+        Returns:
+            list[dict]: The messages, or a compacted copy if they exceed the budget
+        """
+        total_tokens = sum(self.message_tokens(message) for message in messages)
+        if total_tokens <= self.token_budget:
+            return messages
+
+        history = messages[:current_turn_index]
+        current_turn = list(messages[current_turn_index:])
+
+        # Shrink older tool results from this turn's loop, keeping the latest round intact
+        current_tokens = sum(self.message_tokens(message) for message in current_turn)
+        for index, message in enumerate(current_turn[:-2]):
+            if current_tokens <= self.token_budget - self.summary_token_budget:
+                break
+            if message["role"] == "user" and isinstance(message["content"], list):
+                shrunk = {**message, "content": [
+                    self.truncate_tool_result(block, self.tool_result_token_limit // 4)
+                    if isinstance(block, dict) and block.get("type") == "tool_result" else block
+                    for block in message["content"]
+                ]}
+                current_tokens += self.message_tokens(shrunk) - self.message_tokens(message)
+                current_turn[index] = shrunk
+
+        # Keep as many recent history turns as fit next to the current turn and the summary
+        available_tokens = self.token_budget - current_tokens - self.summary_token_budget
+        keep_from = len(history)
+        while keep_from > 0 and self.message_tokens(history[keep_from - 1]) <= available_tokens:
+            keep_from -= 1
+            available_tokens -= self.message_tokens(history[keep_from])
+        # Kept history must start on a user turn so roles keep alternating
+        while keep_from < len(history) and history[keep_from]["role"] != "user":
+            keep_from += 1
+
+        collapsed, kept = history[:keep_from], history[keep_from:]
+        compacted = kept + current_turn
+        summary = self._summarize(collapsed) if collapsed else ""
+        if summary and isinstance(compacted[0]["content"], str):
+            compacted[0] = {
+                **compacted[0],
+                "content": f"<conversation_summary>\n{summary}\n</conversation_summary>\n\n{compacted[0]['content']}",
+            }
+
+        logger.info(
+            f"Compacted context from {total_tokens} to {sum(self.message_tokens(message) for message in compacted)} "
+            f"estimated tokens: summarized {len(collapsed)} messages, kept {len(kept)}"
+        )
+        return compacted
+
+
+context_manager = ContextManager()
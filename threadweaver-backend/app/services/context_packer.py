@@ -0,0 +1,170 @@
+import logging
+from typing import Optional
+
+import numpy as np
+
+from app.schemas.requests import SearchResult
+from app.services.context_manager import ContextManager
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Shorter shared edges between neighbouring chunks are treated as coincidence, not splitter overlap
+MIN_OVERLAP_CHARS = 10
+
+
+class ContextPacker:
+    """
+    Turns over-fetched retrieval candidates into a compact set of passages.
+
+    1. Maximal marginal relevance picks candidates that are relevant to the
+       query but not redundant with each other.
+    2. Picked chunks that are neighbours in the same document are merged into
+       one passage, with the text the splitter duplicated between them removed.
+    3. Passages are packed, most relevant first, into a token budget.
+    """
+    def __init__(
+        self,
+        mmr_lambda: Optional[float] = None,
+        max_chunks: Optional[int] = None,
+        token_budget: Optional[int] = None,
+        max_overlap_chars: Optional[int] = None,
+    ):
+        """
+        Initialize the context packer
+
+        Args:
+            mmr_lambda: Trade-off between relevance (1.0) and diversity (0.0)
+            max_chunks: Maximum number of chunks kept by MMR
+            token_budget: Maximum estimated tokens of all packed passages
+            max_overlap_chars: Longest overlap searched for between neighbouring chunks
+        """
+        self.mmr_lambda = mmr_lambda if mmr_lambda is not None else config.rag_mmr_lambda
+        self.max_chunks = max_chunks or config.rag_max_chunks
+        self.token_budget = token_budget or config.rag_context_token_budget
+        self.max_overlap_chars = max_overlap_chars or config.chunk_overlap * 2
+
+    def select(self, query_embedding: list[float], results: list[SearchResult], embeddings: dict[str, list[float]]) -> list[SearchResult]:
+        """
+        Pick up to max_chunks results by maximal marginal relevance
+
+        Args:
+            query_embedding: Embedding of the query
+            results: Candidate results, most relevant first
+            embeddings: Chunk embeddings by chunk id; candidates without one can't be
+                compared for redundancy and fill any places left after the MMR picks
+
+        Returns:
+            list[SearchResult]: The picked results in selection order
+        """
+        candidates = [result for result in results if result.chunk_id in embeddings]
+        if len(candidates) <= 1:
+            # Nothing to diversify against; keep the retrieval order
+            return results[:self.max_chunks]
+        unembedded = [result for result in results if result.chunk_id not in embeddings]
+
+        vectors = np.asarray([embeddings[result.chunk_id] for result in candidates], dtype=np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True).clip(min=1e-12)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+
+        relevance = vectors @ query
+        pairwise = vectors @ vectors.T
+
+        selected = [int(np.argmax(relevance))]
+        # Highest similarity of each candidate to anything selected so far
+        redundancy = pairwise[:, selected[0]].copy()
+        while len(selected) < min(self.max_chunks, len(candidates)):
+            scores = self.mmr_lambda * relevance - (1 - self.mmr_lambda) * redundancy
+            scores[selected] = -np.inf
+            best = int(np.argmax(scores))
+            selected.append(best)
+            np.maximum(redundancy, pairwise[:, best], out=redundancy)
+
+        return ([candidates[i] for i in selected] + unembedded)[:self.max_chunks]
+
+    def _overlap(self, left: str, right: str) -> int:
+        """ Length of the longest suffix of left that is a prefix of right """
+        for size in range(min(len(left), len(right), self.max_overlap_chars), MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+
+    def merge_adjacent(self, results: list[SearchResult]) -> list[SearchResult]:
+        """
+        Merge results that are consecutive chunks of the same document
+
+        Args:
+            results: Results in order of preference
+
+        Returns:
+            list[SearchResult]: Merged passages, ordered by their most preferred chunk;
+                each keeps the first chunk's index and the best similarity score
+        """
+        rank = {id(result): position for position, result in enumerate(results)}
+        passages = []
+        by_position = sorted(results, key=lambda result: (result.document_id, result.chunk_index))
+        for result in by_position:
+            previous = passages[-1] if passages else None
+            if previous and previous[0].document_id == result.document_id and previous[1] + 1 == result.chunk_index:
+                passage, _, best_rank = previous
+                overlap = self._overlap(passage.chunk_text, result.chunk_text)
+                separator = "" if overlap else "\n"
+                passages[-1] = (
+                    passage.model_copy(update={
+                        "chunk_text": passage.chunk_text + separator + result.chunk_text[overlap:],
+                        "similarity_score": max(passage.similarity_score, result.similarity_score),
+                    }),
+                    result.chunk_index,
+                    min(best_rank, rank[id(result)]),
+                )
+            else:
+                passages.append((result, result.chunk_index, rank[id(result)]))
+
+        return [passage for passage, _, _ in sorted(passages, key=lambda entry: entry[2])]
+
+    def pack(self, passages: list[SearchResult]) -> list[SearchResult]:
+        """
+        Keep passages, in order, while they fit the token budget
+
+        The first passage is truncated rather than dropped if it alone exceeds the budget.
+
+        Args:
+            passages: Passages in order of preference
+
+        Returns:
+            list[SearchResult]: The passages that fit
+        """
+        packed = []
+        remaining = self.token_budget
+        for passage in passages:
+            tokens = ContextManager.count_tokens(passage.chunk_text)
+            if tokens <= remaining:
+                packed.append(passage)
+                remaining -= tokens
+            elif not packed:
+                packed.append(passage.model_copy(update={"chunk_text": ContextManager.truncate_text(passage.chunk_text, remaining)}))
+                remaining = 0
+        return packed
+
+    def prepare(self, query_embedding: list[float], results: list[SearchResult], embeddings: dict[str, list[float]]) -> list[SearchResult]:
+        """
+        Select, merge and pack retrieval results for the prompt
+
+        Args:
+            query_embedding: Embedding of the query
+            results: Over-fetched candidate results, most relevant first
+            embeddings: Chunk embeddings by chunk id
+
+        Returns:
+            list[SearchResult]: Passages to add to the prompt
+        """
+        passages = self.pack(self.merge_adjacent(self.select(query_embedding, results, embeddings)))
+        logger.info(
+            f"Packed {len(results)} candidates into {len(passages)} passages "
+            f"({sum(ContextManager.count_tokens(passage.chunk_text) for passage in passages)} estimated tokens)"
+        )
+        return passages
+
+
+context_packer = ContextPacker()
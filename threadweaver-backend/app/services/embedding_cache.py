@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class QueryEmbeddingCache:
+    """
+    Two-tier cache of query embeddings.
+
+    The memory tier is a bounded LRU keyed by model name and normalized query
+    text. The optional disk tier is a SQLite file that survives restarts;
+    embeddings are stored there as float32 blobs and promoted to memory on a hit.
+    """
+    def __init__(self, max_entries: int, disk_path: Optional[str] = None):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of embeddings kept in memory
+            disk_path: SQLite file for the disk tier, or None to keep the cache in memory only
+        """
+        self.max_entries = max_entries
+        self._memory: OrderedDict[tuple[str, str], list[float]] = OrderedDict()
+        self._disk: Optional[sqlite3.Connection] = None
+        self._disk_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path:
+            try:
+                self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+                self._disk.execute(
+                    "CREATE TABLE IF NOT EXISTS query_embeddings "
+                    "(model TEXT NOT NULL, query TEXT NOT NULL, embedding BLOB NOT NULL, PRIMARY KEY (model, query))"
+                )
+                self._disk.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error opening query embedding cache at {disk_path}, using memory only: {e}")
+                self._disk = None
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        """ Normalize query text so whitespace differences share an entry """
+        return " ".join(query.split())
+
+    def _read_disk(self, key: tuple[str, str]) -> Optional[list[float]]:
+        """ Read an embedding from the disk tier """
+        with self._disk_lock:
+            row = self._disk.execute(
+                "SELECT embedding FROM query_embeddings WHERE model = ? AND query = ?", key
+            ).fetchone()
+        if row is None:
+            return None
+        return array("f", row[0]).tolist()
+
+    def _write_disk(self, key: tuple[str, str], embedding: list[float]):
+        """ Write an embedding to the disk tier """
+        with self._disk_lock:
+            self._disk.execute(
+                "INSERT OR REPLACE INTO query_embeddings (model, query, embedding) VALUES (?, ?, ?)",
+                (*key, array("f", embedding).tobytes()),
+            )
+            self._disk.commit()
+
+    def _remember(self, key: tuple[str, str], embedding: list[float]):
+        """ Add an embedding to the memory tier, evicting the least recently used """
+        self._memory[key] = embedding
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def _lookup(self, key: tuple[str, str]) -> Optional[list[float]]:
+        """ Look an embedding up in memory, then on disk, counting hits """
+        embedding = self._memory.get(key)
+        if embedding is not None:
+            self._memory.move_to_end(key)
+            self.memory_hits += 1
+            return embedding
+
+        if self._disk is not None:
+            try:
+                embedding = await asyncio.to_thread(self._read_disk, key)
+            except sqlite3.Error as e:
+                logger.error(f"Error reading query embedding cache: {e}")
+            if embedding is not None:
+                self.disk_hits += 1
+                self._remember(key, embedding)
+                return embedding
+        return None
+
+    async def _store(self, key: tuple[str, str], embedding: list[float]):
+        """ Store a new embedding in both tiers """
+        self._remember(key, embedding)
+        if self._disk is not None:
+            try:
+                await asyncio.to_thread(self._write_disk, key, embedding)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing query embedding cache: {e}")
+
+    async def get_or_embed(self, query: str, model: str, embed: Callable[[str], Awaitable[list[float]]]) -> list[float]:
+        """
+        Get a query embedding from the cache, embedding and storing it on a miss
+
+        Args:
+            query: The query text
+            model: Name of the embedding model
+            embed: Coroutine function that embeds the query
+
+        Returns:
+            list[float]: The query embedding
+        """
+        key = (model, self.normalize(query))
+        embedding = await self._lookup(key)
+        if embedding is not None:
+            return embedding
+
+        self.misses += 1
+        embedding = await embed(key[1])
+        await self._store(key, embedding)
+        return embedding
+
+    async def get_or_embed_many(
+        self,
+        queries: list[str],
+        model: str,
+        embed_many: Callable[[list[str]], Awaitable[list[list[float]]]],
+    ) -> list[list[float]]:
+        """
+        Get embeddings for several queries, embedding all misses in a single request
+
+        Args:
+            queries: The query texts
+            model: Name of the embedding model
+            embed_many: Coroutine function that embeds a list of texts
+
+        Returns:
+            list[list[float]]: One embedding per query, in order
+        """
+        keys = [(model, self.normalize(query)) for query in queries]
+        embeddings: dict[tuple[str, str], list[float]] = {}
+        missing = []
+        # Duplicate queries are looked up and embedded once
+        for key in dict.fromkeys(keys):
+            embedding = await self._lookup(key)
+            if embedding is None:
+                missing.append(key)
+            else:
+                embeddings[key] = embedding
+
+        if missing:
+            self.misses += len(missing)
+            for key, embedding in zip(missing, await embed_many([key[1] for key in missing])):
+                embeddings[key] = embedding
+                await self._store(key, embedding)
+        return [embeddings[key] for key in keys]
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count, hits per tier, misses and overall hit rate
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "entries": len(self._memory),
+            "disk_enabled": self._disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+        }
+
+
+query_embedding_cache = QueryEmbeddingCache(
+    max_entries=config.query_embedding_cache_max_entries,
+    disk_path=config.query_embedding_cache_path,
+)
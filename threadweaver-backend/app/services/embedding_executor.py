@@ -0,0 +1,211 @@
+import asyncio
+import logging
+import time as t
+from typing import Awaitable, Callable, Optional
+
+import openai
+
+from app.services.context_manager import CHARS_PER_TOKEN
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Errors worth retrying a batch for; anything else fails the embedding call right away
+RETRYABLE_ERRORS = (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError)
+
+
+class _AdaptiveLimiter:
+    """
+    Concurrency limit that halves on rate limiting and grows back by one after
+    a run of successes (additive increase, multiplicative decrease). A rate
+    limit also pauses every new batch until the cooldown has passed.
+    """
+    def __init__(self, max_limit: int, increase_after: int = 4):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.increase_after = increase_after
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self._successes = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        delay = self.cooldown_until - t.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self, rate_limited: bool, backoff_seconds: float = 0.0):
+        async with self._condition:
+            self.in_flight -= 1
+            if rate_limited:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                self.cooldown_until = max(self.cooldown_until, t.monotonic() + backoff_seconds)
+            else:
+                self._successes += 1
+                if self._successes >= self.increase_after and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._condition.notify_all()
+
+
+class EmbeddingExecutor:
+    """
+    Embeds many texts as concurrent, token-aware batches.
+
+    Texts are grouped into batches bounded by input count and estimated
+    tokens, and batches run concurrently up to a limit. On a rate limit (429)
+    the limit is halved, new batches wait out a backoff (the server's
+    Retry-After when given) and only the failed batch is retried; the limit
+    recovers as batches succeed.
+    """
+    def __init__(
+        self,
+        embed_batch: Optional[Callable[[list[str]], Awaitable[list[list[float]]]]] = None,
+        max_batch_size: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        max_retries: Optional[int] = None,
+        backoff_seconds: Optional[float] = None,
+    ):
+        """
+        Initialize the executor
+
+        Args:
+            embed_batch: Coroutine function embedding one batch (defaults to the shared
+                embedding model, with the client's own retries disabled)
+            max_batch_size: Maximum texts per request
+            max_batch_tokens: Maximum estimated tokens per request
+            max_concurrency: Maximum requests in flight
+            max_retries: Retries per batch before the embedding call fails
+            backoff_seconds: Backoff before the first retry, doubled on each further retry
+        """
+        self._embed_batch = embed_batch
+        self.max_batch_size = max_batch_size or config.embedding_batch_size
+        self.max_batch_tokens = max_batch_tokens or config.embedding_batch_max_tokens
+        self.max_retries = max_retries if max_retries is not None else config.embedding_max_retries
+        self.backoff_seconds = backoff_seconds or config.embedding_backoff_seconds
+        self._limiter = _AdaptiveLimiter(max_concurrency or config.embedding_max_concurrency)
+        self.chunks = 0
+        self.tokens = 0
+        self.batches = 0
+        self.rate_limited = 0
+        self.retries = 0
+        self.busy_seconds = 0.0
+
+    @property
+    def embed_batch(self) -> Callable[[list[str]], Awaitable[list[list[float]]]]:
+        """ The function that embeds one batch """
+        return self._embed_batch or config.get_embedding_model(max_retries=0).aembed_documents
+
+    @staticmethod
+    def estimate_tokens(text: str) -> int:
+        """ Estimate the tokens in a text """
+        return len(text) // CHARS_PER_TOKEN + 1
+
+    def _batches(self, texts: list[str]) -> list[tuple[int, int]]:
+        """ Split texts into (start, end) ranges within the batch size and token limits """
+        ranges = []
+        start = 0
+        tokens = 0
+        for index, text in enumerate(texts):
+            text_tokens = self.estimate_tokens(text)
+            if index > start and (index - start >= self.max_batch_size or tokens + text_tokens > self.max_batch_tokens):
+                ranges.append((start, index))
+                start, tokens = index, 0
+            tokens += text_tokens
+        if start < len(texts):
+            ranges.append((start, len(texts)))
+        return ranges
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """ Backoff before retrying, preferring the server's Retry-After header """
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            return self.backoff_seconds * 2 ** attempt
+
+    async def _run_batch(self, texts: list[str]) -> list[list[float]]:
+        """ Embed one batch, retrying it on rate limits and transient errors """
+        for attempt in range(self.max_retries + 1):
+            await self._limiter.acquire()
+            try:
+                embeddings = await self.embed_batch(texts)
+            except RETRYABLE_ERRORS as e:
+                rate_limited = isinstance(e, openai.RateLimitError)
+                delay = self._retry_delay(e, attempt)
+                await self._limiter.release(rate_limited=rate_limited, backoff_seconds=delay)
+                self.rate_limited += rate_limited
+                if attempt == self.max_retries:
+                    raise
+                self.retries += 1
+                logger.warning(f"Embedding batch of {len(texts)} failed ({type(e).__name__}), retrying in {delay:.2f}s")
+                if not rate_limited:
+                    await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                await self._limiter.release(rate_limited=False)
+                raise
+            await self._limiter.release(rate_limited=False)
+            return embeddings
+
+    async def embed(self, texts: list[str]) -> list[list[float]]:
+        """
+        Embed texts
+
+        Args:
+            texts: The texts to embed
+
+        Returns:
+            list[list[float]]: One embedding per text, in order
+
+        Raises:
+            openai.OpenAIError: If a batch still fails after max_retries retries
+        """
+        if not texts:
+            return []
+
+        started = t.perf_counter()
+        ranges = self._batches(texts)
+        tasks = [asyncio.create_task(self._run_batch(texts[start:end])) for start, end in ranges]
+        try:
+            results = await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        self.chunks += len(texts)
+        self.tokens += sum(self.estimate_tokens(text) for text in texts)
+        self.batches += len(ranges)
+        self.busy_seconds += t.perf_counter() - started
+        logger.info(f"Embedded {len(texts)} texts in {len(ranges)} batches in {(t.perf_counter() - started) * 1000:.0f}ms")
+        return [embedding for batch in results for embedding in batch]
+
+    def stats(self) -> dict:
+        """
+        Get executor statistics
+
+        Returns:
+            dict: Chunks, estimated tokens and batches embedded, current concurrency limit,
+                rate limits, retries and throughput over the wall time of embed calls
+        """
+        return {
+            "chunks": self.chunks,
+            "tokens": self.tokens,
+            "batches": self.batches,
+            "concurrency_limit": self._limiter.limit,
+            "rate_limited": self.rate_limited,
+            "retries": self.retries,
+            "chunks_per_second": round(self.chunks / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+            "tokens_per_second": round(self.tokens / self.busy_seconds, 1) if self.busy_seconds else 0.0,
+        }
+
+
+embedding_executor = EmbeddingExecutor()
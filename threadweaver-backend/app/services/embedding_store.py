@@ -0,0 +1,131 @@
+import asyncio
+import hashlib
+import logging
+from typing import Optional
+
+from app.db.pgvector import from_pgvector_literal, to_pgvector_literal
+from app.db.supabase_client import get_supabase_connection
+from app.services.embedding_executor import embedding_executor
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Hashes per lookup request; they are sent in the query string, so keep the URL short
+LOOKUP_BATCH_SIZE = 100
+
+
+class ChunkEmbeddingStore:
+    """
+    Content-addressed store of chunk embeddings (the embedding_store table).
+
+    Entries are keyed by the user, the SHA-256 of the chunk text and the
+    embedding model, so a chunk whose exact text the same user embedded
+    before reuses the stored vector. Entries are never shared between users:
+    reuse counts are reported per upload, and a shared store would reveal
+    whether someone else had uploaded a given text. Texts are looked up in bulk; only the misses are
+    sent to the embeddings API, and their vectors are added to the store.
+    """
+    def __init__(self, supabase_client, lookup_batch_size: int = LOOKUP_BATCH_SIZE):
+        """
+        Initialize the store
+
+        Args:
+            supabase_client: Supabase client used to read and write the store
+            lookup_batch_size: Hashes looked up per request
+        """
+        self.supabase_client = supabase_client
+        self.lookup_batch_size = lookup_batch_size
+        self.reused = 0
+        self.embedded = 0
+        self.errors = 0
+
+    @staticmethod
+    def content_hash(text: str) -> str:
+        """ SHA-256 hex digest of a chunk's text """
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def _fetch(self, user_id: str, model: str, hashes: list[str]) -> dict[str, list[float]]:
+        """ Read the user's stored embeddings for a list of hashes """
+        found = {}
+        for start in range(0, len(hashes), self.lookup_batch_size):
+            response = (
+                self.supabase_client.table("embedding_store")
+                .select("content_hash, embedding")
+                .eq("user_id", user_id)
+                .eq("model", model)
+                .in_("content_hash", hashes[start:start + self.lookup_batch_size])
+                .execute()
+            )
+            for row in response.data:
+                found[row["content_hash"]] = from_pgvector_literal(row["embedding"])
+        return found
+
+    def _save(self, rows: list[dict]):
+        """ Add embeddings to the store, leaving existing entries untouched """
+        self.supabase_client.table("embedding_store").upsert(
+            rows, on_conflict="user_id,content_hash,model", ignore_duplicates=True
+        ).execute()
+
+    async def embed(self, texts: list[str], user_id: str, model: Optional[str] = None) -> tuple[list[list[float]], int]:
+        """
+        Get embeddings for a user's chunk texts, embedding only texts the user's store does not have
+
+        Errors reading or writing the store are logged and the texts are embedded
+        as usual, so the store can only save work, never fail an ingestion.
+
+        Args:
+            texts: The chunk texts
+            user_id: The user whose stored embeddings may be reused
+            model: Name of the embedding model (defaults to the configured model)
+
+        Returns:
+            tuple[list[list[float]], int]: One embedding per text, in order, and the
+                number of texts that were sent to the embeddings API
+        """
+        model = model or config.embedding_model
+        hashes = [self.content_hash(text) for text in texts]
+        # Repeated texts within the batch are looked up and embedded once
+        unique = dict(zip(hashes, texts))
+
+        try:
+            embeddings = await asyncio.to_thread(self._fetch, user_id, model, list(unique))
+        except Exception as e:
+            logger.error(f"Error reading the embedding store, embedding all {len(unique)} texts: {e}")
+            self.errors += 1
+            embeddings = {}
+
+        missing = [content_hash for content_hash in unique if content_hash not in embeddings]
+        if missing:
+            new_embeddings = await embedding_executor.embed([unique[content_hash] for content_hash in missing])
+            embeddings.update(zip(missing, new_embeddings))
+            rows = [
+                {"user_id": user_id, "content_hash": content_hash, "model": model, "embedding": to_pgvector_literal(embeddings[content_hash])}
+                for content_hash in missing
+            ]
+            try:
+                await asyncio.to_thread(self._save, rows)
+            except Exception as e:
+                logger.error(f"Error writing {len(rows)} embeddings to the embedding store: {e}")
+                self.errors += 1
+
+        self.embedded += len(missing)
+        self.reused += len(texts) - len(missing)
+        return [embeddings[content_hash] for content_hash in hashes], len(missing)
+
+    def stats(self) -> dict:
+        """
+        Get store statistics
+
+        Returns:
+            dict: Chunks reused from the store, chunks embedded, store errors and reuse rate
+        """
+        total = self.reused + self.embedded
+        return {
+            "reused": self.reused,
+            "embedded": self.embedded,
+            "errors": self.errors,
+            "reuse_rate": round(self.reused / total, 3) if total else 0.0,
+        }
+
+
+chunk_embedding_store = ChunkEmbeddingStore(get_supabase_connection())
@@ -0,0 +1,203 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Optional
+
+from app.services.chunking import create_chunker
+from app.services.extractors import get_extractor
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Chunks sent from a worker process per message
+CHUNK_BATCH_SIZE = 64
+# Batches a worker may get ahead of the ingestion consuming them
+QUEUE_BATCHES = 4
+# Seconds between checks for a stop request or a finished worker while waiting on the queue
+POLL_SECONDS = 0.2
+
+
+def _put(batches, stop, item) -> bool:
+    """ Put an item on the queue, waiting for room; returns False if the consumer stopped """
+    while not stop.is_set():
+        try:
+            batches.put(item, timeout=POLL_SECONDS)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _extract_chunks(file_path: str, filename: str, chunker, batches, stop):
+    """
+    Extract and chunk a file in a worker process, sending (chunks, bytes_read) batches
+
+    bytes_read is None while the extractor does not read the file front to back.
+
+    Raises:
+        ValueError: If the file type is not supported or the file cannot be parsed
+    """
+    extractor = get_extractor(filename)
+    if extractor is None:
+        raise ValueError(f"Unsupported file type: {filename}")
+
+    batch = []
+    with open(file_path, "rb") as file:
+        try:
+            for chunk in chunker.chunk_iter(extractor.extract(file)):
+                batch.append(chunk)
+                if len(batch) == CHUNK_BATCH_SIZE:
+                    if not _put(batches, stop, (batch, file.tell() if extractor.sequential else None)):
+                        return
+                    batch = []
+        except ValueError:
+            raise
+        except Exception as e:
+            # Parsing the same file again fails the same way, so report it as a bad file
+            raise ValueError(f"Could not extract text from {filename}: {type(e).__name__}: {e}") from None
+        _put(batches, stop, (batch, os.fstat(file.fileno()).st_size))
+
+
+def _next_batch(batches, future: Future) -> Optional[tuple]:
+    """ Wait for the next batch, or return None once the worker has finished and the queue is drained """
+    while True:
+        try:
+            return batches.get(timeout=POLL_SECONDS)
+        except queue.Empty:
+            if future.done():
+                # The worker may have put its last batch after the wait timed out and then finished
+                try:
+                    return batches.get_nowait()
+                except queue.Empty:
+                    return None
+
+
+class ChunkExtractionPool:
+    """
+    Extracts and chunks uploaded files in a pool of worker processes.
+
+    Parsing (PDF, DOCX, HTML, Markdown) and splitting are CPU-bound, so they
+    run outside the event loop's process and don't stall other requests. A
+    worker streams chunks back in batches through a bounded queue: it pauses
+    when the ingestion falls behind, so neither process holds more than a few
+    batches of a large file at once.
+    """
+    def __init__(self, max_workers: int, queue_batches: int = QUEUE_BATCHES):
+        """
+        Initialize the pool
+
+        Args:
+            max_workers: Worker processes
+            queue_batches: Chunk batches a worker may get ahead of the consumer
+        """
+        self.max_workers = max_workers
+        self.queue_batches = queue_batches
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._start_lock = threading.Lock()
+        self.files = 0
+        self.chunks_extracted = 0
+        self.failures = 0
+
+    def _start(self) -> tuple[ProcessPoolExecutor, object]:
+        """ Start the worker processes and the queue manager on first use """
+        with self._start_lock:
+            if self._executor is None:
+                # spawn: forking a process that runs threads (the event loop's to_thread pool) is unsafe
+                context = multiprocessing.get_context("spawn")
+                self._manager = context.Manager()
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                logger.info(f"Started chunk extraction pool with {self.max_workers} worker processes")
+            return self._executor, self._manager
+
+    async def chunks(self, file_path: str, filename: str, progress=None) -> AsyncIterator[str]:
+        """
+        Extract and chunk a file
+
+        Args:
+            file_path: Path of the file
+            filename: Original file name, which selects the extractor
+            progress: IngestionProgress to report bytes read into, if any
+
+        Yields:
+            str: Chunks in document order
+
+        Raises:
+            ValueError: If the file type is not supported or the file cannot be parsed
+        """
+        executor, manager = await asyncio.to_thread(self._start)
+        batches = manager.Queue(maxsize=self.queue_batches)
+        stop = manager.Event()
+        try:
+            future = executor.submit(
+                # The chunker is built from this process's settings and pickled to the worker
+                _extract_chunks, file_path, filename, create_chunker(), batches, stop
+            )
+        except BrokenProcessPool:
+            self._reset()
+            raise
+
+        self.files += 1
+        try:
+            while (item := await asyncio.to_thread(_next_batch, batches, future)) is not None:
+                chunks, bytes_read = item
+                if progress is not None and bytes_read is not None:
+                    progress.bytes_read = bytes_read
+                self.chunks_extracted += len(chunks)
+                for chunk in chunks:
+                    yield chunk
+            await asyncio.wrap_future(future)
+        except BrokenProcessPool:
+            # A worker died (e.g. out of memory); start fresh processes for the next file
+            self.failures += 1
+            self._reset()
+            raise
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            # The consumer stopped early (failure or cancellation); let the worker exit
+            if not future.done():
+                stop.set()
+
+    def _reset(self):
+        """ Drop a broken executor so the next file starts a new one """
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    async def close(self):
+        """
+        Stop the worker processes and the queue manager
+        """
+        with self._start_lock:
+            executor, manager = self._executor, self._manager
+            self._executor = self._manager = None
+        if executor is not None:
+            await asyncio.to_thread(executor.shutdown, True, cancel_futures=True)
+        if manager is not None:
+            await asyncio.to_thread(manager.shutdown)
+
+    def stats(self) -> dict:
+        """
+        Get pool statistics
+
+        Returns:
+            dict: Worker count, files processed, chunks extracted and failures
+        """
+        return {
+            "workers": self.max_workers,
+            "running": self._executor is not None,
+            "files": self.files,
+            "chunks_extracted": self.chunks_extracted,
+            "failures": self.failures,
+        }
+
+
+chunk_extraction_pool = ChunkExtractionPool(max_workers=config.extraction_workers)
@@ -0,0 +1,256 @@
+import codecs
+import os
+import re
+import zipfile
+from abc import ABC, abstractmethod
+from html.parser import HTMLParser
+from typing import BinaryIO, Iterator, Optional
+from xml.etree import ElementTree
+
+from config import config
+
+
+class Extractor(ABC):
+    """
+    Extracts the text of one kind of file as a stream of pieces.
+
+    Subclasses set the file extensions they handle and implement extract,
+    yielding text as it is parsed (e.g. page by page) so memory stays bounded
+    on large files. Extractors run in worker processes, so register them with
+    register_extractor when their module is imported.
+    """
+    extensions: tuple[str, ...] = ()
+    # Whether extract reads the file front to back, so the file position measures progress
+    sequential: bool = True
+
+    @abstractmethod
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        """
+        Extract a file's text
+
+        Args:
+            file: The file, opened in binary mode
+
+        Yields:
+            str: Text in document order, in pieces of any size
+
+        Raises:
+            ValueError: If the file cannot be parsed
+        """
+
+
+def _decode_blocks(file: BinaryIO, errors: str = "strict") -> Iterator[str]:
+    """ Read and decode a UTF-8 file block by block, keeping characters split across blocks whole """
+    decoder = codecs.getincrementaldecoder("utf-8")(errors=errors)
+    while block := file.read(config.ingestion_read_size_bytes):
+        text = decoder.decode(block)
+        if text:
+            yield text
+    text = decoder.decode(b"", final=True)
+    if text:
+        yield text
+
+
+def _lines(file: BinaryIO) -> Iterator[str]:
+    """ Read a UTF-8 file line by line (lines keep their newline) """
+    pending = ""
+    for text in _decode_blocks(file):
+        lines = (pending + text).split("\n")
+        pending = lines.pop()
+        for line in lines:
+            yield line + "\n"
+    if pending:
+        yield pending
+
+
+class TextExtractor(Extractor):
+    """ Plain UTF-8 text """
+    extensions = (".txt",)
+
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        return _decode_blocks(file)
+
+
+class MarkdownExtractor(Extractor):
+    """ Markdown, with formatting markup removed and the text of links, images and code kept """
+    extensions = (".md", ".markdown")
+
+    FENCE = re.compile(r"^\s*(```|~~~)")
+    HEADING = re.compile(r"^\s{0,3}#{1,6}\s+")
+    BLOCKQUOTE = re.compile(r"^\s{0,3}>\s?")
+    RULE = re.compile(r"^\s{0,3}([-*_])(\s*\1){2,}\s*$")
+    IMAGE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+    LINK = re.compile(r"\[([^\]]+)\]\([^)]*\)")
+    STRONG = re.compile(r"(\*\*|__|~~)(.+?)\1")
+    EMPHASIS = re.compile(r"(?<![\w*])[*_](\S(?:.*?\S)?)[*_](?![\w*])")
+    CODE = re.compile(r"`([^`]*)`")
+
+    def _clean(self, line: str) -> str:
+        line = self.HEADING.sub("", line)
+        line = self.BLOCKQUOTE.sub("", line)
+        if self.RULE.match(line):
+            return "\n"
+        line = self.IMAGE.sub(r"\1", line)
+        line = self.LINK.sub(r"\1", line)
+        line = self.STRONG.sub(r"\2", line)
+        line = self.EMPHASIS.sub(r"\1", line)
+        return self.CODE.sub(r"\1", line)
+
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        in_code = False
+        for line in _lines(file):
+            if self.FENCE.match(line):
+                in_code = not in_code
+                continue
+            yield line if in_code else self._clean(line)
+
+
+class _HTMLTextParser(HTMLParser):
+    """ Collects visible text, with line breaks at block elements """
+    SKIPPED = {"script", "style", "noscript", "template", "svg"}
+    BLOCKS = {
+        "address", "article", "aside", "blockquote", "br", "dd", "div", "dl", "dt", "figcaption", "footer",
+        "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section",
+        "table", "title", "tr", "ul",
+    }
+
+    def __init__(self):
+        super().__init__()
+        self.parts: list[str] = []
+        self.skip_depth = 0
+        self.pre_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIPPED:
+            self.skip_depth += 1
+        elif tag == "pre":
+            self.pre_depth += 1
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+        elif tag in ("td", "th"):
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIPPED:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag == "pre":
+            self.pre_depth = max(0, self.pre_depth - 1)
+        if tag in self.BLOCKS:
+            self.parts.append("\n")
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        # Whitespace is only significant inside <pre>
+        self.parts.append(data if self.pre_depth else re.sub(r"\s+", " ", data))
+
+    def take(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+class HTMLExtractor(Extractor):
+    """ HTML, keeping visible text only """
+    extensions = (".html", ".htm")
+
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        parser = _HTMLTextParser()
+        # Pages often declare other charsets; undecodable bytes are replaced rather than failing the upload
+        for text in _decode_blocks(file, errors="replace"):
+            parser.feed(text)
+            if text := parser.take():
+                yield text
+        parser.close()
+        if text := parser.take():
+            yield text
+
+
+class DocxExtractor(Extractor):
+    """ Word documents, paragraph by paragraph (including paragraphs in tables) """
+    extensions = (".docx",)
+    sequential = False
+
+    W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        try:
+            archive = zipfile.ZipFile(file)
+            document = archive.open("word/document.xml")
+        except (zipfile.BadZipFile, KeyError) as e:
+            raise ValueError(f"Not a valid .docx file: {e}") from e
+
+        with archive, document:
+            # iterparse keeps memory bounded: each paragraph is cleared once its text is taken
+            for _, element in ElementTree.iterparse(document, events=("end",)):
+                if element.tag != self.W + "p":
+                    continue
+                parts = []
+                for node in element.iter():
+                    if node.tag == self.W + "t" and node.text:
+                        parts.append(node.text)
+                    elif node.tag == self.W + "tab":
+                        parts.append("\t")
+                    elif node.tag in (self.W + "br", self.W + "cr"):
+                        parts.append("\n")
+                element.clear()
+                yield "".join(parts) + "\n\n"
+
+
+class PDFExtractor(Extractor):
+    """ PDFs, page by page (requires pypdf) """
+    extensions = (".pdf",)
+    sequential = False
+
+    def extract(self, file: BinaryIO) -> Iterator[str]:
+        from pypdf import PdfReader
+        from pypdf.errors import PdfReadError
+
+        try:
+            reader = PdfReader(file)
+            # Pages are parsed one at a time as they are iterated
+            for page in reader.pages:
+                yield (page.extract_text() or "") + "\n\n"
+        except PdfReadError as e:
+            raise ValueError(f"Not a readable PDF: {e}") from e
+
+
+EXTRACTORS: dict[str, Extractor] = {}
+
+
+def register_extractor(extractor: Extractor):
+    """
+    Register an extractor for its file extensions, replacing any existing one
+
+    Args:
+        extractor: The extractor
+    """
+    for extension in extractor.extensions:
+        EXTRACTORS[extension.lower()] = extractor
+
+
+def get_extractor(filename: str) -> Optional[Extractor]:
+    """
+    Get the extractor for a file name
+
+    Args:
+        filename: The file name
+
+    Returns:
+        Optional[Extractor]: The extractor for its extension, or None if the type is not supported
+    """
+    return EXTRACTORS.get(os.path.splitext(filename or "")[1].lower())
+
+
+def supported_extensions() -> list[str]:
+    """
+    Get the file extensions that can be ingested
+
+    Returns:
+        list[str]: The extensions, e.g. [".docx", ".htm", ...]
+    """
+    return sorted(EXTRACTORS)
+
+
+for _extractor in (TextExtractor(), MarkdownExtractor(), HTMLExtractor(), DocxExtractor(), PDFExtractor()):
+    register_extractor(_extractor)
@@ -0,0 +1,451 @@
+import asyncio
+import logging
+import pickle
+import tempfile
+import time as t
+import uuid
+from collections import deque
+from typing import AsyncIterator, Awaitable, Callable, Iterator, Optional
+
+import numpy as np
+
+from app.db.chunk_writer import chunk_bulk_writer
+from app.db.pgvector import to_pgvector_literal
+from app.db.supabase_client import get_supabase_connection
+from app.services.embedding_executor import embedding_executor
+from app.services.embedding_store import chunk_embedding_store
+from app.services.vector_index import local_vector_index
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per request when reading a document's stored chunks for a re-ingestion diff
+STORED_CHUNKS_PAGE_SIZE = 1000
+# Chunk ids per request when removing the chunks of a failed re-ingestion
+DELETE_BATCH_SIZE = 100
+
+
+class IngestionProgress:
+    """
+    Progress of one document's ingestion, updated as each window is stored
+
+    chunks_stored counts chunks embedded and written, or embedded and staged
+    when the document's chunks are written in one final transaction.
+    """
+    def __init__(self, document_id: str, total_bytes: Optional[int] = None):
+        """
+        Initialize the progress
+
+        Args:
+            document_id: The document being ingested
+            total_bytes: Size of the upload, if known
+        """
+        self.document_id = document_id
+        self.total_bytes = total_bytes
+        self.bytes_read = 0
+        self.chunks_stored = 0
+        self.chunks_reused = 0
+        self.chunks_embedded = 0
+        # Set when re-ingesting an existing document
+        self.chunks_unchanged = 0
+        self.chunks_moved = 0
+        self.chunks_deleted = 0
+        self.windows = 0
+        self.started_at = t.perf_counter()
+
+    def to_dict(self) -> dict:
+        """
+        Get the progress as a dict
+
+        Returns:
+            dict: Bytes read (and percent, when the size is known), chunks stored, reused from the
+                embedding store and embedded, chunks kept, moved and deleted by a re-ingestion,
+                windows and elapsed time
+        """
+        return {
+            "document_id": self.document_id,
+            "bytes_read": self.bytes_read,
+            "total_bytes": self.total_bytes,
+            "percent": round(100 * self.bytes_read / self.total_bytes, 1) if self.total_bytes else None,
+            "chunks_stored": self.chunks_stored,
+            "chunks_reused": self.chunks_reused,
+            "chunks_embedded": self.chunks_embedded,
+            "chunks_unchanged": self.chunks_unchanged,
+            "chunks_moved": self.chunks_moved,
+            "chunks_deleted": self.chunks_deleted,
+            "windows": self.windows,
+            "elapsed_ms": round((t.perf_counter() - self.started_at) * 1000, 1),
+        }
+
+
+class ChunkSpool:
+    """
+    Embedded chunk windows held in a temporary file until they are written.
+
+    Lets a document be embedded window by window, with one window in memory,
+    before any of its chunks are written, so the write runs as one short
+    transaction that doesn't wait on the embeddings API.
+    """
+    def __init__(self):
+        self._file = tempfile.TemporaryFile()
+        self.chunks = 0
+
+    def __enter__(self) -> "ChunkSpool":
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def append(self, records: list[dict]):
+        """
+        Stage a window of chunk records
+
+        Args:
+            records: Chunk records with their embeddings
+        """
+        # float32 is what pgvector stores, and a quarter the size of pickled Python floats
+        pickle.dump(
+            [{**record, "embedding": np.asarray(record["embedding"], dtype=np.float32)} for record in records],
+            self._file,
+        )
+        self.chunks += len(records)
+
+    def windows(self) -> Iterator[list[dict]]:
+        """
+        Read the staged windows back
+
+        Yields:
+            list[dict]: Chunk records of one window, in the order they were staged
+        """
+        self._file.seek(0)
+        while True:
+            try:
+                records = pickle.load(self._file)
+            except EOFError:
+                return
+            yield [{**record, "embedding": record["embedding"].tolist()} for record in records]
+
+
+class DocumentIngestionPipeline:
+    """
+    Embeds and stores a document's chunk stream in fixed-size windows.
+
+    Only one window of chunks and embeddings is held at a time, so peak memory
+    does not grow with the size of the document. A new version of an existing
+    document is diffed against its stored chunks instead (see reingest).
+    """
+    def __init__(self, supabase_client, window_size: Optional[int] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            supabase_client: Supabase client used to insert chunks
+            window_size: Chunks embedded and inserted together
+        """
+        self.supabase_client = supabase_client
+        self.window_size = window_size or config.ingestion_window_size
+
+    def _insert_chunks(self, records: list[dict]) -> list[dict]:
+        """ Insert chunk records through PostgREST, returning the inserted rows """
+        records = [{**record, "embedding": to_pgvector_literal(record["embedding"])} for record in records]
+        return self.supabase_client.table("chunks").insert(records).execute().data
+
+    async def _embed(self, texts: list[str], user_id: str, progress: IngestionProgress) -> list[list[float]]:
+        """ Embed a window of chunks, reusing stored embeddings of texts the user uploaded before """
+        if config.embedding_store_enabled:
+            embeddings, embedded = await chunk_embedding_store.embed(texts, user_id)
+        else:
+            embeddings, embedded = await embedding_executor.embed(texts), len(texts)
+        progress.chunks_embedded += embedded
+        progress.chunks_reused += len(texts) - embedded
+        return embeddings
+
+    async def _chunk_records(
+        self, document_id: str, user_id: str, window: list[tuple[int, str]], progress: IngestionProgress
+    ) -> list[dict]:
+        """ Embed one window of (chunk_index, text) chunks into chunk records """
+        embeddings = await self._embed([text for _, text in window], user_id, progress)
+        return [
+            {
+                "document_id": document_id,
+                "user_id": user_id,
+                "integration_type": "upload",
+                "chunk_index": chunk_index,
+                "original_text": text,
+                "content_hash": chunk_embedding_store.content_hash(text),
+                "embedding": embedding,
+            }
+            for (chunk_index, text), embedding in zip(window, embeddings)
+        ]
+
+    async def _write_chunks(self, user_id: str, records: list[dict]):
+        """ Insert chunk records through PostgREST and mirror them into the local vector index """
+        # The Supabase client is synchronous, so keep the insert off the event loop
+        rows = await asyncio.to_thread(self._insert_chunks, records)
+
+        # Mirror the new chunks into the user's local vector index, if it is loaded
+        await local_vector_index.add_chunks(user_id, [{**record, "id": row["id"]} for record, row in zip(records, rows)])
+
+    async def _flush(
+        self,
+        document_id: str,
+        user_id: str,
+        window: list[tuple[int, str]],
+        progress: IngestionProgress,
+        on_progress: Optional[Callable[[IngestionProgress], Awaitable[None]]],
+        spool: Optional[ChunkSpool] = None,
+    ):
+        """ Embed a window, insert it (or stage it in the spool) and report progress """
+        records = await self._chunk_records(document_id, user_id, window, progress)
+        if spool is None:
+            await self._write_chunks(user_id, records)
+        else:
+            spool.append(records)
+        progress.chunks_stored += len(records)
+        progress.windows += 1
+        logger.info(f"Ingestion progress: {progress.to_dict()}")
+        if on_progress:
+            await on_progress(progress)
+
+    async def ingest(
+        self,
+        document_id: str,
+        user_id: str,
+        chunk_stream: AsyncIterator[str],
+        progress: IngestionProgress,
+        on_progress: Optional[Callable[[IngestionProgress], Awaitable[None]]] = None,
+        document: Optional[dict] = None,
+    ) -> IngestionProgress:
+        """
+        Embed and store a stream of chunks for a document
+
+        Args:
+            document_id: The document the chunks belong to
+            user_id: The user who owns the document
+            chunk_stream: Chunks in document order
+            progress: Progress to update
+            on_progress: Awaited after each window is stored
+            document: Column values of a documents row to insert in the same transaction
+                as the chunks, which are then embedded first and written with the bulk
+                writer; None if the row already exists
+
+        Returns:
+            IngestionProgress: The final progress
+
+        Raises:
+            ValueError: If the stream has no chunks
+        """
+        if document is None:
+            await self._ingest_windows(document_id, user_id, chunk_stream, progress, on_progress)
+        else:
+            with ChunkSpool() as spool:
+                # Embed everything before opening the transaction, so a connection isn't held
+                # idle in transaction through embedding calls and rate-limit backoff
+                await self._ingest_windows(document_id, user_id, chunk_stream, progress, on_progress, spool)
+                async with chunk_bulk_writer.transaction() as transaction:
+                    await transaction.insert_document({"id": document_id, **document})
+                    for records in spool.windows():
+                        await transaction.copy_chunks([{**record, "id": str(uuid.uuid4())} for record in records])
+            # Load the committed chunks on the user's next search
+            local_vector_index.invalidate_user(user_id)
+
+        logger.info(f"Ingested document {document_id}: {progress.to_dict()}")
+        return progress
+
+    async def _ingest_windows(
+        self,
+        document_id: str,
+        user_id: str,
+        chunk_stream: AsyncIterator[str],
+        progress: IngestionProgress,
+        on_progress: Optional[Callable[[IngestionProgress], Awaitable[None]]],
+        spool: Optional[ChunkSpool] = None,
+    ):
+        """ Store (or stage) a chunk stream window by window, raising ValueError if it is empty """
+        window = []
+        async for chunk in chunk_stream:
+            window.append((progress.chunks_stored + len(window), chunk))
+            if len(window) == self.window_size:
+                await self._flush(document_id, user_id, window, progress, on_progress, spool)
+                window = []
+        if window:
+            await self._flush(document_id, user_id, window, progress, on_progress, spool)
+
+        if progress.chunks_stored == 0:
+            raise ValueError("File content is empty")
+
+    def _fetch_stored_chunks(self, document_id: str, user_id: str) -> dict[str, deque[tuple[str, int]]]:
+        """ Read a document's stored chunks as (id, chunk_index) pairs by content hash, in index order """
+        chunks = []
+        start = 0
+        while True:
+            # Paged by id and sorted here: chunk_index has no index (see migration 011)
+            rows = (
+                self.supabase_client.table("chunks")
+                .select("id, chunk_index, content_hash, original_text")
+                .eq("user_id", user_id)
+                .eq("document_id", document_id)
+                .order("id")
+                .range(start, start + STORED_CHUNKS_PAGE_SIZE - 1)
+                .execute()
+                .data
+            )
+            for row in rows:
+                # Chunks stored before content hashes were recorded are hashed here
+                content_hash = row.get("content_hash") or chunk_embedding_store.content_hash(row["original_text"] or "")
+                chunks.append((row["chunk_index"], row["id"], content_hash))
+            if len(rows) < STORED_CHUNKS_PAGE_SIZE:
+                break
+            start += STORED_CHUNKS_PAGE_SIZE
+
+        stored: dict[str, deque[tuple[str, int]]] = {}
+        for chunk_index, chunk_id, content_hash in sorted(chunks):
+            stored.setdefault(content_hash, deque()).append((chunk_id, chunk_index))
+        return stored
+
+    def _apply_chunk_diff(self, document_id: str, delete_ids: list[str], moves: dict[str, int]):
+        """ Delete removed chunks and renumber moved ones in one transaction """
+        self.supabase_client.rpc("apply_chunk_diff", {
+            "filter_document_id": document_id,
+            "delete_ids": delete_ids,
+            "move_ids": list(moves),
+            "move_indexes": list(moves.values()),
+        }).execute()
+
+    def _delete_chunk_ids(self, chunk_ids: list[str]):
+        """ Delete chunks by id """
+        for start in range(0, len(chunk_ids), DELETE_BATCH_SIZE):
+            self.supabase_client.table("chunks").delete().in_("id", chunk_ids[start:start + DELETE_BATCH_SIZE]).execute()
+
+    async def _commit_chunk_diff(self, document_id: str, spool: ChunkSpool, delete_ids: list[str], moves: dict[str, int]):
+        """ Insert the staged new chunks, delete removed ones and renumber moved ones """
+        if chunk_bulk_writer.enabled:
+            async with chunk_bulk_writer.transaction() as transaction:
+                for records in spool.windows():
+                    await transaction.copy_chunks([{**record, "id": str(uuid.uuid4())} for record in records])
+                await transaction.apply_chunk_diff(document_id, delete_ids, moves)
+            return
+
+        # PostgREST requests can't share a transaction: insert the new chunks only once the
+        # whole version is embedded, and remove them again if the rest of the diff fails
+        inserted = []
+        try:
+            for records in spool.windows():
+                rows = await asyncio.to_thread(self._insert_chunks, records)
+                inserted.extend(row["id"] for row in rows)
+            await asyncio.to_thread(self._apply_chunk_diff, document_id, delete_ids, moves)
+        except Exception:
+            if inserted:
+                try:
+                    await asyncio.to_thread(self._delete_chunk_ids, inserted)
+                except Exception as e:
+                    logger.error(f"Could not remove {len(inserted)} chunks of failed re-ingestion of {document_id}: {e}")
+            raise
+
+    async def reingest(
+        self,
+        document_id: str,
+        user_id: str,
+        chunk_stream: AsyncIterator[str],
+        progress: IngestionProgress,
+        on_progress: Optional[Callable[[IngestionProgress], Awaitable[None]]] = None,
+    ) -> IngestionProgress:
+        """
+        Update a document's stored chunks to a new version of its text
+
+        The new chunks are matched to the stored ones by content hash. Matched
+        chunks keep their row (and embedding), with chunk_index renumbered if
+        they moved; only unmatched new chunks are embedded, and stored chunks
+        left unmatched are deleted. Nothing is written until the whole new
+        version has been read and embedded: the new chunks are staged, then
+        inserted together with the deletes and renumbering in one transaction
+        when the bulk writer is enabled, so searches never see a mix of
+        versions and a failed attempt leaves the stored version as it was.
+
+        Args:
+            document_id: The document to update
+            user_id: The user who owns the document
+            chunk_stream: Chunks of the new version in document order
+            progress: Progress to update
+            on_progress: Awaited after each window of new chunks is stored
+
+        Returns:
+            IngestionProgress: The final progress
+
+        Raises:
+            ValueError: If the stream has no chunks (the stored chunks are kept)
+        """
+        stored = await asyncio.to_thread(self._fetch_stored_chunks, document_id, user_id)
+        moves: dict[str, int] = {}
+        window = []
+        chunk_index = 0
+        with ChunkSpool() as spool:
+            async for chunk in chunk_stream:
+                matches = stored.get(chunk_embedding_store.content_hash(chunk))
+                if matches:
+                    chunk_id, stored_index = matches.popleft()
+                    progress.chunks_unchanged += 1
+                    if stored_index != chunk_index:
+                        moves[chunk_id] = chunk_index
+                else:
+                    window.append((chunk_index, chunk))
+                    if len(window) == self.window_size:
+                        await self._flush(document_id, user_id, window, progress, on_progress, spool)
+                        window = []
+                chunk_index += 1
+            if window:
+                await self._flush(document_id, user_id, window, progress, on_progress, spool)
+
+            if chunk_index == 0:
+                raise ValueError("File content is empty")
+
+            delete_ids = [chunk_id for matches in stored.values() for chunk_id, _ in matches]
+            if spool.chunks or delete_ids or moves:
+                await self._commit_chunk_diff(document_id, spool, delete_ids, moves)
+                local_vector_index.invalidate_user(user_id)
+        progress.chunks_moved = len(moves)
+        progress.chunks_deleted = len(delete_ids)
+        logger.info(f"Re-ingested document {document_id}: {progress.to_dict()}")
+        return progress
+
+    def find_upload(self, user_id: str, filename: str, external_id: Optional[str] = None) -> Optional[str]:
+        """
+        Find a user's uploaded document to update on re-upload
+
+        Args:
+            user_id: The user who owns the document
+            filename: The uploaded file name, used when there is no external id
+            external_id: Caller-supplied id of the document
+
+        Returns:
+            Optional[str]: The document id, or None if the user has no such upload
+        """
+        query = self.supabase_client.table("documents").select("id").eq("user_id", user_id).eq("integration_type", "upload")
+        query = query.eq("external_id", external_id) if external_id else query.eq("original_filename", filename)
+        rows = query.limit(1).execute().data
+        return rows[0]["id"] if rows else None
+
+    def delete_chunks(self, document_id: str, user_id: str):
+        """
+        Delete the chunks stored for a document (e.g. before retrying a failed ingestion)
+
+        Args:
+            document_id: The document whose chunks to delete
+            user_id: The user who owns the document
+        """
+        response = self.supabase_client.table("chunks").delete().eq("document_id", document_id).execute()
+        if response.data:
+            local_vector_index.invalidate_user(user_id)
+
+    def delete_document(self, document_id: str, user_id: str):
+        """
+        Delete a document and any chunks already stored for it (e.g. after a failed ingestion)
+
+        Args:
+            document_id: The document to delete
+            user_id: The user who owns the document
+        """
+        self.delete_chunks(document_id, user_id)
+        self.supabase_client.table("documents").delete().eq("id", document_id).execute()
+
+ingestion_pipeline = DocumentIngestionPipeline(get_supabase_connection())
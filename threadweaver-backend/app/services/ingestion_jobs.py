@@ -0,0 +1,365 @@
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time as t
+import uuid
+from contextlib import aclosing
+from typing import Optional
+
+from fastapi import UploadFile
+
+from app.services.extraction_pool import chunk_extraction_pool
+from app.services.ingestion import IngestionProgress, ingestion_pipeline
+from app.services.semantic_cache import semantic_response_cache
+from config import config
+
+logger = logging.getLogger(__name__)
+
+JOB_COLUMNS = (
+    "id", "document_id", "user_id", "filename", "file_path", "total_bytes", "upsert", "document", "state", "attempts",
+    "chunks_done", "chunks_reused", "chunks_embedded", "error", "created_at", "started_at", "finished_at",
+)
+
+# Columns added after the job table was first created, with their definitions
+ADDED_COLUMNS = {
+    "chunks_reused": "INTEGER NOT NULL DEFAULT 0",
+    "chunks_embedded": "INTEGER NOT NULL DEFAULT 0",
+    "upsert": "INTEGER NOT NULL DEFAULT 0",
+    "document": "TEXT",
+}
+
+
+class IngestionQueueFull(Exception):
+    """ Raised when too many ingestion jobs are already waiting """
+
+
+class IngestionJobQueue:
+    """
+    Durable background queue for document ingestion.
+
+    Uploads are spooled to disk and recorded in a SQLite table, then processed
+    by a fixed pool of worker tasks, so the number of ingestions running at
+    once is bounded. Failed jobs are retried with exponential backoff, except
+    for errors retrying cannot fix (e.g. an empty or unparseable file). Jobs that
+    were queued or running when the process stopped are picked up again on start.
+
+    Job states: queued -> running -> succeeded | failed (running -> queued on a retry)
+    """
+    def __init__(
+        self,
+        queue_dir: str,
+        workers: int,
+        max_attempts: int,
+        retry_backoff_seconds: float,
+        max_queued_jobs: int,
+    ):
+        """
+        Initialize the queue
+
+        Args:
+            queue_dir: Directory holding the job database and spooled uploads
+            workers: Number of jobs processed concurrently
+            max_attempts: Attempts per job before it is marked failed
+            retry_backoff_seconds: Delay before the first retry, doubled on each further retry
+            max_queued_jobs: Jobs allowed to wait before new uploads are rejected
+        """
+        self.queue_dir = queue_dir
+        self.spool_dir = os.path.join(queue_dir, "uploads")
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_queued_jobs = max_queued_jobs
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._queue: asyncio.Queue[str] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._retry_tasks: set[asyncio.Task] = set()
+        # Live progress of running jobs, by job id
+        self._progress: dict[str, IngestionProgress] = {}
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+
+    def _execute(self, sql: str, parameters: tuple = ()) -> list[tuple]:
+        """ Run a statement against the job database """
+        with self._db_lock:
+            rows = self._db.execute(sql, parameters).fetchall()
+            self._db.commit()
+        return rows
+
+    def _update(self, job_id: str, **fields):
+        """ Update columns of a job """
+        assignments = ", ".join(f"{column} = ?" for column in fields)
+        self._execute(f"UPDATE ingestion_jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def _get(self, column: str, value: str) -> Optional[dict]:
+        """ Get the latest job matching a column value """
+        rows = self._execute(
+            f"SELECT {', '.join(JOB_COLUMNS)} FROM ingestion_jobs WHERE {column} = ? ORDER BY created_at DESC LIMIT 1",
+            (value,),
+        )
+        return dict(zip(JOB_COLUMNS, rows[0])) if rows else None
+
+    async def start(self):
+        """
+        Open the job database, requeue unfinished jobs and start the workers
+        """
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(self.queue_dir, "jobs.sqlite"), check_same_thread=False)
+        self._execute(
+            "CREATE TABLE IF NOT EXISTS ingestion_jobs ("
+            "id TEXT PRIMARY KEY, document_id TEXT NOT NULL, user_id TEXT NOT NULL, filename TEXT, "
+            "file_path TEXT NOT NULL, total_bytes INTEGER, upsert INTEGER NOT NULL DEFAULT 0, document TEXT, state TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, "
+            "chunks_done INTEGER NOT NULL DEFAULT 0, chunks_reused INTEGER NOT NULL DEFAULT 0, "
+            "chunks_embedded INTEGER NOT NULL DEFAULT 0, error TEXT, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        # Job databases created before columns were added
+        existing_columns = {row[1] for row in self._execute("PRAGMA table_info(ingestion_jobs)")}
+        for column, definition in ADDED_COLUMNS.items():
+            if column not in existing_columns:
+                self._execute(f"ALTER TABLE ingestion_jobs ADD COLUMN {column} {definition}")
+        self._execute("CREATE INDEX IF NOT EXISTS ingestion_jobs_document_idx ON ingestion_jobs (document_id)")
+
+        # Jobs interrupted by a restart start over; their partial chunks are deleted before each attempt
+        self._execute("UPDATE ingestion_jobs SET state = 'queued' WHERE state = 'running'")
+        for (job_id,) in self._execute("SELECT id FROM ingestion_jobs WHERE state = 'queued' ORDER BY created_at"):
+            self._queue.put_nowait(job_id)
+
+        self._tasks = [asyncio.create_task(self._worker(index)) for index in range(self.workers)]
+        logger.info(f"Ingestion job queue started with {self.workers} workers and {self._queue.qsize()} queued jobs")
+
+    async def close(self):
+        """
+        Stop the workers; unfinished jobs resume on the next start
+        """
+        for task in [*self._tasks, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._retry_tasks, return_exceptions=True)
+        self._tasks = []
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _spool(self, file: UploadFile, file_path: str):
+        """ Copy an upload to the spool directory, block by block """
+        file.file.seek(0)
+        with open(file_path, "wb") as spool_file:
+            while block := file.file.read(config.ingestion_read_size_bytes):
+                spool_file.write(block)
+
+    async def enqueue(
+        self,
+        document_id: str,
+        user_id: str,
+        file: UploadFile,
+        upsert: bool = False,
+        document: Optional[dict] = None,
+    ) -> str:
+        """
+        Spool an upload and queue it for ingestion
+
+        Args:
+            document_id: The document row the chunks belong to
+            user_id: The user who owns the document
+            file: The uploaded file
+            upsert: Whether the upload is a new version of an existing document, to be
+                diffed against its stored chunks
+            document: Column values of the documents row, if the job inserts it together
+                with the chunks instead of the row already existing
+
+        Returns:
+            str: The job id
+
+        Raises:
+            IngestionQueueFull: If max_queued_jobs jobs are already waiting
+        """
+        # Jobs waiting out a retry backoff are queued too, just not on the asyncio queue yet
+        waiting = self._queue.qsize() + len(self._retry_tasks)
+        if waiting >= self.max_queued_jobs:
+            raise IngestionQueueFull(f"{waiting} ingestion jobs are already queued")
+
+        job_id = str(uuid.uuid4())
+        file_path = os.path.join(self.spool_dir, job_id)
+        try:
+            await asyncio.to_thread(self._spool, file, file_path)
+            await asyncio.to_thread(
+                self._execute,
+                "INSERT INTO ingestion_jobs (id, document_id, user_id, filename, file_path, total_bytes, upsert, document, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 'queued', ?)",
+                (
+                    job_id, document_id, user_id, file.filename, file_path, file.size, int(upsert),
+                    json.dumps(document) if document is not None else None, t.time(),
+                ),
+            )
+        except BaseException:
+            # Without its job row nothing would ever process or remove the spooled file
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+        self._queue.put_nowait(job_id)
+        logger.info(f"Queued ingestion job {job_id} for document {document_id}")
+        return job_id
+
+    async def _worker(self, index: int):
+        """ Process jobs until cancelled """
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Ingestion worker {index} failed on job {job_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str):
+        """ Run one attempt of a job """
+        job = await asyncio.to_thread(self._get, "id", job_id)
+        if job is None or job["state"] != "queued":
+            return
+
+        attempts = job["attempts"] + 1
+        await asyncio.to_thread(self._update, job_id, state="running", attempts=attempts, started_at=t.time(), error=None)
+        progress = IngestionProgress(job["document_id"], total_bytes=job["total_bytes"])
+        self._progress[job_id] = progress
+
+        async def on_progress(progress: IngestionProgress):
+            # Chunks are stored window by window, so persist how far the job got
+            await asyncio.to_thread(
+                self._update,
+                job_id,
+                chunks_done=progress.chunks_stored,
+                chunks_reused=progress.chunks_reused,
+                chunks_embedded=progress.chunks_embedded,
+            )
+
+        try:
+            # A transactional attempt (with a document to insert) rolls back on failure and leaves nothing behind
+            if not job["upsert"] and not job["document"]:
+                # Start from a clean slate in case a previous attempt stored some windows
+                await asyncio.to_thread(ingestion_pipeline.delete_chunks, job["document_id"], job["user_id"])
+            # Text extraction and chunking run in a worker process
+            async with aclosing(chunk_extraction_pool.chunks(job["file_path"], job["filename"], progress)) as chunk_stream:
+                if job["upsert"]:
+                    # A re-ingestion writes nothing until the new version is fully read, so a failed attempt leaves the stored version intact
+                    await ingestion_pipeline.reingest(job["document_id"], job["user_id"], chunk_stream, progress, on_progress)
+                else:
+                    document = json.loads(job["document"]) if job["document"] else None
+                    await ingestion_pipeline.ingest(
+                        job["document_id"], job["user_id"], chunk_stream, progress, on_progress, document=document
+                    )
+        except asyncio.CancelledError:
+            # Shutting down; the job is requeued on the next start
+            raise
+        except Exception as e:
+            await self._handle_failure(job, attempts, e)
+            return
+        finally:
+            self._progress.pop(job_id, None)
+
+        await asyncio.to_thread(
+            self._update, job_id, state="succeeded", chunks_done=progress.chunks_stored,
+            chunks_reused=progress.chunks_reused, chunks_embedded=progress.chunks_embedded, finished_at=t.time(),
+        )
+        os.remove(job["file_path"])
+        self.succeeded += 1
+        # Cached answers were based on the previous document set
+        semantic_response_cache.invalidate_user(job["user_id"])
+        logger.info(f"Ingestion job {job_id} succeeded: {progress.to_dict()}")
+
+    async def _handle_failure(self, job: dict, attempts: int, error: Exception):
+        """ Schedule a retry, or mark the job failed and remove its document (unless it was an update) """
+        job_id = job["id"]
+        # ValueError covers empty, undecodable and unparseable files, which fail the same way every time
+        retryable = not isinstance(error, ValueError) and attempts < self.max_attempts
+        if retryable:
+            delay = self.retry_backoff_seconds * 2 ** (attempts - 1)
+            logger.warning(f"Ingestion job {job_id} attempt {attempts} failed, retrying in {delay}s: {error}")
+            await asyncio.to_thread(self._update, job_id, state="queued", error=str(error))
+            self.retries += 1
+            task = asyncio.create_task(self._requeue_after(job_id, delay))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+            return
+
+        logger.error(f"Ingestion job {job_id} failed after {attempts} attempts: {error}")
+        await asyncio.to_thread(self._update, job_id, state="failed", error=str(error), finished_at=t.time())
+        self.failed += 1
+        # A failed update keeps the existing document at its previous version.
+        # A transactional job never committed its document, so there is nothing to remove
+        if not job["upsert"] and not job["document"]:
+            try:
+                await asyncio.to_thread(ingestion_pipeline.delete_document, job["document_id"], job["user_id"])
+            except Exception as e:
+                logger.error(f"Error deleting document {job['document_id']} of failed job {job_id}: {e}")
+        os.remove(job["file_path"])
+
+    async def _requeue_after(self, job_id: str, delay: float):
+        """ Put a job back on the queue after a delay """
+        await asyncio.sleep(delay)
+        self._queue.put_nowait(job_id)
+
+    async def get_status(self, document_id: str) -> Optional[dict]:
+        """
+        Get the ingestion status of a document
+
+        Args:
+            document_id: The document
+
+        Returns:
+            Optional[dict]: The latest job for the document with its state, attempts, chunks
+                done, reused and embedded, error and timings, or None if there is no job
+        """
+        job = await asyncio.to_thread(self._get, "document_id", document_id)
+        if job is None:
+            return None
+
+        now = t.time()
+        progress = self._progress.get(job["id"])
+        started_at, finished_at = job["started_at"], job["finished_at"]
+        return {
+            "job_id": job["id"],
+            "document_id": job["document_id"],
+            "user_id": job["user_id"],
+            "state": job["state"],
+            "attempts": job["attempts"],
+            "chunks_done": progress.chunks_stored if progress else job["chunks_done"],
+            "chunks_reused": progress.chunks_reused if progress else job["chunks_reused"],
+            "chunks_embedded": progress.chunks_embedded if progress else job["chunks_embedded"],
+            "bytes_read": progress.bytes_read if progress else None,
+            "total_bytes": job["total_bytes"],
+            "error": job["error"],
+            "timings": {
+                "queued_ms": round(((started_at or now) - job["created_at"]) * 1000, 1),
+                "processing_ms": round(((finished_at or now) - started_at) * 1000, 1) if started_at else None,
+            },
+        }
+
+    def stats(self) -> dict:
+        """
+        Get queue statistics
+
+        Returns:
+            dict: Queued and running job counts and outcome counters
+        """
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": len(self._progress),
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "retries": self.retries,
+        }
+
+
+ingestion_job_queue = IngestionJobQueue(
+    queue_dir=config.ingestion_queue_dir,
+    workers=config.ingestion_workers,
+    max_attempts=config.ingestion_max_attempts,
+    retry_backoff_seconds=config.ingestion_retry_backoff_seconds,
+    max_queued_jobs=config.ingestion_max_queued_jobs,
+)
@@ -1,15 +1,90 @@
+import asyncio
+import hashlib
 import logging
 import time as t
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Optional
 from config import config
 import anthropic
-from app.schemas.requests import ChatRequest, ChatResponse, ChatMessage, MessageType, SearchResponse
-from app.integrations.NotionMCPClient import connect_to_notion_mcp_server
+import httpx
+from langchain_core.messages import AIMessage, HumanMessage
+from app.schemas.requests import ChatRequest, ChatResponse, ChatMessage, ChatUsage, MessageType, SearchResponse
+from app.integrations.NotionMCPClient import notion_mcp_pool
 from app.prompts.chat_system_prompt import system_prompt
+from app.services.context_manager import context_manager
+from app.agents.intent_router_graph import ROUTE_STAGES, intent_router_graph, route_stats
 from app.services.rag_service import RAGService
+from app.services.request_timings import RequestTimings
+from app.services.semantic_cache import semantic_response_cache
+from app.services.tool_catalog import tool_catalog
+from app.services.tool_result_cache import tool_result_cache
 
 logger = logging.getLogger(__name__)
 
-client = anthropic.Anthropic(api_key=config.anthropic_api_key)
+# One async client per worker so every chat shares the same HTTP connection pool
+client = anthropic.AsyncAnthropic(
+    api_key=config.anthropic_api_key,
+    http_client=anthropic.DefaultAsyncHttpxClient(
+        timeout=httpx.Timeout(config.anthropic_timeout_seconds, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=config.anthropic_max_connections,
+            max_keepalive_connections=config.anthropic_max_keepalive_connections,
+        ),
+    ),
+)
+
+# The system prompt is identical on every call, so mark it as a prompt caching breakpoint
+system_blocks = [{"type": "text", "text": system_prompt, "cache_control": {"type": "ephemeral"}}]
+
+
+class PromptCacheStats:
+    """
+    Process-wide Anthropic prompt caching counters
+    """
+    def __init__(self):
+        """
+        Initialize the counters
+        """
+        self.calls = 0
+        self.hits = 0
+        self.misses = 0
+        self.usage = ChatUsage()
+
+    def record(self, usage: ChatUsage):
+        """
+        Record the usage of one model call
+
+        Args:
+            usage: Token usage reported for the call
+        """
+        self.calls += 1
+        if usage.cache_read_input_tokens:
+            self.hits += 1
+        else:
+            self.misses += 1
+        _add_usage(self.usage, usage)
+
+    def stats(self) -> dict:
+        """
+        Get prompt caching statistics
+
+        Returns:
+            dict: Call, hit and miss counts plus summed token usage
+        """
+        return {"calls": self.calls, "hits": self.hits, "misses": self.misses, **self.usage.model_dump()}
+
+
+def _add_usage(total: ChatUsage, usage: ChatUsage):
+    """
+    Add one usage record into a running total in place
+    """
+    total.input_tokens += usage.input_tokens
+    total.output_tokens += usage.output_tokens
+    total.cache_creation_input_tokens += usage.cache_creation_input_tokens
+    total.cache_read_input_tokens += usage.cache_read_input_tokens
+
+
+prompt_cache_stats = PromptCacheStats()
 
 class LLMChatService:
     """
@@ -21,19 +96,21 @@ class LLMChatService:
         """
         self.client = client
         self.rag_service = RAGService()
+        # Every request uses the same Notion integration token, so it identifies the workspace
+        self.notion_workspace = hashlib.sha256((config.notion_token or "").encode()).hexdigest()[:16]
 
     async def _get_notion_tools(self):
         """
         Get available Notion tools from MCP server.
         
-        Connects to the Notion MCP server and retrieves all available tools.
+        Borrows a session from the Notion MCP pool and retrieves all available tools.
         Returns a list of MCP Tool objects (not yet in Anthropic format).
         
         Returns:
             list: List of MCP Tool objects with name, description, inputSchema, etc.
         """
-        # Use context manager to ensure connection is properly closed
-        async with connect_to_notion_mcp_server() as session:
+        # Borrow a long-lived session; it is returned to the pool on exit
+        async with notion_mcp_pool.session() as session:
             # Request list of available tools from MCP server
             tools = await session.list_tools()   
             # Extract the tools list from the response (MCP returns a list in .tools attribute)
@@ -44,7 +121,9 @@ class LLMChatService:
         Call a Notion MCP tool with the given arguments.
         
         This executes a tool on the Notion MCP server (e.g., search, retrieve page, etc.)
-        Each call creates a new connection to the MCP server.
+        Each call borrows a pooled session instead of spawning a new server.
+        Results of read-only tools are served from the tool result cache when
+        possible; any other tool invalidates the workspace's cached results.
         
         Args:
             tool_name: Name of the MCP tool to call (e.g., "API-post-search")
@@ -53,14 +132,129 @@ class LLMChatService:
         Returns:
             CallToolResult: Result object containing the tool's response
         """
-        # Create a new MCP connection for this tool call
-        async with connect_to_notion_mcp_server() as session:
-            # Execute the tool on the MCP server
+        if not tool_result_cache.is_cacheable(tool_name):
+            try:
+                return await self._execute_notion_tool(tool_name, arguments)
+            finally:
+                # Invalidate even on failure, since a timed-out write may still have been applied
+                tool_result_cache.invalidate_workspace(self.notion_workspace)
+
+        cached_result = tool_result_cache.get(self.notion_workspace, tool_name, arguments)
+        if cached_result is not None:
+            logger.info(f"=============== Tool result cache hit: {tool_name} ===============")
+            return cached_result
+
+        generation = tool_result_cache.generation(self.notion_workspace)
+        result = await self._execute_notion_tool(tool_name, arguments)
+        if not getattr(result, "isError", False):
+            tool_result_cache.put(self.notion_workspace, tool_name, arguments, result, generation)
+        return result
+
+    async def _execute_notion_tool(self, tool_name: str, arguments: dict):
+        """
+        Execute a Notion MCP tool on a pooled session, bypassing the result cache.
+
+        Args:
+            tool_name: Name of the MCP tool to call
+            arguments: Dictionary of arguments required by the tool
+
+        Returns:
+            CallToolResult: Result object containing the tool's response
+
+        Raises:
+            TimeoutError: If no session is free within the pool's acquire timeout, or the
+                call runs longer than tool_call_timeout_seconds
+        """
+        # Borrow a pooled MCP session for this tool call
+        async with notion_mcp_pool.session() as session:
+            # Execute the tool on the MCP server; the timeout starts once a session is ours,
+            # so time spent waiting for the pool doesn't count against the tool
             logger.info(f"=============== Calling tool: {tool_name} ===============")
-            result = await session.call_tool(tool_name, arguments)
+            try:
+                result = await asyncio.wait_for(
+                    session.call_tool(tool_name, arguments),
+                    timeout=config.tool_call_timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                raise TimeoutError(f"Tool {tool_name} timed out after {config.tool_call_timeout_seconds} seconds") from None
             logger.info(f"=============== Tool result: {result} ===============")
             return result
     
+    async def _run_tool_call(self, tool_block, semaphore: asyncio.Semaphore) -> tuple[dict, float]:
+        """
+        Run one tool_use block and turn the outcome into a tool_result block.
+
+        Failures and timeouts are reported back to Claude as an error result
+        instead of aborting the chat.
+
+        Args:
+            tool_block: tool_use content block from Claude's response
+            semaphore: Limits the number of in-flight tool calls for the request
+
+        Returns:
+            tuple[dict, float]: tool_result content block for the tool_use id and the call duration in seconds
+        """
+        async with semaphore:
+            start_time = t.time()
+            try:
+                result = await self._call_notion_tool(tool_block.name, tool_block.input)
+                tool_result = {
+                    "type": "tool_result",
+                    "tool_use_id": tool_block.id,
+                    "content": str(result.content)
+                }
+                if getattr(result, "isError", False):
+                    tool_result["is_error"] = True
+            except TimeoutError as e:
+                # The call itself ran too long, or no pooled session came free in time
+                logger.error(str(e))
+                tool_result = {
+                    "type": "tool_result",
+                    "tool_use_id": tool_block.id,
+                    "content": str(e),
+                    "is_error": True
+                }
+            except Exception as e:
+                logger.error(f"Error calling tool {tool_block.name}: {e}")
+                tool_result = {
+                    "type": "tool_result",
+                    "tool_use_id": tool_block.id,
+                    "content": f"Tool {tool_block.name} failed: {e}",
+                    "is_error": True
+                }
+            duration = t.time() - start_time
+            logger.info(f"=============== Tool {tool_block.name} took {duration} seconds ===============")
+            return tool_result, duration
+
+    async def _run_tool_calls(self, tool_blocks: list) -> AsyncIterator[tuple[int, dict, float]]:
+        """
+        Run the tool_use blocks from one assistant turn concurrently.
+
+        Results are yielded as soon as each call finishes, tagged with the index
+        of their tool_use block so the caller can restore the original order.
+
+        Args:
+            tool_blocks: tool_use content blocks from Claude's response
+
+        Yields:
+            tuple[int, dict, float]: Index of the tool_use block, its tool_result block, and the call duration
+        """
+        # Each call holds a pooled MCP session exclusively, so more calls than sessions would only queue
+        semaphore = asyncio.Semaphore(min(config.max_concurrent_tool_calls, notion_mcp_pool.size))
+
+        async def run_indexed(index: int, tool_block) -> tuple[int, dict, float]:
+            tool_result, duration = await self._run_tool_call(tool_block, semaphore)
+            return index, tool_result, duration
+
+        tasks = [asyncio.create_task(run_indexed(index, tool_block)) for index, tool_block in enumerate(tool_blocks)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            # Don't leave tool calls running if the consumer stops early (e.g. a client disconnect)
+            for task in tasks:
+                task.cancel()
+
     async def _convert_notion_tools_to_anthropic(self, tools: list):
         """
         Convert MCP Tool objects to Anthropic's tool format.
@@ -97,7 +291,54 @@ class LLMChatService:
             list: List of tools in Anthropic format
         """
         return await self._convert_notion_tools_to_anthropic(tools)
-    
+
+    async def _load_anthropic_tools(self) -> list[dict]:
+        """
+        Load Notion tools from the MCP server in Anthropic format.
+
+        Used as the tool catalog loader, so it only runs when the catalog is stale.
+
+        Returns:
+            list[dict]: List of tools in Anthropic format
+        """
+        tools = await self._get_notion_tools()
+        return await self._get_anthropic_tools(tools)
+
+    async def _stream_message(self, messages: list, tools: list, usage: ChatUsage) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Stream a Claude response with the cached system prompt and tool definitions.
+
+        Args:
+            messages: Conversation so far in Anthropic format
+            tools: Tool definitions from the tool catalog
+            usage: Running usage total for the chat turn, updated in place
+
+        Yields:
+            tuple[str, Any]: ("text", delta) for each text delta, then ("message", Message) with the full response
+        """
+        async with self.client.messages.stream(
+            model="claude-sonnet-4-20250514",
+            max_tokens=1024,
+            system=system_blocks,
+            messages=messages,
+            # Conversational and retrieve-only turns are sent without tools
+            tools=tools or anthropic.NOT_GIVEN,
+        ) as stream:
+            async for text in stream.text_stream:
+                yield "text", text
+            response = await stream.get_final_message()
+
+        call_usage = ChatUsage(
+            input_tokens=response.usage.input_tokens,
+            output_tokens=response.usage.output_tokens,
+            cache_creation_input_tokens=getattr(response.usage, "cache_creation_input_tokens", None) or 0,
+            cache_read_input_tokens=getattr(response.usage, "cache_read_input_tokens", None) or 0,
+        )
+        _add_usage(usage, call_usage)
+        prompt_cache_stats.record(call_usage)
+        logger.info(f"=============== Usage: {call_usage} ===============")
+        yield "message", response
+
     def _enhance_message_with_rag_context(self, user_query: str, rag_results: SearchResponse) -> str:
         """
         Enhance the last message with RAG context
@@ -105,76 +346,246 @@ class LLMChatService:
         rag_results_string = "\n\n".join([f"Document ID: {result.document_id} \n\n Chunk text: {result.chunk_text}" for result in rag_results.results])
         return f"<question>\n{user_query}\n</question> \n\n <context>\n{rag_results_string}\n</context>"
 
-    async def chat(self, request: ChatRequest) -> ChatResponse:
+    async def chat(
+        self,
+        request: ChatRequest,
+        load_session: Optional[Callable[[], Awaitable[None]]] = None,
+        user_id: Optional[str] = None,
+    ) -> ChatResponse:
         """
         Chat with Claude, with support for Notion MCP tools.
         
-        This method:
-        1. Gets Notion tools from MCP server
-        2. Converts them to Anthropic format
-        3. Sends them to Claude along with the user's message
-        4. If Claude wants to use a tool, executes it and loops back with the result
-        5. Returns Claude's final response
+        Runs the same pipeline as chat_events and returns the final response.
         
         Args:
             request: ChatRequest containing user messages
+            load_session: Optional coroutine function that validates and loads the chat session;
+                it runs concurrently with retrieval and tool loading
+            user_id: The id of the user sending the message
             
         Returns:
             ChatResponse with Claude's response
         """
+        async with aclosing(self.chat_events(request, load_session, user_id)) as events:
+            async for event in events:
+                if event["event"] == "done":
+                    return ChatResponse(**event["data"])
+        raise Exception("Chat finished without a response")
+
+    async def _run_concurrently(self, *awaitables: Awaitable) -> list:
+        """
+        Run independent pipeline stages concurrently.
+
+        If any stage fails, the others are cancelled and the error is raised.
+
+        Args:
+            awaitables: The stages to run
+
+        Returns:
+            list: Stage results in the same order as awaitables
+        """
+        tasks = [asyncio.ensure_future(awaitable) for awaitable in awaitables]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    async def _route(self, request: ChatRequest, user_query: str, user_id: Optional[str], timings: RequestTimings) -> dict:
+        """
+        Run the intent router graph for the latest message.
+
+        The router classifies the message and only runs the stages its route needs:
+        conversational turns skip retrieval and tools, retrieve turns skip MCP, and
+        action turns skip retrieval. Retrieval and tool loading run concurrently.
+
+        Args:
+            request: ChatRequest containing user messages
+            user_query: The user's latest message
+            user_id: The id of the user sending the message
+            timings: Timings of the current request
+
+        Returns:
+            dict: Final router state (intent, rag_results, is_doc_relevant, notion_tools)
+        """
+        state = {
+            "session_id": request.session_id,
+            "user_id": user_id or "",
+            "message": [
+                AIMessage(content=message.content) if message.type == MessageType.ASSISTANT else HumanMessage(content=message.content)
+                for message in request.messages
+            ],
+            "user_query": user_query,
+            # With routing disabled every turn takes the full pipeline
+            "intent": None if config.intent_router_enabled else "hybrid",
+        }
+        return await intent_router_graph.ainvoke(state, config={"configurable": {
+            "anthropic_client": self.client,
+            "rag_service": self.rag_service,
+            "load_tools": lambda: tool_catalog.get_tools(self._load_anthropic_tools),
+            "timings": timings,
+        }})
+
+    def _build_response(
+        self,
+        request: ChatRequest,
+        content: str,
+        intent: str,
+        usage: ChatUsage,
+        timings: RequestTimings,
+        cached: bool = False,
+    ) -> ChatResponse:
+        """
+        Build the final chat response.
+
+        Args:
+            request: ChatRequest containing user messages
+            content: The assistant's answer
+            intent: The route the message took
+            usage: Token usage for the chat turn
+            timings: Timings of the current request
+            cached: Whether the answer came from the semantic response cache
+
+        Returns:
+            ChatResponse with the assistant's message
+        """
+        return ChatResponse(
+            session_id=request.session_id,
+            response_message=ChatMessage(
+                type=MessageType.ASSISTANT, 
+                content=content
+            ), 
+            query_used=f"Question: {request.messages[0].content}",
+            route=intent,
+            cached=cached,
+            usage=usage,
+            timings=timings.summary()
+        )
+
+    async def chat_events(
+        self,
+        request: ChatRequest,
+        load_session: Optional[Callable[[], Awaitable[None]]] = None,
+        user_id: Optional[str] = None,
+    ) -> AsyncIterator[dict]:
+        """
+        Chat with Claude, with support for Notion MCP tools, emitting progress events.
+        
+        This method:
+        1. Routes the message by intent, concurrently running the retrieval and Notion
+           tool catalog loading its route needs, while the chat session loads
+        2. Adds relevant document chunks to the user's message as context
+        3. Streams Claude's response along with the user's message and any tools
+        4. If Claude wants to use tools, executes them concurrently and loops back with the results
+        5. Emits Claude's final response along with the route and per-stage timings
+        
+        Args:
+            request: ChatRequest containing user messages
+            load_session: Optional coroutine function that validates and loads the chat session
+            user_id: The id of the user sending the message
+            
+        Yields:
+            dict: Events with an "event" name and a JSON-serializable "data" payload:
+                route, retrieval, tool_call, tool_result, text, and finally done with the ChatResponse
+        """
         
         logger.info("=============== Begin LLM workflow ===============")
+        timings = RequestTimings()
         # Convert request messages to Anthropic format
         messages = [{"role": message.type.value, "content": message.content} for message in request.messages]
-
-        # Step 0: Search the database for documents
         user_query = messages[-1]["content"]
-        rag_results = self.rag_service.search(query=user_query, match_threshold=0.25, top_k=3)
 
-        # Check if there are any relevant results from the RAG search
-        if rag_results.results:
+        # Step 1: Routing (with retrieval and tool discovery) and session loading don't depend on each other
+        stages = [self._route(request, user_query, user_id, timings)]
+        if load_session is not None:
+            stages.append(timings.measure("session", load_session()))
+        route_state, *_ = await self._run_concurrently(*stages)
+
+        intent = route_state["intent"]
+        time_saved_ms = route_stats.record(intent, timings.summary())
+        timings.record("route_time_saved", time_saved_ms)
+        yield {
+            "event": "route",
+            "data": {"intent": intent, "confidence": route_state.get("confidence_score"), "time_saved_ms": time_saved_ms},
+        }
+
+        anthropic_tools = route_state.get("notion_tools") or []
+        rag_results = SearchResponse(results=route_state.get("rag_results") or [])
+        if "retrieval" in ROUTE_STAGES[intent]:
+            yield {
+                "event": "retrieval",
+                "data": {
+                    "results": [result.model_dump() for result in rag_results.results],
+                    "duration_ms": timings.summary().get("retrieval"),
+                },
+            }
+
+        # Step 2: Check if there are any relevant results from the RAG search
+        if route_state.get("is_doc_relevant"):
             # Add the RAG results as extra context to the last message
             context_enhanced_message = self._enhance_message_with_rag_context(user_query, rag_results)
             messages[-1]["content"] = context_enhanced_message
-        else:
-            logger.info(f"No relevant results found from the RAG search for user query: {user_query}")
 
-        # Step 1: Get tools from MCP server (MCP Tool objects)
-        tools = await self._get_notion_tools()
-        
-        # Step 2: Convert MCP tools to Anthropic format
-        anthropic_tools = await self._get_anthropic_tools(tools)
-        
+        # Serve repeated questions from the semantic cache (opt-in); only answers that needed no tools are stored.
+        # The cache is keyed on the latest message alone, so it only serves opening questions: a follow-up
+        # ("tell me more") depends on earlier turns and must not be answered from another conversation
+        query_embedding = route_state.get("query_embedding")
+        use_semantic_cache = (
+            config.semantic_cache_enabled and bool(user_id) and query_embedding is not None and len(messages) == 1
+        )
+        if use_semantic_cache:
+            cached_answer = semantic_response_cache.lookup(user_id, query_embedding)
+            if cached_answer is not None:
+                yield {"event": "text", "data": {"delta": cached_answer, "round": 0}}
+                chat_response = self._build_response(request, cached_answer, intent, ChatUsage(), timings, cached=True)
+                yield {"event": "done", "data": chat_response.model_dump(mode="json")}
+                return
+
+        usage = ChatUsage()
         
         try:
-            # Step 3: First call to Claude with tools
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                system=system_prompt,
-                messages=messages,
-                tools=anthropic_tools,  # Pass tools to Claude
-            )
-            
-            # Step 4: Handle tool use loop
             current_messages = messages  # Track conversation history
-            logger.info(f"=============== Current messages: {current_messages} ===============")
-            
-            # Keep looping as long as Claude wants to use tools
-            start_time = t.time()
-            while response.stop_reason == "tool_use":
-                # Find the tool_use block in Claude's response
+            current_turn_index = len(messages) - 1
+            round_index = 0
+            while True:
+                # Step 3: Stream Claude's response, forwarding text as it arrives
+                response = None
+                with timings.stage(f"llm_round_{round_index}"):
+                    # Collapse older history into a summary if the conversation outgrew the token budget
+                    call_messages = context_manager.fit(current_messages, current_turn_index)
+                    async for kind, value in self._stream_message(call_messages, anthropic_tools, usage):
+                        if kind == "text":
+                            yield {"event": "text", "data": {"delta": value, "round": round_index}}
+                        else:
+                            response = value
+
+                # Step 4: Stop once Claude no longer wants to use tools
+                if response.stop_reason != "tool_use":
+                    break
+
+                # Find the tool_use blocks in Claude's response
                 tool_blocks = [block for block in response.content if block.type == "tool_use"]
-                tool_results = []
-                if tool_blocks:
-                    for tool_block in tool_blocks:
-                    # Extract tool name and arguments from Claude's request
-                        result = await self._call_notion_tool(tool_block.name, tool_block.input)
-                        tool_results.append({
-                            "type": "tool_result",
-                            "tool_use_id": tool_block.id,
-                            "content": str(result.content)
-                        })
+                for tool_block in tool_blocks:
+                    yield {
+                        "event": "tool_call",
+                        "data": {"id": tool_block.id, "name": tool_block.name, "input": tool_block.input},
+                    }
+
+                # Run every tool Claude asked for in this turn concurrently, reporting each as it finishes
+                tool_results = [None] * len(tool_blocks)
+                with timings.stage(f"tool_calls_{round_index}"):
+                    async for index, tool_result, duration in self._run_tool_calls(tool_blocks):
+                        tool_results[index] = context_manager.truncate_tool_result(tool_result)
+                        yield {
+                            "event": "tool_result",
+                            "data": {
+                                "id": tool_blocks[index].id,
+                                "name": tool_blocks[index].name,
+                                "is_error": tool_result.get("is_error", False),
+                                "duration_ms": round(duration * 1000, 1),
+                            },
+                        }
 
                 current_messages.append({
                     "role": "assistant",
@@ -185,30 +596,15 @@ class LLMChatService:
                     "role": "user",
                     "content": tool_results
                 })
+                round_index += 1
 
-                # Step 7: Send tool result back to Claude and get response
-                response = self.client.messages.create(
-                    model="claude-sonnet-4-20250514",
-                    max_tokens=1024,
-                    system=system_prompt,
-                    messages=current_messages,  # Include conversation + tool result
-                    tools=anthropic_tools,
-                )
-
-                end_time = t.time()
-                logger.info(f"=============== Time taken to process tool use: {end_time - start_time} seconds ===============")
-
-                start_time = end_time
-
-            # Step 8: Return final response (when Claude is done using tools)
-            return ChatResponse(
-                session_id=request.session_id,
-                response_message=ChatMessage(
-                    type=MessageType.ASSISTANT, 
-                    content=response.content[0].text
-                ), 
-                query_used=f"Question: {request.messages[0].content}"
-            )
+            # Step 5: Return final response (when Claude is done using tools)
+            content = "".join(block.text for block in response.content if block.type == "text")
+            if use_semantic_cache and round_index == 0:
+                semantic_response_cache.store(user_id, query_embedding, content)
+            chat_response = self._build_response(request, content, intent, usage, timings)
+            logger.info(f"=============== Stage timings (ms): {chat_response.timings} ===============")
+            yield {"event": "done", "data": chat_response.model_dump(mode="json")}
         except Exception as e:
             logger.error(f"Error chatting with the model: {e}")
-            raise e
\ No newline at end of file
+            raise e
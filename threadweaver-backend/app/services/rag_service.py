@@ -1,10 +1,15 @@
+import asyncio
+import json
 import logging
 import time as t
+from typing import Optional
 from config import config
 
 from app.db.supabase_client import get_supabase_connection
+from app.services.embedding_cache import query_embedding_cache
+from app.services.vector_index import local_vector_index
 
-from app.schemas.requests import SearchResponse, SearchResult
+from app.schemas.requests import SearchMode, SearchResponse, SearchResult
 
 logger = logging.getLogger(__name__)
 
@@ -21,18 +26,65 @@ class RAGService:
         self.supabase_client = supabase_client
 
     
-    def _embed_user_query(self, query: str) -> list[float]:
+    async def _embed_user_query(self, query: str) -> list[float]:
         """
-        Embed the user query
+        Embed the user query, reusing cached embeddings of the same query
         """
-        return config.get_embedding_model().embed_query(query)
+        return await query_embedding_cache.get_or_embed(
+            query, config.embedding_model, config.get_embedding_model().aembed_query
+        )
 
-    def _search_chunks(self, user_query_embedding: list[float], match_threshold: float = 0.5, top_k: int = 5):
+    async def embed_query(self, query: str) -> list[float]:
+        """
+        Embed a search query, so callers can reuse the embedding (e.g. for the semantic response cache)
+        """
+        return await self._embed_user_query(query)
+
+    async def _embed_user_queries(self, queries: list[str]) -> list[list[float]]:
+        """
+        Embed several user queries, sending every uncached query in one embedding request
+        """
+        return await query_embedding_cache.get_or_embed_many(
+            queries, config.embedding_model, config.get_embedding_model().aembed_documents
+        )
+
+    def _search_chunks(
+        self,
+        user_query_embedding: list[float],
+        match_threshold: float = 0.5,
+        top_k: int = 5,
+        user_id: Optional[str] = None,
+        document_ids: Optional[list[str]] = None,
+    ):
         """
         Search the database for chunks
+
+        With a user, the user-scoped HNSW search (match_user_chunks) is used; it
+        filters inside the index scan and returns only the columns we read.
         """
         try:
             # Search the database for chunks
+            if user_id and config.vector_search_quantization:
+                # Shortlist on the compact index, then rescore at full precision
+                return self.supabase_client.rpc("match_user_chunks_quantized", {
+                    "query_embedding": user_query_embedding,
+                    "match_threshold": match_threshold,
+                    "match_count": top_k,
+                    "filter_user_id": user_id,
+                    "filter_document_ids": document_ids,
+                    "quantization": config.vector_search_quantization,
+                    "rescore_factor": config.vector_search_rescore_factor,
+                    "ef_search": config.vector_search_ef_search,
+                }).execute()
+            if user_id:
+                return self.supabase_client.rpc("match_user_chunks", {
+                    "query_embedding": user_query_embedding,
+                    "match_threshold": match_threshold,
+                    "match_count": top_k,
+                    "filter_user_id": user_id,
+                    "filter_document_ids": document_ids,
+                    "ef_search": config.vector_search_ef_search,
+                }).execute()
             search_results = self.supabase_client.rpc("match_documents", {
                 "query_embedding": user_query_embedding,
                 "match_threshold": match_threshold,
@@ -42,30 +94,190 @@ class RAGService:
         except Exception as e:
             logger.error(f"Error searching for chunks: {e}")
             raise Exception(f"Error searching for chunks: {e}")
-    
 
-    def search(self, query: str, match_threshold: float = 0.2, top_k: int = 5) -> SearchResponse:
+
+    def _search_chunks_keyword(self, query: str, top_k: int = 5, user_id: Optional[str] = None):
+        """
+        Search the database for chunks by full-text match
+        """
+        try:
+            return self.supabase_client.rpc("keyword_search", {
+                "query_text": query,
+                "match_count": top_k,
+                "filter_user_id": user_id or None,
+            }).execute()
+        except Exception as e:
+            logger.error(f"Error searching for chunks by keyword: {e}")
+            raise Exception(f"Error searching for chunks by keyword: {e}")
+
+    def _search_chunks_hybrid(self, query: str, user_query_embedding: list[float], top_k: int = 5, user_id: Optional[str] = None):
+        """
+        Search the database for chunks by full-text and vector similarity, fused with
+        reciprocal rank fusion in a single round trip
+        """
+        try:
+            return self.supabase_client.rpc("hybrid_search", {
+                "query_text": query,
+                "query_embedding": user_query_embedding,
+                "match_count": top_k,
+                "filter_user_id": user_id or None,
+            }).execute()
+        except Exception as e:
+            logger.error(f"Error searching for chunks by hybrid search: {e}")
+            raise Exception(f"Error searching for chunks by hybrid search: {e}")
+
+    @staticmethod
+    def _to_search_results(rows: list[dict], score_key: Optional[str]) -> list[SearchResult]:
+        """ Convert chunk rows to search results, reading the score from score_key if the rows have one """
+        return [SearchResult(
+            chunk_text=row["original_text"],
+            chunk_index=row["chunk_index"],
+            similarity_score=row[score_key] if score_key else 0.0,
+            document_id=row["document_id"],
+            chunk_id=row.get("id")
+        ) for row in rows]
+
+    def _fetch_chunk_embeddings(self, chunk_ids: list[str]) -> dict[str, list[float]]:
+        """
+        Read chunk embeddings from the database
+        """
+        response = self.supabase_client.table("chunks").select("id, embedding").in_("id", chunk_ids).execute()
+        # PostgREST returns pgvector columns as strings like "[0.1,0.2,...]"
+        return {
+            row["id"]: json.loads(row["embedding"]) if isinstance(row["embedding"], str) else row["embedding"]
+            for row in response.data if row.get("embedding") is not None
+        }
+
+    async def get_chunk_embeddings(self, chunk_ids: list[str]) -> dict[str, list[float]]:
+        """
+        Get the embeddings of retrieved chunks (e.g. to diversify results with MMR)
+
+        Search results do not carry embeddings, so this is one extra query for the
+        candidates only.
+
+        Args:
+            chunk_ids: Ids of the chunks
+
+        Returns:
+            dict[str, list[float]]: Embeddings by chunk id
+        """
+        if not chunk_ids:
+            return {}
+        try:
+            return await asyncio.to_thread(self._fetch_chunk_embeddings, chunk_ids)
+        except Exception as e:
+            logger.error(f"Error fetching chunk embeddings: {e}")
+            raise Exception(f"Error fetching chunk embeddings: {e}")
+
+    async def _search_local_index(self, user_id: str, user_query_embedding: list[float], match_threshold: float, top_k: int) -> Optional[list[SearchResult]]:
+        """
+        Search the user's in-process vector index
+
+        Returns:
+            Optional[list[SearchResult]]: The results, or None if the index could not be used
+        """
+        try:
+            results = await local_vector_index.search(user_id, user_query_embedding, match_threshold, top_k)
+        except Exception as e:
+            logger.error(f"Error searching local vector index, falling back to the database: {e}")
+            return None
+        return self._to_search_results(results, "similarity")
+
+    async def search(
+        self,
+        query: str,
+        match_threshold: float = 0.2,
+        top_k: int = 5,
+        query_embedding: Optional[list[float]] = None,
+        user_id: Optional[str] = None,
+        mode: Optional[SearchMode] = None,
+        document_ids: Optional[list[str]] = None,
+    ) -> SearchResponse:
         """
         Search the database for documents
+
+        Vector mode returns chunks above the similarity threshold; when the local
+        vector index is enabled and a user is given, the user's chunks are searched
+        in process, with the database as the fallback. Keyword mode ranks full-text
+        matches. Hybrid mode fuses both candidate lists with reciprocal rank fusion,
+        so exact-term matches are kept even when their cosine similarity is below
+        the threshold; if the hybrid search fails, vector mode is used instead.
+
+        Args:
+            query: The search query
+            match_threshold: Minimum cosine similarity of returned chunks (vector mode only)
+            top_k: Maximum number of chunks to return
+            query_embedding: Precomputed embedding of the query, if the caller already has one
+            user_id: The user whose chunks to search
+            mode: The search mode (defaults to the configured rag_search_mode)
+            document_ids: Restrict a user's vector search to these documents
         """
-        logger.info(f"Searching for documents: {query}")
+        mode = SearchMode(mode or config.rag_search_mode)
+        logger.info(f"Searching for documents ({mode.value}): {query}")
         
         try:
+            if mode == SearchMode.KEYWORD:
+                search_results = await asyncio.to_thread(self._search_chunks_keyword, query, top_k, user_id)
+                return SearchResponse(results=self._to_search_results(search_results.data, "score"))
+
             # Embed the user query
-            user_query_embedding = self._embed_user_query(query)
+            user_query_embedding = query_embedding or await self._embed_user_query(query)
             logger.info(f"User query embedded successfully: {len(user_query_embedding)}")
 
-            # Search the database for documents
-            search_results = self._search_chunks(user_query_embedding, match_threshold, top_k)
-
-            return SearchResponse(
-                results=[SearchResult(
-                    chunk_text=result["original_text"],
-                    chunk_index=result["chunk_index"],
-                    similarity_score=0.0,
-                    document_id=result["document_id"]
-                ) for result in search_results.data]
-            )
+            if mode == SearchMode.HYBRID:
+                try:
+                    search_results = await asyncio.to_thread(self._search_chunks_hybrid, query, user_query_embedding, top_k, user_id)
+                    return SearchResponse(results=self._to_search_results(search_results.data, "similarity"))
+                except Exception as e:
+                    logger.error(f"Hybrid search failed, falling back to vector search: {e}")
+
+            if config.local_vector_index_enabled and user_id and not document_ids:
+                results = await self._search_local_index(user_id, user_query_embedding, match_threshold, top_k)
+                if results is not None:
+                    return SearchResponse(results=results)
+
+            # Search the database for documents (the Supabase client is synchronous, so keep it off the event loop)
+            search_results = await asyncio.to_thread(self._search_chunks, user_query_embedding, match_threshold, top_k, user_id, document_ids)
+            return SearchResponse(results=self._to_search_results(search_results.data, "similarity" if user_id else None))
         except Exception as e:
             logger.error(f"Error searching for documents: {e}")
-            raise Exception(f"Error searching for documents: {e}")
\ No newline at end of file
+            raise Exception(f"Error searching for documents: {e}")
+
+    async def search_many(
+        self,
+        queries: list[str],
+        match_threshold: float = 0.2,
+        top_k: int = 5,
+        user_id: Optional[str] = None,
+        mode: Optional[SearchMode] = None,
+    ) -> list[SearchResponse]:
+        """
+        Search the database for several queries at once
+
+        Every query is embedded in a single embedding request, then the lookups
+        run concurrently.
+
+        Args:
+            queries: The search queries
+            match_threshold: Minimum cosine similarity of returned chunks (vector mode only)
+            top_k: Maximum number of chunks to return per query
+            user_id: The user whose chunks to search
+            mode: The search mode (defaults to the configured rag_search_mode)
+
+        Returns:
+            list[SearchResponse]: One response per query, in order
+        """
+        mode = SearchMode(mode or config.rag_search_mode)
+        logger.info(f"Searching for documents ({mode.value}) for {len(queries)} queries")
+
+        try:
+            # Keyword search does not use embeddings
+            embeddings = [None] * len(queries) if mode == SearchMode.KEYWORD else await self._embed_user_queries(queries)
+        except Exception as e:
+            logger.error(f"Error embedding search queries: {e}")
+            raise Exception(f"Error embedding search queries: {e}")
+
+        return await asyncio.gather(*(
+            self.search(query, match_threshold, top_k, query_embedding=embedding, user_id=user_id, mode=mode)
+            for query, embedding in zip(queries, embeddings)
+        ))
@@ -0,0 +1,91 @@
+import logging
+import time as t
+from contextlib import contextmanager
+from typing import Awaitable, Iterator, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class RequestTimings:
+    """
+    Per-request stage timings.
+
+    Each stage is recorded as a (start, end) interval relative to the start of
+    the request, so stages that ran concurrently can be told apart from ones
+    that ran in sequence.
+    """
+    def __init__(self):
+        """
+        Initialize the timings, starting the request clock
+        """
+        self._start = t.perf_counter()
+        self.stages: dict[str, tuple[float, float]] = {}
+        self.values: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Time the body of the context as a named stage
+
+        Args:
+            name: Name of the stage (e.g. "retrieval", "tools", "llm_round_0")
+        """
+        start = t.perf_counter() - self._start
+        try:
+            yield
+        finally:
+            self.stages[name] = (start, t.perf_counter() - self._start)
+
+    async def measure(self, name: str, awaitable: Awaitable[T]) -> T:
+        """
+        Await an awaitable, timing it as a named stage
+
+        Args:
+            name: Name of the stage
+            awaitable: The work to time
+
+        Returns:
+            The awaitable's result
+        """
+        with self.stage(name):
+            return await awaitable
+
+    def record(self, name: str, value_ms: float):
+        """
+        Record a derived value in milliseconds that is not a stage of its own
+
+        Args:
+            name: Name of the value (e.g. "route_time_saved")
+            value_ms: The value in milliseconds
+        """
+        self.values[name] = value_ms
+
+    def summary(self) -> dict[str, float]:
+        """
+        Summarize the stage timings in milliseconds
+
+        Returns:
+            dict[str, float]: Duration of each stage and each recorded value, plus:
+                total: Wall time since the request started
+                stages_sum: Sum of all stage durations
+                overlap_saved: Time saved by running stages concurrently
+                    (stages_sum minus the time covered by at least one stage)
+        """
+        summary = {name: round((end - start) * 1000, 1) for name, (start, end) in self.stages.items()}
+
+        covered = 0.0
+        covered_until = 0.0
+        for start, end in sorted(self.stages.values()):
+            if end <= covered_until:
+                continue
+            covered += end - max(start, covered_until)
+            covered_until = end
+
+        stages_sum = sum(end - start for start, end in self.stages.values())
+        summary["total"] = round((t.perf_counter() - self._start) * 1000, 1)
+        summary["stages_sum"] = round(stages_sum * 1000, 1)
+        summary["overlap_saved"] = round((stages_sum - covered) * 1000, 1)
+        summary.update(self.values)
+        return summary
@@ -0,0 +1,166 @@
+import itertools
+import logging
+import time as t
+from collections import OrderedDict
+from typing import Callable, Optional
+
+import numpy as np
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class SemanticResponseCache:
+    """
+    Opt-in cache of assistant answers keyed by query embedding.
+
+    Entries are scoped per user and per version of the user's document set:
+    uploading or changing documents bumps the version and drops the user's
+    entries. A lookup returns the stored answer of the most similar cached
+    query when its cosine similarity is at or above the threshold. Eviction is
+    least-recently-used across all users once max_entries is reached, and
+    entries expire after the TTL.
+    """
+    def __init__(
+        self,
+        similarity_threshold: float,
+        ttl_seconds: float,
+        max_entries: int,
+        clock: Callable[[], float] = t.monotonic,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            similarity_threshold: Minimum cosine similarity for a cached answer to be returned
+            ttl_seconds: Seconds a cached answer stays valid
+            max_entries: Maximum number of cached answers across all users
+            clock: Monotonic time source, injectable for tests
+        """
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._ids = itertools.count()
+        # entry id -> (user id, document set version, unit query embedding, answer, expiry)
+        self._entries: OrderedDict[int, tuple[str, int, np.ndarray, str, float]] = OrderedDict()
+        self._user_entries: dict[str, set[int]] = {}
+        self._document_set_versions: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def document_set_version(self, user_id: str) -> int:
+        """ Get the version of the user's document set """
+        return self._document_set_versions.get(user_id, 0)
+
+    @staticmethod
+    def _normalize(embedding: list[float]) -> np.ndarray:
+        """ Convert an embedding to a unit-length float32 vector """
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, entry_id: int):
+        """ Remove a single entry """
+        user_id = self._entries.pop(entry_id)[0]
+        user_entries = self._user_entries.get(user_id)
+        if user_entries is not None:
+            user_entries.discard(entry_id)
+            if not user_entries:
+                del self._user_entries[user_id]
+
+    def lookup(self, user_id: str, query_embedding: list[float]) -> Optional[str]:
+        """
+        Find a cached answer for a semantically equivalent query
+
+        Args:
+            user_id: The user asking
+            query_embedding: Embedding of the user's query
+
+        Returns:
+            Optional[str]: The cached answer, or None on a miss
+        """
+        version = self.document_set_version(user_id)
+        now = self._clock()
+        candidate_ids = []
+        for entry_id in list(self._user_entries.get(user_id, ())):
+            _, entry_version, _, _, expires_at = self._entries[entry_id]
+            if entry_version != version or now >= expires_at:
+                self._remove(entry_id)
+            else:
+                candidate_ids.append(entry_id)
+
+        if not candidate_ids:
+            self.misses += 1
+            return None
+
+        # Cosine similarity against every candidate in one matrix-vector product
+        matrix = np.stack([self._entries[entry_id][2] for entry_id in candidate_ids])
+        similarities = matrix @ self._normalize(query_embedding)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.similarity_threshold:
+            self.misses += 1
+            return None
+
+        entry_id = candidate_ids[best]
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        logger.info(f"Semantic cache hit for user {user_id} with similarity {similarities[best]:.3f}")
+        return self._entries[entry_id][3]
+
+    def store(self, user_id: str, query_embedding: list[float], answer: str):
+        """
+        Cache an answer for a query
+
+        Args:
+            user_id: The user who asked
+            query_embedding: Embedding of the user's query
+            answer: The assistant's answer
+        """
+        entry_id = next(self._ids)
+        self._entries[entry_id] = (
+            user_id,
+            self.document_set_version(user_id),
+            self._normalize(query_embedding),
+            answer,
+            self._clock() + self.ttl_seconds,
+        )
+        self._user_entries.setdefault(user_id, set()).add(entry_id)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate_user(self, user_id: str):
+        """
+        Bump the user's document set version and drop their cached answers
+
+        Args:
+            user_id: The user whose documents changed
+        """
+        self._document_set_versions[user_id] = self.document_set_version(user_id) + 1
+        for entry_id in list(self._user_entries.get(user_id, ())):
+            self._remove(entry_id)
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count and hit/miss/eviction counts
+        """
+        return {
+            "enabled": config.semantic_cache_enabled,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+semantic_response_cache = SemanticResponseCache(
+    similarity_threshold=config.semantic_cache_similarity_threshold,
+    ttl_seconds=config.semantic_cache_ttl_seconds,
+    max_entries=config.semantic_cache_max_entries,
+)
@@ -0,0 +1,112 @@
+import asyncio
+import copy
+import logging
+import time as t
+from typing import Awaitable, Callable, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+
+class ToolCatalog:
+    """
+    Versioned in-process cache of the Anthropic tool definitions.
+
+    Listing tools on the Notion MCP server and converting them to Anthropic's
+    format is the same work on every chat request, so the converted catalog is
+    kept for a TTL. Every refresh or invalidation bumps the version, which lets
+    callers tell whether the tool prefix they sent to Claude has changed.
+    """
+    def __init__(self, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the tool catalog
+
+        Args:
+            ttl_seconds: Seconds a loaded catalog stays fresh
+        """
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.tool_catalog_ttl_seconds
+        self.version = 0
+        self._tools: Optional[list[dict]] = None
+        self._loaded_at = 0.0
+        self._lock = asyncio.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self) -> bool:
+        """ Whether the cached catalog exists and is within its TTL """
+        return self._tools is not None and (t.monotonic() - self._loaded_at) < self.ttl_seconds
+
+    async def get_tools(self, loader: Callable[[], Awaitable[list[dict]]]) -> list[dict]:
+        """
+        Get the cached tool definitions, loading them if missing or expired
+
+        Concurrent callers that miss share a single load.
+
+        Args:
+            loader: Coroutine function returning the tools in Anthropic format
+
+        Returns:
+            list[dict]: Tool definitions with a prompt caching breakpoint on the last tool
+        """
+        if self._is_fresh():
+            self.hits += 1
+            return self._tools
+
+        async with self._lock:
+            # Another request may have refreshed the catalog while we waited
+            if self._is_fresh():
+                self.hits += 1
+                return self._tools
+
+            self.misses += 1
+            tools = await loader()
+            self._tools = self._with_cache_breakpoint(tools)
+            self._loaded_at = t.monotonic()
+            self.version += 1
+            logger.info(f"Tool catalog loaded: version {self.version} with {len(tools)} tools")
+            return self._tools
+
+    def invalidate(self):
+        """
+        Drop the cached catalog so the next request reloads it
+        """
+        self._tools = None
+        self.version += 1
+        logger.info(f"Tool catalog invalidated: version {self.version}")
+
+    @staticmethod
+    def _with_cache_breakpoint(tools: list[dict]) -> list[dict]:
+        """
+        Mark the last tool as an Anthropic prompt caching breakpoint
+
+        Tools come first in the prompt, so a breakpoint on the last one caches
+        every tool definition as a single prefix.
+
+        Args:
+            tools: Tool definitions in Anthropic format
+
+        Returns:
+            list[dict]: A copy of the tools with cache_control on the last entry
+        """
+        tools = copy.deepcopy(tools)
+        if tools:
+            tools[-1]["cache_control"] = {"type": "ephemeral"}
+        return tools
+
+    def stats(self) -> dict:
+        """
+        Get catalog statistics
+
+        Returns:
+            dict: Current version, tool count, and hit/miss counts
+        """
+        return {
+            "version": self.version,
+            "tools": len(self._tools) if self._tools is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+tool_catalog = ToolCatalog()
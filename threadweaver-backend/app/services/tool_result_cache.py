@@ -0,0 +1,160 @@
+import json
+import logging
+import time as t
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Read-only Notion MCP tools whose results may be cached, with their TTL in seconds.
+# Every other tool is treated as a write and invalidates the workspace's cached results.
+READ_ONLY_TOOL_TTLS: dict[str, float] = {
+    "API-post-search": 60.0,
+    "API-post-database-query": 60.0,
+    "API-retrieve-a-page": 120.0,
+    "API-retrieve-a-page-property": 120.0,
+    "API-retrieve-a-block": 120.0,
+    "API-get-block-children": 120.0,
+    "API-retrieve-a-database": 300.0,
+    "API-retrieve-a-comment": 60.0,
+    "API-get-self": 600.0,
+    "API-get-user": 600.0,
+    "API-get-users": 600.0,
+}
+
+
+class ToolResultCache:
+    """
+    Size-bounded LRU cache of read-only tool results with per-tool TTLs.
+
+    Entries are keyed by workspace, tool name and canonicalized arguments, so
+    identical calls are shared across conversations and users of the same
+    workspace. Each workspace has a generation counter that is bumped whenever
+    a write tool runs; results fetched before a write are not stored.
+    """
+    def __init__(
+        self,
+        max_entries: int,
+        tool_ttls: Optional[dict[str, float]] = None,
+        clock: Callable[[], float] = t.monotonic,
+    ):
+        """
+        Initialize the cache
+
+        Args:
+            max_entries: Maximum number of cached results before the least recently used is evicted
+            tool_ttls: TTL in seconds for each cacheable tool (defaults to READ_ONLY_TOOL_TTLS)
+            clock: Monotonic time source, injectable for tests
+        """
+        self.max_entries = max_entries
+        self.tool_ttls = tool_ttls if tool_ttls is not None else READ_ONLY_TOOL_TTLS
+        self._clock = clock
+        self._entries: OrderedDict[tuple[str, str, str], tuple[float, Any]] = OrderedDict()
+        self._generations: dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        """ Whether the tool is on the read-only allowlist """
+        return tool_name in self.tool_ttls
+
+    @staticmethod
+    def _canonicalize(arguments: Optional[dict]) -> str:
+        """
+        Serialize arguments so that equivalent calls produce the same key
+        """
+        return json.dumps(arguments or {}, sort_keys=True, separators=(",", ":"), default=str)
+
+    def generation(self, workspace: str) -> int:
+        """
+        Get the workspace's current write generation
+
+        Read it before calling a tool and pass it to put(), so a result that
+        raced with a write to the same workspace is not cached.
+        """
+        return self._generations.get(workspace, 0)
+
+    def get(self, workspace: str, tool_name: str, arguments: Optional[dict]) -> Optional[Any]:
+        """
+        Get a cached tool result
+
+        Args:
+            workspace: Workspace the tool runs against
+            tool_name: Name of the tool
+            arguments: Tool arguments
+
+        Returns:
+            The cached result, or None on a miss or expired entry
+        """
+        key = (workspace, tool_name, self._canonicalize(arguments))
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if self._clock() >= expires_at:
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, workspace: str, tool_name: str, arguments: Optional[dict], value: Any, generation: int):
+        """
+        Store a tool result
+
+        Args:
+            workspace: Workspace the tool ran against
+            tool_name: Name of the tool
+            arguments: Tool arguments
+            value: The tool result
+            generation: Workspace generation read before the tool was called
+        """
+        if not self.is_cacheable(tool_name) or generation != self.generation(workspace):
+            return
+
+        key = (workspace, tool_name, self._canonicalize(arguments))
+        self._entries[key] = (self._clock() + self.tool_ttls[tool_name], value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate_workspace(self, workspace: str):
+        """
+        Drop every cached result for a workspace after a write
+
+        Args:
+            workspace: Workspace the write tool ran against
+        """
+        self._generations[workspace] = self.generation(workspace) + 1
+        stale_keys = [key for key in self._entries if key[0] == workspace]
+        for key in stale_keys:
+            del self._entries[key]
+        self.invalidations += 1
+        logger.info(f"Invalidated {len(stale_keys)} cached tool results for workspace {workspace}")
+
+    def stats(self) -> dict:
+        """
+        Get cache statistics
+
+        Returns:
+            dict: Entry count and hit/miss/eviction/invalidation counts
+        """
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+tool_result_cache = ToolResultCache(max_entries=config.tool_result_cache_max_entries)
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+import time as t
+from typing import Optional
+
+import numpy as np
+
+from app.db.supabase_client import get_supabase_connection
+from config import config
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per request when bootstrapping an index from the chunks table
+BOOTSTRAP_PAGE_SIZE = 1000
+
+
+def _parse_embedding(embedding) -> list[float]:
+    """ PostgREST returns pgvector columns as strings like "[0.1,0.2,...]" """
+    return json.loads(embedding) if isinstance(embedding, str) else embedding
+
+
+class UserVectorIndex:
+    """
+    In-memory mirror of one user's chunks.
+
+    Embeddings are kept as a single unit-normalized float32 matrix, so a search
+    is one matrix-vector product (cosine similarity) over every chunk.
+    """
+    def __init__(self):
+        """
+        Initialize an empty index
+        """
+        self.matrix: np.ndarray = np.zeros((0, 0), dtype=np.float32)
+        self.chunk_ids: list[str] = []
+        self.document_ids: list[str] = []
+        self.chunk_indexes: list[int] = []
+        self.texts: list[str] = []
+        # chunk_versions.version of the user when the index was built (None if unknown)
+        self.version: Optional[int] = None
+        self.checked_at = t.monotonic()
+
+    def __len__(self) -> int:
+        return len(self.chunk_ids)
+
+    def add(self, rows: list[dict]):
+        """
+        Append chunk rows to the index
+
+        Args:
+            rows: Chunk rows with id, document_id, chunk_index, original_text and embedding
+        """
+        rows = [row for row in rows if row.get("embedding") is not None]
+        if not rows:
+            return
+
+        vectors = np.asarray([_parse_embedding(row["embedding"]) for row in rows], dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+        self.matrix = vectors if len(self) == 0 else np.vstack([self.matrix, vectors])
+        self.chunk_ids.extend(str(row["id"]) for row in rows)
+        self.document_ids.extend(str(row["document_id"]) for row in rows)
+        self.chunk_indexes.extend(int(row["chunk_index"]) for row in rows)
+        self.texts.extend(row["original_text"] for row in rows)
+
+    def search(self, query_embedding: list[float], match_threshold: float, top_k: int) -> list[dict]:
+        """
+        Find the most similar chunks by cosine similarity
+
+        Args:
+            query_embedding: Embedding of the query
+            match_threshold: Minimum cosine similarity of returned chunks
+            top_k: Maximum number of chunks to return
+
+        Returns:
+            list[dict]: Chunk rows with a similarity score, most similar first
+        """
+        if len(self) == 0 or top_k <= 0:
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        query /= np.linalg.norm(query) or 1.0
+        similarities = self.matrix @ query
+
+        # argpartition finds the top k in linear time; only those get sorted
+        k = min(top_k, len(self))
+        candidates = np.argpartition(-similarities, k - 1)[:k]
+        candidates = candidates[np.argsort(-similarities[candidates])]
+        return [
+            {
+                "id": self.chunk_ids[i],
+                "document_id": self.document_ids[i],
+                "chunk_index": self.chunk_indexes[i],
+                "original_text": self.texts[i],
+                "similarity": float(similarities[i]),
+            }
+            for i in candidates
+            if similarities[i] > match_threshold
+        ]
+
+    def save(self, path_prefix: str):
+        """
+        Write the index to <path_prefix>.npy (embeddings) and <path_prefix>.json (metadata)
+        """
+        for suffix, write in (
+            (".npy", lambda file: np.save(file, self.matrix)),
+            (".json", lambda file: file.write(json.dumps({
+                "chunk_ids": self.chunk_ids,
+                "document_ids": self.document_ids,
+                "chunk_indexes": self.chunk_indexes,
+                "texts": self.texts,
+                "version": self.version,
+            }).encode("utf-8"))),
+        ):
+            # Write to a temporary file and rename, so readers never see a partial snapshot
+            temporary_path = f"{path_prefix}{suffix}.tmp"
+            with open(temporary_path, "wb") as file:
+                write(file)
+            os.replace(temporary_path, f"{path_prefix}{suffix}")
+
+    @classmethod
+    def load(cls, path_prefix: str) -> Optional["UserVectorIndex"]:
+        """
+        Load a snapshot, memory-mapping the embeddings instead of reading them into memory
+
+        Returns:
+            Optional[UserVectorIndex]: The index, or None if there is no snapshot
+        """
+        if not (os.path.exists(f"{path_prefix}.npy") and os.path.exists(f"{path_prefix}.json")):
+            return None
+
+        index = cls()
+        index.matrix = np.load(f"{path_prefix}.npy", mmap_mode="r")
+        with open(f"{path_prefix}.json", "r", encoding="utf-8") as file:
+            metadata = json.load(file)
+        index.chunk_ids = metadata["chunk_ids"]
+        index.document_ids = metadata["document_ids"]
+        index.chunk_indexes = metadata["chunk_indexes"]
+        index.texts = metadata["texts"]
+        index.version = metadata.get("version")
+        if len(index.matrix) != len(index):
+            logger.warning(f"Discarding inconsistent vector index snapshot at {path_prefix}")
+            return None
+        return index
+
+
+class LocalVectorIndex:
+    """
+    Per-user in-process vector indexes mirroring the chunks table.
+
+    A user's index is bootstrapped on their first search, from a snapshot if
+    one exists and is current, otherwise from the chunks table. Uploads append
+    to loaded indexes directly. Because other workers write chunks too, each
+    index records the user's chunk_versions counter (bumped by every insert,
+    update and delete, see migration 012) it was built at, and is rebuilt
+    once the counter moves on, checked at most once per refresh interval.
+    """
+    def __init__(self, supabase_client, snapshot_dir: Optional[str] = None, refresh_seconds: float = 60.0):
+        """
+        Initialize the local vector index
+
+        Args:
+            supabase_client: Supabase client used to read the chunks table
+            snapshot_dir: Directory for memory-mapped snapshots, or None to disable snapshots
+            refresh_seconds: Seconds between version checks against the chunks table
+        """
+        self.supabase_client = supabase_client
+        self.snapshot_dir = snapshot_dir
+        self.refresh_seconds = refresh_seconds
+        self._indexes: dict[str, UserVectorIndex] = {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self.searches = 0
+        self.rebuilds = 0
+
+        if snapshot_dir:
+            os.makedirs(snapshot_dir, exist_ok=True)
+
+    def _snapshot_prefix(self, user_id: str) -> Optional[str]:
+        """ Path prefix of the user's snapshot files """
+        return os.path.join(self.snapshot_dir, user_id) if self.snapshot_dir else None
+
+    def _fetch_version(self, user_id: str) -> int:
+        """ Read the user's chunk_versions counter (0 if their chunks were never written since migration 012) """
+        rows = self.supabase_client.table("chunk_versions").select("version").eq("user_id", user_id).limit(1).execute().data
+        return rows[0]["version"] if rows else 0
+
+    def _fetch_chunks(self, user_id: str) -> UserVectorIndex:
+        """ Build a user's index from the chunks table, one page at a time """
+        index = UserVectorIndex()
+        start = 0
+        while True:
+            response = self.supabase_client.table("chunks")\
+                .select("id, document_id, chunk_index, original_text, embedding")\
+                .eq("user_id", user_id)\
+                .order("id")\
+                .range(start, start + BOOTSTRAP_PAGE_SIZE - 1)\
+                .execute()
+            index.add(response.data)
+            if len(response.data) < BOOTSTRAP_PAGE_SIZE:
+                return index
+            start += BOOTSTRAP_PAGE_SIZE
+
+    def _load(self, user_id: str, current: Optional[UserVectorIndex]) -> UserVectorIndex:
+        """
+        Return a current index for the user, loading or rebuilding it if needed
+        """
+        version = self._fetch_version(user_id)
+        if current is not None and current.version == version:
+            current.checked_at = t.monotonic()
+            return current
+
+        prefix = self._snapshot_prefix(user_id)
+        if current is None and prefix:
+            snapshot = UserVectorIndex.load(prefix)
+            if snapshot is not None and snapshot.version == version:
+                logger.info(f"Loaded vector index snapshot for user {user_id} with {len(snapshot)} chunks")
+                return snapshot
+
+        # The version was read before the rows: a write racing with the rebuild leaves the recorded
+        # version behind the rows, so the index is rebuilt again rather than missing the write
+        index = self._fetch_chunks(user_id)
+        index.version = version
+        self.rebuilds += 1
+        logger.info(f"Built vector index for user {user_id} with {len(index)} chunks")
+        if prefix:
+            index.save(prefix)
+        return index
+
+    async def ensure_loaded(self, user_id: str) -> UserVectorIndex:
+        """
+        Get the user's index, bootstrapping or refreshing it when needed
+
+        Args:
+            user_id: The user whose chunks to index
+
+        Returns:
+            UserVectorIndex: The user's index
+        """
+        index = self._indexes.get(user_id)
+        if index is not None and t.monotonic() - index.checked_at < self.refresh_seconds:
+            return index
+
+        lock = self._locks.setdefault(user_id, asyncio.Lock())
+        async with lock:
+            index = self._indexes.get(user_id)
+            if index is not None and t.monotonic() - index.checked_at < self.refresh_seconds:
+                return index
+            # The Supabase client is synchronous, so keep reads off the event loop
+            index = await asyncio.to_thread(self._load, user_id, index)
+            self._indexes[user_id] = index
+            return index
+
+    async def search(self, user_id: str, query_embedding: list[float], match_threshold: float, top_k: int) -> list[dict]:
+        """
+        Search the user's chunks
+
+        Args:
+            user_id: The user whose chunks to search
+            query_embedding: Embedding of the query
+            match_threshold: Minimum cosine similarity of returned chunks
+            top_k: Maximum number of chunks to return
+
+        Returns:
+            list[dict]: Chunk rows with a similarity score, most similar first
+        """
+        index = await self.ensure_loaded(user_id)
+        self.searches += 1
+        return index.search(query_embedding, match_threshold, top_k)
+
+    async def add_chunks(self, user_id: str, rows: list[dict]):
+        """
+        Append newly inserted chunks to the user's index if it is loaded
+
+        The rows are searchable in this process straight away; the insert also
+        bumped the user's version, so the index is still rebuilt at its next
+        check, which picks up writes made concurrently by other processes.
+        Unloaded indexes pick the rows up when they are bootstrapped.
+
+        Args:
+            user_id: The user who owns the chunks
+            rows: Inserted chunk rows with id, document_id, chunk_index, original_text and embedding
+        """
+        index = self._indexes.get(user_id)
+        if index is None:
+            return
+        async with self._locks.setdefault(user_id, asyncio.Lock()):
+            index.add(rows)
+
+    def invalidate_user(self, user_id: str):
+        """
+        Drop the user's index so it is rebuilt on the next search (e.g. after chunks are deleted)
+        """
+        self._indexes.pop(user_id, None)
+
+    def stats(self) -> dict:
+        """
+        Get index statistics
+
+        Returns:
+            dict: Loaded users, indexed chunks, searches and rebuilds
+        """
+        return {
+            "enabled": config.local_vector_index_enabled,
+            "users": len(self._indexes),
+            "chunks": sum(len(index) for index in self._indexes.values()),
+            "searches": self.searches,
+            "rebuilds": self.rebuilds,
+        }
+
+
+local_vector_index = LocalVectorIndex(
+    get_supabase_connection(),
+    snapshot_dir=config.local_vector_index_snapshot_dir,
+    refresh_seconds=config.local_vector_index_refresh_seconds,
+)
@@ -0,0 +1,104 @@
+"""
+Benchmark chunkers on a large corpus: throughput and chunk-size distribution.
+
+Chunks the same text three ways:
+
+    recursive split: RecursiveCharacterTextSplitter over the whole text at once, the
+                     ingestion path before chunks were streamed
+    streaming chars: StreamingChunker, the same splitter over a bounded buffer
+                     (chunking_strategy = "characters")
+    token chunker:   TokenChunker, single pass with structural boundaries and token
+                     budgets (chunking_strategy = "tokens")
+
+and reports MB/s along with the token counts of the chunks, since the embedding
+model's limits and costs are in tokens. Token counts use tiktoken's cl100k_base;
+if it can't be loaded (tiktoken downloads it on first use) they are estimated
+from characters, which the output says.
+
+    python benchmarks/bench_chunkers.py --megabytes 20
+    python benchmarks/bench_chunkers.py --corpus-file /path/to/corpus.txt
+"""
+import argparse
+import sys
+import time as t
+from pathlib import Path
+
+import numpy as np
+import tiktoken
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.chunking import StreamingChunker, TokenChunker, token_counter
+from config import config
+
+PIECE_CHARS = 64 * 1024
+
+
+def _corpus(args) -> str:
+    if args.corpus_file:
+        return Path(args.corpus_file).read_text()
+    sample = Path(__file__).parent.parent.joinpath("test_data/sample_doc.txt").read_text()
+    return sample * max(1, int(args.megabytes * 1e6) // len(sample))
+
+
+def _pieces(text: str):
+    """ The text as the extractors stream it: in read-sized blocks """
+    for start in range(0, len(text), PIECE_CHARS):
+        yield text[start:start + PIECE_CHARS]
+
+
+def _tokenizer_name(encoding_name: str) -> str:
+    try:
+        tiktoken.get_encoding(encoding_name)
+        return f"tiktoken {encoding_name}"
+    except Exception:
+        return "estimate (chars / 4; tiktoken encoding unavailable)"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--corpus-file", help="Text file to chunk (default: the sample document repeated)")
+    parser.add_argument("--megabytes", type=float, default=10, help="Size of the generated corpus")
+    parser.add_argument("--chunk-size", type=int, default=config.chunk_size, help="Characters per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=config.chunk_overlap)
+    parser.add_argument("--chunk-tokens", type=int, default=config.chunk_tokens, help="Tokens per chunk")
+    parser.add_argument("--overlap-tokens", type=int, default=config.chunk_overlap_tokens)
+    args = parser.parse_args()
+
+    text = _corpus(args)
+    megabytes = len(text.encode("utf-8")) / 1e6
+    count_tokens = token_counter("cl100k_base")
+    chunkers = {
+        "recursive split": lambda: RecursiveCharacterTextSplitter(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+        ).split_text(text),
+        "streaming chars": lambda: StreamingChunker(
+            chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap
+        ).chunk_iter(_pieces(text)),
+        "token chunker": lambda: TokenChunker(
+            chunk_tokens=args.chunk_tokens, overlap_tokens=args.overlap_tokens
+        ).chunk_iter(_pieces(text)),
+    }
+
+    print(f"corpus={megabytes:.1f} MB tokenizer={_tokenizer_name('cl100k_base')}")
+    print(f"chars: {args.chunk_size}/{args.chunk_overlap} overlap, tokens: {args.chunk_tokens}/{args.overlap_tokens} overlap")
+    print(
+        f"{'chunker':<16} {'seconds':>8} {'MB/s':>7} {'chunks':>8} "
+        f"{'p5 tok':>7} {'p50 tok':>8} {'p95 tok':>8} {'max tok':>8} {f'>{args.chunk_tokens} tok':>9}"
+    )
+    for name, run in chunkers.items():
+        start = t.perf_counter()
+        chunks = list(run())
+        elapsed = t.perf_counter() - start
+        tokens = np.array([count_tokens(chunk) for chunk in chunks])
+        p5, p50, p95 = np.percentile(tokens, [5, 50, 95])
+        over = np.mean(tokens > args.chunk_tokens)
+        print(
+            f"{name:<16} {elapsed:>8.2f} {megabytes / elapsed:>7.1f} {len(chunks):>8} "
+            f"{p5:>7.0f} {p50:>8.0f} {p95:>8.0f} {tokens.max():>8} {over:>9.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
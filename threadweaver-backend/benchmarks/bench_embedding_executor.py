@@ -0,0 +1,153 @@
+"""
+Benchmark the ingestion embedding executor against a local fake embedding server.
+
+Starts an OpenAI-compatible /v1/embeddings server in process whose latency
+grows with the tokens in a request and which answers 429 with Retry-After
+once a requests-per-second limit is exceeded. The real OpenAIEmbeddings
+client is pointed at it, and a synthetic corpus of chunks is embedded:
+
+    baseline:      one aembed_documents call for every chunk (the old _embed_chunks path)
+    executor (cN): EmbeddingExecutor with N concurrent batches
+
+    python benchmarks/bench_embedding_executor.py --chunks 2000 --requests-per-second 20
+"""
+import argparse
+import asyncio
+import base64
+import socket
+import sys
+import time as t
+from pathlib import Path
+
+import numpy as np
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langchain_openai import OpenAIEmbeddings
+
+from app.services.embedding_executor import EmbeddingExecutor
+
+
+def create_fake_embedding_server(dimensions: int, base_latency: float, seconds_per_token: float, requests_per_second: float) -> FastAPI:
+    """ OpenAI-compatible embeddings endpoint with token-proportional latency and a request rate limit """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.rate_limited = 0
+    window = {"start": t.monotonic(), "count": 0}
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+
+        # Fixed one-second windows of at most requests_per_second requests
+        now = t.monotonic()
+        if now - window["start"] >= 1.0:
+            window["start"], window["count"] = now, 0
+        window["count"] += 1
+        if window["count"] > requests_per_second:
+            app.state.rate_limited += 1
+            retry_after = round(1.0 - (now - window["start"]), 3)
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": str(retry_after)},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+
+        inputs = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(len(text) // 4 + 1 for text in inputs)
+        await asyncio.sleep(base_latency + seconds_per_token * tokens)
+
+        vector = np.full(dimensions, 1 / np.sqrt(dimensions), dtype=np.float32)
+        if body.get("encoding_format") == "base64":
+            encoded = base64.b64encode(vector.tobytes()).decode("ascii")
+            data = [{"object": "embedding", "index": i, "embedding": encoded} for i in range(len(inputs))]
+        else:
+            data = [{"object": "embedding", "index": i, "embedding": vector.tolist()} for i in range(len(inputs))]
+        return {
+            "object": "list",
+            "data": data,
+            "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--chunk-chars", type=int, default=700)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--base-latency", type=float, default=0.05, help="Seconds per request")
+    parser.add_argument("--seconds-per-token", type=float, default=0.00002)
+    parser.add_argument("--requests-per-second", type=float, default=20)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--concurrency", default="1,4,8", help="Comma-separated executor concurrency levels")
+    args = parser.parse_args()
+
+    app = create_fake_embedding_server(args.dimensions, args.base_latency, args.seconds_per_token, args.requests_per_second)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    server_task = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    model = OpenAIEmbeddings(
+        model="text-embedding-3-small",
+        api_key="benchmark",
+        base_url=f"http://127.0.0.1:{port}/v1",
+        check_embedding_ctx_length=False,
+        max_retries=0,
+    )
+    rng = np.random.default_rng(0)
+    words = ["roadmap", "launch", "audit", "customer", "pipeline", "quarter", "release", "budget", "notion", "meeting"]
+    texts = [
+        " ".join(rng.choice(words, size=args.chunk_chars // 8)) for _ in range(args.chunks)
+    ]
+    tokens = sum(len(text) // 4 + 1 for text in texts)
+
+    print(f"chunks={args.chunks} estimated_tokens={tokens} server_rps_limit={args.requests_per_second}")
+    print(f"{'run':<16} {'seconds':>8} {'chunks/s':>10} {'tokens/s':>11} {'requests':>9} {'429s':>6}")
+
+    async def run(name: str, embed):
+        app.state.requests = app.state.rate_limited = 0
+        # Let the server's rate-limit window reset between runs
+        await asyncio.sleep(1.0)
+        start = t.perf_counter()
+        embeddings = await embed(texts)
+        elapsed = t.perf_counter() - start
+        assert len(embeddings) == len(texts)
+        print(
+            f"{name:<16} {elapsed:>8.2f} {len(texts) / elapsed:>10.1f} {tokens / elapsed:>11.0f} "
+            f"{app.state.requests:>9} {app.state.rate_limited:>6}"
+        )
+
+    try:
+        await run("baseline", model.aembed_documents)
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            executor = EmbeddingExecutor(
+                model.aembed_documents,
+                max_batch_size=args.batch_size,
+                max_batch_tokens=50000,
+                max_concurrency=concurrency,
+                max_retries=10,
+                backoff_seconds=0.25,
+            )
+            await run(f"executor (c{concurrency})", executor.embed)
+    finally:
+        server.should_exit = True
+        await server_task
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,157 @@
+"""
+Benchmark match_documents (global ivfflat scan) against match_user_chunks (user-scoped HNSW).
+
+Seeds synthetic chunks into the configured Supabase project in growing steps,
+then for each step measures per-query latency and recall@k of both functions
+for one user. Ground truth is an exact cosine top-k over that user's seeded
+vectors. Rows are split between the target user and a second "noise" user so
+the effect of other tenants' chunks on the unscoped function is visible.
+To compare against the ivfflat index itself, run it once before applying
+migration 008 (with --skip-user-chunks) and once after.
+
+Run against a disposable project with migration 008 applied and a service role key:
+
+    python benchmarks/bench_match_documents.py --user-id <uuid> --noise-user-id <uuid> --sizes 2000,10000,50000
+
+All seeded documents and chunks are deleted at the end.
+"""
+import argparse
+import statistics
+import sys
+import time as t
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.supabase_client import get_supabase_connection
+
+DIMENSIONS = 1536
+INSERT_BATCH_SIZE = 500
+
+
+def _random_unit_vectors(rng: np.random.Generator, count: int) -> np.ndarray:
+    vectors = rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def _create_document(supabase_client, user_id: str) -> str:
+    response = supabase_client.table("documents").insert({
+        "user_id": user_id,
+        "original_filename": "benchmark.txt",
+        "mime_type": "text/plain",
+        "file_size_bytes": 0,
+        "integration_type": "upload",
+        "integration_id": None,
+        "external_id": None,
+        "content_type": "file",
+        "title": "match_documents benchmark",
+    }).execute()
+    return response.data[0]["id"]
+
+
+def _insert_chunks(supabase_client, user_id: str, document_id: str, vectors: np.ndarray, start_index: int) -> list[str]:
+    """ Insert vectors as chunks, returning the new chunk ids in order """
+    chunk_ids = []
+    for offset in range(0, len(vectors), INSERT_BATCH_SIZE):
+        batch = vectors[offset:offset + INSERT_BATCH_SIZE]
+        response = supabase_client.table("chunks").insert([
+            {
+                "document_id": document_id,
+                "user_id": user_id,
+                "integration_type": "upload",
+                "chunk_index": start_index + offset + i,
+                "original_text": f"benchmark chunk {start_index + offset + i}",
+                "embedding": vector.tolist(),
+            }
+            for i, vector in enumerate(batch)
+        ]).execute()
+        chunk_ids.extend(row["id"] for row in response.data)
+    return chunk_ids
+
+
+def _time_rpc(supabase_client, name: str, params: dict) -> tuple[float, list[dict]]:
+    start = t.perf_counter()
+    response = supabase_client.rpc(name, params).execute()
+    return (t.perf_counter() - start) * 1000, response.data
+
+
+def _recall(returned_ids: list[str], expected_ids: set[str]) -> float:
+    return len(set(returned_ids) & expected_ids) / len(expected_ids) if expected_ids else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--user-id", required=True, help="User whose chunks are searched")
+    parser.add_argument("--noise-user-id", help="Second user that owns half of the seeded rows")
+    parser.add_argument("--sizes", default="2000,10000,50000", help="Comma-separated total row counts to benchmark at")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--ef-search", type=int, default=40)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--skip-user-chunks", action="store_true", help="Only benchmark match_documents (before migration 008)")
+    args = parser.parse_args()
+
+    supabase_client = get_supabase_connection()
+    rng = np.random.default_rng(args.seed)
+    owners = [args.user_id] + ([args.noise_user_id] if args.noise_user_id else [])
+    documents = {owner: _create_document(supabase_client, owner) for owner in owners}
+
+    user_vectors = np.zeros((0, DIMENSIONS), dtype=np.float32)
+    user_chunk_ids: list[str] = []
+    seeded = {owner: 0 for owner in owners}
+
+    print(f"{'rows':>8} {'function':<18} {'p50 ms':>8} {'p95 ms':>8} {'recall@' + str(args.top_k):>10}")
+    try:
+        for size in (int(size) for size in args.sizes.split(",")):
+            # Grow each owner's share up to the target size
+            for owner in owners:
+                missing = size // len(owners) - seeded[owner]
+                if missing <= 0:
+                    continue
+                vectors = _random_unit_vectors(rng, missing)
+                chunk_ids = _insert_chunks(supabase_client, owner, documents[owner], vectors, seeded[owner])
+                seeded[owner] += missing
+                if owner == args.user_id:
+                    user_vectors = np.vstack([user_vectors, vectors])
+                    user_chunk_ids.extend(chunk_ids)
+
+            # Queries near existing user chunks, so the true neighbours are meaningful
+            anchors = user_vectors[rng.integers(0, len(user_vectors), args.queries)]
+            queries = anchors + 0.05 * _random_unit_vectors(rng, args.queries)
+            queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+            results = {"match_documents": ([], [])} if args.skip_user_chunks else {"match_documents": ([], []), "match_user_chunks": ([], [])}
+            for query in queries:
+                expected = {user_chunk_ids[i] for i in np.argsort(-(user_vectors @ query))[:args.top_k]}
+                embedding = query.tolist()
+
+                latency, rows = _time_rpc(supabase_client, "match_documents", {
+                    "query_embedding": embedding, "match_threshold": -1.0, "match_count": args.top_k,
+                })
+                # Only the user's own rows are usable, so other tenants' rows count as misses
+                results["match_documents"][0].append(latency)
+                results["match_documents"][1].append(_recall([row["id"] for row in rows if row["user_id"] == args.user_id], expected))
+
+                if args.skip_user_chunks:
+                    continue
+                latency, rows = _time_rpc(supabase_client, "match_user_chunks", {
+                    "query_embedding": embedding, "match_threshold": -1.0, "match_count": args.top_k,
+                    "filter_user_id": args.user_id, "ef_search": args.ef_search,
+                })
+                results["match_user_chunks"][0].append(latency)
+                results["match_user_chunks"][1].append(_recall([row["id"] for row in rows], expected))
+
+            for name, (latencies, recalls) in results.items():
+                p50 = statistics.median(latencies)
+                p95 = statistics.quantiles(latencies, n=20)[-1]
+                print(f"{size:>8} {name:<18} {p50:>8.1f} {p95:>8.1f} {statistics.mean(recalls):>10.3f}")
+    finally:
+        for document_id in documents.values():
+            supabase_client.table("chunks").delete().eq("document_id", document_id).execute()
+            supabase_client.table("documents").delete().eq("id", document_id).execute()
+
+
+if __name__ == "__main__":
+    main()
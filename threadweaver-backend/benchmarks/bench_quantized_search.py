@@ -0,0 +1,111 @@
+"""
+Benchmark quantized shortlisting with full-precision rescoring.
+
+Models the representations used by migration 009 in NumPy: full-precision
+float32 vectors, halfvec (float16) and binary (one sign bit per dimension,
+compared by Hamming distance). For each, a query shortlists top_k *
+rescore_factor candidates on the compact form and re-ranks them by exact
+cosine similarity. Reports recall@k against an exact search, per-query latency
+of the shortlist scan, bytes per stored vector and the total vector index size
+under each configuration: configure_vector_search_quantization replaces the
+full-precision HNSW index with the compact one, so a quantized configuration
+keeps a single index. Index sizes add an estimate of HNSW's layer-0 neighbour
+lists (2 * m item pointers per vector) to the vector data. Latency here is a NumPy
+brute-force scan (binary uses a popcount lookup table); Postgres scans the
+HNSW indexes with native distance functions, so compare latencies there.
+
+Uses clustered synthetic vectors by default, or real embeddings from a .npy file:
+
+    python benchmarks/bench_quantized_search.py --rows 100000 --rescore-factor 4
+    python benchmarks/bench_quantized_search.py --embeddings-file embeddings.npy
+"""
+import argparse
+import statistics
+import time as t
+
+import numpy as np
+
+# Estimated HNSW graph bytes per vector: 2 * m (m = 16, migrations 008/009) 6-byte item pointers at layer 0
+HNSW_NEIGHBOR_BYTES = 2 * 16 * 6
+
+# Number of set bits for every byte value, for Hamming distance over packed bits
+POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _synthetic_embeddings(rng: np.random.Generator, rows: int, dimensions: int, clusters: int = 200) -> np.ndarray:
+    """ Clustered unit vectors, closer to real embedding distributions than isotropic noise """
+    centers = rng.standard_normal((clusters, dimensions)).astype(np.float32)
+    vectors = centers[rng.integers(0, clusters, rows)] + 0.6 * rng.standard_normal((rows, dimensions)).astype(np.float32)
+    return _normalize(vectors)
+
+
+def _shortlist(name: str, compact: np.ndarray, query: np.ndarray, count: int) -> np.ndarray:
+    """ Indexes of the count best rows on the compact representation """
+    if name == "binary":
+        distances = POPCOUNT[np.bitwise_xor(compact, np.packbits(query > 0))].sum(axis=1, dtype=np.int32)
+        return np.argpartition(distances, count - 1)[:count]
+    scores = compact @ query
+    return np.argpartition(-scores, count - 1)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--rescore-factor", type=int, default=4)
+    parser.add_argument("--embeddings-file", help=".npy file of real embeddings (rows x dimensions)")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    if args.embeddings_file:
+        vectors = _normalize(np.load(args.embeddings_file).astype(np.float32))
+    else:
+        vectors = _synthetic_embeddings(rng, args.rows, args.dimensions)
+    anchors = vectors[rng.integers(0, len(vectors), args.queries)]
+    queries = _normalize(anchors + 0.3 * _normalize(rng.standard_normal(anchors.shape).astype(np.float32)))
+
+    # NumPy has no fast float16 matmul, so halfvec is scored as float16-rounded float32 values;
+    # its recall is exact, its latency matches float32 and its size is counted at 2 bytes per dimension
+    representations = {
+        "vector (float32)": (vectors, 4 * vectors.shape[1]),
+        "halfvec (float16)": (vectors.astype(np.float16).astype(np.float32), 2 * vectors.shape[1]),
+        "binary": (np.packbits(vectors > 0, axis=1), (vectors.shape[1] + 7) // 8),
+    }
+    shortlist_count = args.top_k * args.rescore_factor
+
+    print(f"rows={len(vectors)} dimensions={vectors.shape[1]} top_k={args.top_k} rescore_factor={args.rescore_factor}")
+    print(
+        f"{'representation':<20} {'bytes/vector':>12} {'total index MB':>15} {'vs full':>8} "
+        f"{'p50 ms':>8} {'recall@' + str(args.top_k):>10}"
+    )
+    full_index_bytes = (representations["vector (float32)"][1] + HNSW_NEIGHBOR_BYTES) * len(vectors)
+    for name, (compact, bytes_per_vector) in representations.items():
+        kind = name.split(" ")[0]
+        latencies, recalls = [], []
+        for query in queries:
+            expected = set(np.argpartition(-(vectors @ query), args.top_k - 1)[:args.top_k].tolist())
+
+            start = t.perf_counter()
+            candidates = _shortlist(kind, compact, query, shortlist_count)
+            # Rescore the shortlist at full precision
+            rescored = candidates[np.argsort(-(vectors[candidates] @ query))[:args.top_k]]
+            latencies.append((t.perf_counter() - start) * 1000)
+            recalls.append(len(expected & set(rescored.tolist())) / args.top_k)
+
+        # The only vector index in this configuration: full precision, or the compact one replacing it
+        index_bytes = (bytes_per_vector + HNSW_NEIGHBOR_BYTES) * len(vectors)
+        print(
+            f"{name:<20} {bytes_per_vector:>12} {index_bytes / 1e6:>15.1f} {index_bytes / full_index_bytes:>8.2f} "
+            f"{statistics.median(latencies):>8.2f} {statistics.mean(recalls):>10.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
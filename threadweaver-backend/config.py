@@ -1,7 +1,7 @@
 import os 
 from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from pydantic import Field
+from pydantic import Field, PrivateAttr
 
 
 class Config(BaseSettings):
@@ -47,6 +47,15 @@ class Config(BaseSettings):
     supabase_jwks_url: Optional[str] = Field(
         default=None, description="The JWKS URL for the Supabase database", repr=False
     )
+    database_url: Optional[str] = Field(
+        default=None, description="Direct Postgres connection string for bulk chunk writes with COPY (chunks are inserted through Supabase if unset)", repr=False
+    )
+    database_pool_min_size: int = Field(
+        default=1, description="Postgres connections kept open for bulk chunk writes"
+    )
+    database_pool_max_size: int = Field(
+        default=5, description="Maximum Postgres connections for bulk chunk writes"
+    )
 
     # AI configuration
     openai_api_key: Optional[str] = Field(
@@ -58,29 +67,222 @@ class Config(BaseSettings):
     langsmith_api_key: Optional[str] = Field(
         default=None, description="The API key for the LangSmith API", repr=False
     )
+    embedding_model: str = Field(
+        default="text-embedding-3-small", description="The OpenAI embedding model"
+    )
+    openai_max_connections: int = Field(
+        default=50, description="Maximum number of pooled HTTP connections to the OpenAI API"
+    )
+    openai_max_keepalive_connections: int = Field(
+        default=10, description="Maximum number of idle keep-alive connections to the OpenAI API"
+    )
+    query_embedding_cache_max_entries: int = Field(
+        default=2048, description="Maximum number of query embeddings kept in memory"
+    )
+    query_embedding_cache_path: Optional[str] = Field(
+        default=None, description="SQLite file for the on-disk query embedding cache tier (disabled if unset)"
+    )
+    anthropic_timeout_seconds: float = Field(
+        default=120.0, description="Timeout in seconds for Anthropic API requests"
+    )
+    anthropic_max_connections: int = Field(
+        default=100, description="Maximum number of pooled HTTP connections to the Anthropic API"
+    )
+    anthropic_max_keepalive_connections: int = Field(
+        default=20, description="Maximum number of idle keep-alive connections to the Anthropic API"
+    )
 
     # CORS configuration
     cors_origins: list[str] = Field(
         default=["http://localhost:5173"], description="Allowed CORS origins"
     )
 
+    # Embedding clients keyed by model and options, shared so their HTTP connection pools are reused
+    _embedding_models: dict = PrivateAttr(default_factory=dict)
+
     def get_embedding_model(self, embedding_model: Optional[str] = None, **kwargs) -> any:
-        """ Get the embedding model """
+        """ Get the shared embedding model client """
+        import httpx
         from langchain_openai import OpenAIEmbeddings
 
-        model = embedding_model or "text-embedding-3-small"
-        return OpenAIEmbeddings(api_key=self.openai_api_key, model=model, **kwargs)
+        model = embedding_model or self.embedding_model
+        key = (model, repr(sorted(kwargs.items())))
+        if key not in self._embedding_models:
+            limits = httpx.Limits(
+                max_connections=self.openai_max_connections,
+                max_keepalive_connections=self.openai_max_keepalive_connections,
+            )
+            self._embedding_models[key] = OpenAIEmbeddings(
+                api_key=self.openai_api_key,
+                model=model,
+                http_client=httpx.Client(limits=limits),
+                http_async_client=httpx.AsyncClient(limits=limits),
+                **kwargs
+            )
+        return self._embedding_models[key]
 
     notion_token: Optional[str] = Field(
         default=None, description="The API key for the Notion API", repr=False
     )
 
-    def get_search_model(self, search_model: Optional[str] = None, **kwargs) -> any:
-        """ Get the search model """
-        from langchain_openai import OpenAIEmbeddings
+    # Notion MCP configuration
+    notion_mcp_pool_size: int = Field(
+        default=2, description="Number of long-lived Notion MCP server sessions kept in the pool"
+    )
+    notion_mcp_startup_timeout_seconds: float = Field(
+        default=60.0, description="Seconds to wait for a Notion MCP server to start and initialize"
+    )
+    notion_mcp_acquire_timeout_seconds: float = Field(
+        default=30.0, description="Seconds to wait for a free Notion MCP session before failing"
+    )
+    notion_mcp_health_check_interval_seconds: float = Field(
+        default=30.0, description="Seconds between health checks of idle Notion MCP sessions"
+    )
+    notion_mcp_ping_timeout_seconds: float = Field(
+        default=5.0, description="Seconds to wait for a Notion MCP session to answer a ping"
+    )
+
+    # Chat configuration
+    tool_catalog_ttl_seconds: float = Field(
+        default=600.0, description="Seconds the cached Notion tool catalog stays fresh"
+    )
+    tool_call_timeout_seconds: float = Field(
+        default=30.0, description="Seconds a single tool call may run, once it has a Notion MCP session, before it is reported as failed"
+    )
+    max_concurrent_tool_calls: int = Field(
+        default=4, description="Maximum number of tool calls run at once for a single chat request (capped at notion_mcp_pool_size)"
+    )
+    tool_result_cache_max_entries: int = Field(
+        default=512, description="Maximum number of cached read-only Notion tool results"
+    )
+    context_token_budget: int = Field(
+        default=60000, description="Maximum estimated tokens of conversation sent to Claude per call"
+    )
+    tool_result_token_limit: int = Field(
+        default=4000, description="Maximum estimated tokens kept from a single tool result"
+    )
+    context_summary_token_budget: int = Field(
+        default=1000, description="Maximum estimated tokens for the summary of older conversation turns"
+    )
+    intent_router_enabled: bool = Field(
+        default=True, description="Whether to route conversational and retrieve-only turns past retrieval or tools"
+    )
+    intent_classifier_model: str = Field(
+        default="claude-3-5-haiku-20241022", description="The model used to classify chat intents"
+    )
+    intent_confidence_threshold: float = Field(
+        default=0.6, description="Minimum classifier confidence to skip pipeline stages; below it the full pipeline runs"
+    )
+    semantic_cache_enabled: bool = Field(
+        default=False, description="Whether to answer repeated opening questions (single-message requests) from the semantic response cache"
+    )
+    semantic_cache_similarity_threshold: float = Field(
+        default=0.95, description="Minimum cosine similarity between query embeddings for a semantic cache hit"
+    )
+    semantic_cache_ttl_seconds: float = Field(
+        default=3600.0, description="Seconds a cached answer stays valid"
+    )
+    semantic_cache_max_entries: int = Field(
+        default=1000, description="Maximum number of cached answers across all users"
+    )
 
-        model = search_model or "text-embedding-3-small"
-        return OpenAIEmbeddings(api_key=self.openai_api_key, model=model, **kwargs)
+    # Document ingestion configuration
+    chunking_strategy: str = Field(
+        default="tokens", description="How documents are chunked: 'tokens' (model tokens, structural boundaries) or 'characters' (recursive character splitter)"
+    )
+    chunk_tokens: int = Field(
+        default=200, description="Maximum tokens per document chunk with the tokens strategy"
+    )
+    chunk_overlap_tokens: int = Field(
+        default=30, description="Maximum tokens shared between neighbouring chunks with the tokens strategy"
+    )
+    chunk_size: int = Field(
+        default=700, description="Maximum characters per document chunk with the characters strategy"
+    )
+    chunk_overlap: int = Field(
+        default=100, description="Characters shared between neighbouring chunks with the characters strategy"
+    )
+    ingestion_read_size_bytes: int = Field(
+        default=64 * 1024, description="Bytes read from an upload at a time"
+    )
+    extraction_workers: int = Field(
+        default=2, description="Worker processes that extract text from uploads and split it into chunks"
+    )
+    ingestion_window_size: int = Field(
+        default=128, description="Chunks embedded and inserted together during ingestion"
+    )
+    embedding_batch_size: int = Field(
+        default=32, description="Maximum chunks per embedding request during ingestion"
+    )
+    embedding_batch_max_tokens: int = Field(
+        default=50000, description="Maximum estimated tokens per embedding request during ingestion"
+    )
+    embedding_max_concurrency: int = Field(
+        default=4, description="Maximum embedding requests in flight; halved while rate limited"
+    )
+    embedding_max_retries: int = Field(
+        default=5, description="Retries of a failed embedding batch before ingestion fails"
+    )
+    embedding_backoff_seconds: float = Field(
+        default=1.0, description="Backoff before retrying an embedding batch without Retry-After, doubled per retry"
+    )
+    embedding_store_enabled: bool = Field(
+        default=True, description="Reuse stored embeddings of chunks whose text the same user embedded before (embedding_store table)"
+    )
+    ingestion_queue_dir: str = Field(
+        default=".ingestion", description="Directory for the durable ingestion job database and spooled uploads"
+    )
+    ingestion_workers: int = Field(
+        default=2, description="Ingestion jobs processed concurrently"
+    )
+    ingestion_max_attempts: int = Field(
+        default=3, description="Attempts per ingestion job before it is marked failed"
+    )
+    ingestion_retry_backoff_seconds: float = Field(
+        default=5, description="Delay before retrying a failed ingestion job, doubled on each further retry"
+    )
+    ingestion_max_queued_jobs: int = Field(
+        default=100, description="Ingestion jobs allowed to wait before new uploads are rejected"
+    )
+
+    # Retrieval configuration
+    rag_search_mode: str = Field(
+        default="vector", description="Default document search mode: vector, keyword or hybrid (keyword and vector fused with RRF; ignores the similarity threshold)"
+    )
+    vector_search_ef_search: int = Field(
+        default=40, description="HNSW candidate list size for user-scoped vector search (higher is slower with better recall)"
+    )
+    vector_search_quantization: Optional[str] = Field(
+        default=None, description="Compact index used to shortlist user-scoped vector search: halfvec, binary or None (full precision); configure_vector_search_quantization (migration 009) swaps the full-precision index for it"
+    )
+    vector_search_rescore_factor: int = Field(
+        default=4, description="Shortlist size as a multiple of top_k when rescoring a quantized search at full precision"
+    )
+    rag_candidate_count: int = Field(
+        default=12, description="Candidates retrieved per chat query before MMR diversification"
+    )
+    rag_max_chunks: int = Field(
+        default=4, description="Maximum chunks kept by MMR before adjacent chunks are merged"
+    )
+    rag_mmr_lambda: float = Field(
+        default=0.7, description="MMR trade-off between relevance (1.0) and diversity (0.0)"
+    )
+    rag_context_token_budget: int = Field(
+        default=2000, description="Maximum estimated tokens of retrieved context added to a chat turn"
+    )
+    local_vector_index_enabled: bool = Field(
+        default=False, description="Search an in-process mirror of each user's chunk embeddings instead of calling Postgres"
+    )
+    local_vector_index_snapshot_dir: Optional[str] = Field(
+        default=None, description="Directory for memory-mapped vector index snapshots (None keeps indexes in memory only)"
+    )
+    local_vector_index_refresh_seconds: float = Field(
+        default=60, description="Seconds between checks of a user's chunk_versions counter, which rebuilds their local vector index after any write"
+    )
+
+    def get_search_model(self, search_model: Optional[str] = None, **kwargs) -> any:
+        """ Get the search model (the same shared client as the embedding model) """
+        return self.get_embedding_model(search_model, **kwargs)
 
 config = Config()
 
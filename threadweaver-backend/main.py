@@ -6,13 +6,19 @@ from config import config
 from fastapi.middleware.cors import CORSMiddleware
 
 import supabase
+from app.db.chunk_writer import chunk_bulk_writer
 from app.db.supabase_client import get_supabase_connection, supabase_client
+from app.integrations.NotionMCPClient import notion_mcp_pool
+from app.services.extraction_pool import chunk_extraction_pool
+from app.services.ingestion_jobs import ingestion_job_queue
+from app.services.llm_chat_service import client as anthropic_client
 
 from app.api.chat import router as chat_router
 from app.api.users import router as users_router
 from app.api.sessions import router as sessions_router
 from app.api.documents import router as documents_router
 from app.api.search import router as search_router
+from app.api.metrics import router as metrics_router
 
 # Create the FastAPI app
 app = FastAPI(
@@ -67,10 +73,27 @@ async def startup_event():
         logger.error(f"Error starting up: {e}")
         raise e
 
+    # Warm the Notion MCP session pool; dead sessions are respawned on first use
+    await notion_mcp_pool.start()
+
+    # Resume ingestion jobs left over from the last run and start the ingestion workers
+    await ingestion_job_queue.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """ Shutdown event """
+    logger.info("Shutting down...")
+    await ingestion_job_queue.close()
+    await chunk_bulk_writer.close()
+    await chunk_extraction_pool.close()
+    await notion_mcp_pool.close()
+    await anthropic_client.close()
+
 app.include_router(chat_router)
 app.include_router(users_router)
 app.include_router(sessions_router)
 app.include_router(documents_router)
 app.include_router(search_router)
+app.include_router(metrics_router)
 if __name__ == "__main__":
     uvicorn.run(app, host=config.host, port=config.port)
\ No newline at end of file
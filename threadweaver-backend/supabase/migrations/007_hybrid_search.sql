@@ -0,0 +1,87 @@
+-- Hybrid search: full-text (ts_vector, chunks_bm25_idx) and vector candidates fused with
+-- reciprocal rank fusion in a single round trip. A chunk's score is the sum of
+-- weight / (rrf_k + rank) over the candidate lists it appears in.
+create or replace function hybrid_search (
+  query_text text,
+  query_embedding vector(1536),
+  match_count int,
+  filter_user_id uuid default null,
+  full_text_weight float default 1,
+  semantic_weight float default 1,
+  rrf_k int default 60
+)
+returns table (
+  id uuid,
+  document_id uuid,
+  chunk_index int,
+  original_text text,
+  similarity float,
+  score float
+)
+language sql
+stable
+as $$
+  with full_text as (
+    select
+      chunks.id,
+      row_number() over (
+        order by ts_rank_cd(chunks.ts_vector, websearch_to_tsquery('english', query_text)) desc
+      ) as rank_ix
+    from chunks
+    where chunks.ts_vector @@ websearch_to_tsquery('english', query_text)
+      and (filter_user_id is null or chunks.user_id = filter_user_id)
+    order by rank_ix
+    limit least(match_count, 200) * 2
+  ),
+  semantic as (
+    select
+      chunks.id,
+      row_number() over (order by chunks.embedding <=> query_embedding) as rank_ix
+    from chunks
+    where filter_user_id is null or chunks.user_id = filter_user_id
+    order by rank_ix
+    limit least(match_count, 200) * 2
+  )
+  select
+    chunks.id,
+    chunks.document_id,
+    chunks.chunk_index,
+    chunks.original_text,
+    (1 - (chunks.embedding <=> query_embedding))::float as similarity,
+    (coalesce(1.0 / (rrf_k + full_text.rank_ix), 0.0) * full_text_weight +
+     coalesce(1.0 / (rrf_k + semantic.rank_ix), 0.0) * semantic_weight)::float as score
+  from full_text
+  full outer join semantic on full_text.id = semantic.id
+  join chunks on coalesce(full_text.id, semantic.id) = chunks.id
+  order by score desc
+  limit least(match_count, 200);
+$$;
+
+-- Keyword-only search over the same index, ranked by ts_rank_cd
+create or replace function keyword_search (
+  query_text text,
+  match_count int,
+  filter_user_id uuid default null
+)
+returns table (
+  id uuid,
+  document_id uuid,
+  chunk_index int,
+  original_text text,
+  score float
+)
+language sql
+stable
+as $$
+  select
+    chunks.id,
+    chunks.document_id,
+    chunks.chunk_index,
+    chunks.original_text,
+    ts_rank_cd(chunks.ts_vector, websearch_to_tsquery('english', query_text))::float as score
+  from chunks
+  where chunks.ts_vector @@ websearch_to_tsquery('english', query_text)
+    and (filter_user_id is null or chunks.user_id = filter_user_id)
+  order by score desc
+  limit least(match_count, 200);
+$$;
@@ -0,0 +1,53 @@
+-- User-scoped vector search backed by an HNSW index.
+-- Requires pgvector 0.8+ for iterative index scans, which keep scanning the
+-- HNSW graph until enough rows pass the user/document filter instead of
+-- filtering a fixed ef_search candidate list after the fact.
+
+-- Replace the ivfflat index (fixed lists = 100, default probes = 1) with HNSW
+DROP INDEX IF EXISTS chunks_vector_idx;
+CREATE INDEX IF NOT EXISTS chunks_embedding_hnsw_idx
+  ON chunks USING hnsw (embedding vector_cosine_ops)
+  WITH (m = 16, ef_construction = 64);
+
+-- Serves the user (and document) filter and per-user scans
+CREATE INDEX IF NOT EXISTS chunks_user_document_idx
+  ON chunks (user_id, document_id);
+
+create or replace function match_user_chunks (
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_document_ids uuid[] default null,
+  ef_search int default 40
+)
+returns table (
+  id uuid,
+  document_id uuid,
+  chunk_index int,
+  original_text text,
+  similarity float
+)
+language plpgsql
+stable
+as $$
+begin
+  -- Transaction-local settings: candidate list size and filtered iterative scans
+  perform set_config('hnsw.ef_search', greatest(ef_search, match_count)::text, true);
+  perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+
+  return query
+  select
+    chunks.id,
+    chunks.document_id,
+    chunks.chunk_index,
+    chunks.original_text,
+    (1 - (chunks.embedding <=> query_embedding))::float as similarity
+  from chunks
+  where chunks.user_id = filter_user_id
+    and (filter_document_ids is null or chunks.document_id = any(filter_document_ids))
+    and chunks.embedding <=> query_embedding < 1 - match_threshold
+  order by chunks.embedding <=> query_embedding
+  limit least(match_count, 200);
+end;
+$$;
@@ -0,0 +1,132 @@
+-- Compact vector indexes with full-precision rescoring.
+-- chunks.embedding stays the full-precision vector(1536) in the heap; a compact
+-- expression index replaces the full-precision HNSW index from 008 and is used
+-- only to shortlist candidates:
+--   halfvec: 16-bit floats, about half the vector index memory, near-identical ranking
+--   binary:  1 bit per dimension (sign), a small fraction of it, coarse ranking
+-- The shortlist (match_count * rescore_factor rows) is then re-ranked by exact cosine
+-- distance on the heap column, which needs no index.
+--
+-- Nothing changes until VECTOR_SEARCH_QUANTIZATION is set; then build its index with
+--   select configure_vector_search_quantization('binary');  -- or 'halfvec'
+-- which drops chunks_embedding_hnsw_idx and the other compact index, so a single vector
+-- index is maintained on insert. select configure_vector_search_quantization(null)
+-- restores the full-precision index. While quantized, searches that order by the full
+-- vector (match_documents, match_user_chunks, the vector leg of hybrid_search) scan
+-- instead of using an index, so keep VECTOR_SEARCH_QUANTIZATION set in the backend to
+-- route user-scoped vector search through match_user_chunks_quantized.
+
+DROP INDEX IF EXISTS chunks_embedding_halfvec_hnsw_idx;
+DROP INDEX IF EXISTS chunks_embedding_binary_hnsw_idx;
+
+create or replace function configure_vector_search_quantization (quantization text)
+returns void
+language plpgsql
+as $$
+begin
+  if quantization is not null and quantization not in ('halfvec', 'binary') then
+    raise exception 'Unknown quantization %, expected halfvec, binary or null', quantization;
+  end if;
+
+  if quantization is distinct from 'halfvec' then
+    drop index if exists chunks_embedding_halfvec_hnsw_idx;
+  end if;
+  if quantization is distinct from 'binary' then
+    drop index if exists chunks_embedding_binary_hnsw_idx;
+  end if;
+
+  if quantization is not null then
+    -- The shortlist comes from the compact index and rescoring reads the heap
+    drop index if exists chunks_embedding_hnsw_idx;
+  end if;
+
+  if quantization is null then
+    create index if not exists chunks_embedding_hnsw_idx
+      on chunks using hnsw (embedding vector_cosine_ops)
+      with (m = 16, ef_construction = 64);
+  elsif quantization = 'halfvec' then
+    create index if not exists chunks_embedding_halfvec_hnsw_idx
+      on chunks using hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)
+      with (m = 16, ef_construction = 64);
+  elsif quantization = 'binary' then
+    create index if not exists chunks_embedding_binary_hnsw_idx
+      on chunks using hnsw ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)
+      with (m = 16, ef_construction = 64);
+  end if;
+end;
+$$;
+
+-- Index changes are for the database owner, not API clients
+revoke execute on function configure_vector_search_quantization(text) from public, anon, authenticated;
+
+create or replace function match_user_chunks_quantized (
+  query_embedding vector(1536),
+  match_threshold float,
+  match_count int,
+  filter_user_id uuid,
+  filter_document_ids uuid[] default null,
+  quantization text default 'binary',
+  rescore_factor int default 4,
+  ef_search int default 40
+)
+returns table (
+  id uuid,
+  document_id uuid,
+  chunk_index int,
+  original_text text,
+  similarity float
+)
+language plpgsql
+stable
+as $$
+declare
+  shortlist_count int := least(match_count, 200) * greatest(rescore_factor, 1);
+begin
+  perform set_config('hnsw.ef_search', greatest(ef_search, shortlist_count)::text, true);
+  perform set_config('hnsw.iterative_scan', 'relaxed_order', true);
+
+  if quantization = 'halfvec' then
+    return query
+    with shortlist as (
+      select chunks.id
+      from chunks
+      where chunks.user_id = filter_user_id
+        and (filter_document_ids is null or chunks.document_id = any(filter_document_ids))
+      order by chunks.embedding::halfvec(1536) <=> query_embedding::halfvec(1536)
+      limit shortlist_count
+    )
+    select
+      chunks.id,
+      chunks.document_id,
+      chunks.chunk_index,
+      chunks.original_text,
+      (1 - (chunks.embedding <=> query_embedding))::float as similarity
+    from shortlist
+    join chunks on chunks.id = shortlist.id
+    where chunks.embedding <=> query_embedding < 1 - match_threshold
+    order by chunks.embedding <=> query_embedding
+    limit least(match_count, 200);
+  else
+    return query
+    with shortlist as (
+      select chunks.id
+      from chunks
+      where chunks.user_id = filter_user_id
+        and (filter_document_ids is null or chunks.document_id = any(filter_document_ids))
+      order by binary_quantize(chunks.embedding)::bit(1536) <~> binary_quantize(query_embedding)
+      limit shortlist_count
+    )
+    select
+      chunks.id,
+      chunks.document_id,
+      chunks.chunk_index,
+      chunks.original_text,
+      (1 - (chunks.embedding <=> query_embedding))::float as similarity
+    from shortlist
+    join chunks on chunks.id = shortlist.id
+    where chunks.embedding <=> query_embedding < 1 - match_threshold
+    order by chunks.embedding <=> query_embedding
+    limit least(match_count, 200);
+  end if;
+end;
+$$;
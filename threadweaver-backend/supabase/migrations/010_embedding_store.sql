@@ -0,0 +1,13 @@
+-- Content-addressed store of chunk embeddings, so re-uploaded text is not embedded again.
+-- Keyed by the SHA-256 of the chunk text and the embedding model that produced the vector.
+-- Embeddings depend only on the text, so entries are shared by every user; the table is
+-- only read and written by the backend.
+CREATE TABLE IF NOT EXISTS embedding_store (
+  content_hash text NOT NULL,
+  model text NOT NULL,
+  embedding vector(1536) NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (content_hash, model)
+);
+
+ALTER TABLE embedding_store ENABLE ROW LEVEL SECURITY;
@@ -0,0 +1,54 @@
+-- Incremental re-ingestion: a re-uploaded document is diffed against its stored chunks by
+-- content hash, so only changed chunks are inserted or deleted and moved chunks keep their row.
+
+-- SHA-256 of original_text; rows stored before this migration are hashed by the backend on read
+ALTER TABLE chunks ADD COLUMN IF NOT EXISTS content_hash text;
+
+-- chunk_index is deliberately left unindexed: renumbering a moved chunk then stays a HOT
+-- update that rewrites no entries in the vector and full-text indexes. The diff reads a
+-- document's chunks through chunks_user_document_idx and orders them in memory
+DROP INDEX IF EXISTS chunks_document_id_chunk_index_idx;
+
+-- Uploads may carry a caller-supplied external id to find them again on re-upload
+ALTER TABLE documents
+  DROP CONSTRAINT IF EXISTS check_integration_requirements,
+  ADD CONSTRAINT check_integration_requirements CHECK (
+    CASE
+      WHEN integration_type IN ('slack', 'notion', 'whatsapp')
+        THEN integration_id IS NOT NULL AND external_id IS NOT NULL
+      WHEN integration_type = 'upload'
+        THEN integration_id IS NULL
+      ELSE false
+    END
+  );
+
+CREATE INDEX IF NOT EXISTS documents_upload_key_idx
+  ON documents (user_id, external_id, original_filename)
+  WHERE integration_type = 'upload';
+
+-- Moving a chunk only changes chunk_index, so don't recompute its ts_vector
+DROP TRIGGER IF EXISTS tsvectorupdate ON chunks;
+CREATE TRIGGER tsvectorupdate
+  BEFORE INSERT OR UPDATE OF original_text ON chunks
+  FOR EACH ROW EXECUTE FUNCTION chunks_tsvector_trigger();
+
+-- Delete removed chunks and renumber moved ones in a single transaction
+create or replace function apply_chunk_diff (
+  filter_document_id uuid,
+  delete_ids uuid[],
+  move_ids uuid[],
+  move_indexes int[]
+)
+returns void
+language sql
+as $$
+  delete from chunks
+  where chunks.document_id = filter_document_id
+    and chunks.id = any(delete_ids);
+
+  update chunks
+  set chunk_index = moved.chunk_index
+  from unnest(move_ids, move_indexes) as moved(id, chunk_index)
+  where chunks.document_id = filter_document_id
+    and chunks.id = moved.id;
+$$;
@@ -0,0 +1,49 @@
+-- Per-user generation counter of the chunks table, bumped by every statement that inserts,
+-- updates or deletes a user's chunks. Backend processes compare it with the version their
+-- in-memory vector index (and its snapshot on disk) was built from, so a write by any
+-- process is noticed even when it leaves the user's row count unchanged.
+CREATE TABLE IF NOT EXISTS chunk_versions (
+  user_id uuid PRIMARY KEY,
+  version bigint NOT NULL DEFAULT 1
+);
+
+ALTER TABLE chunk_versions ENABLE ROW LEVEL SECURITY;
+
+-- security definer: chunk writes by any role must bump the counter despite RLS
+create or replace function bump_chunk_versions() returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  -- Statement-level, so a bulk insert or a re-ingestion diff bumps each user once
+  if tg_op = 'DELETE' then
+    insert into chunk_versions (user_id)
+    select distinct user_id from old_rows where user_id is not null
+    on conflict (user_id) do update set version = chunk_versions.version + 1;
+  else
+    insert into chunk_versions (user_id)
+    select distinct user_id from new_rows where user_id is not null
+    on conflict (user_id) do update set version = chunk_versions.version + 1;
+  end if;
+  return null;
+end;
+$$;
+
+DROP TRIGGER IF EXISTS chunks_version_insert ON chunks;
+CREATE TRIGGER chunks_version_insert
+  AFTER INSERT ON chunks
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_chunk_versions();
+
+DROP TRIGGER IF EXISTS chunks_version_update ON chunks;
+CREATE TRIGGER chunks_version_update
+  AFTER UPDATE ON chunks
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_chunk_versions();
+
+DROP TRIGGER IF EXISTS chunks_version_delete ON chunks;
+CREATE TRIGGER chunks_version_delete
+  AFTER DELETE ON chunks
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION bump_chunk_versions();
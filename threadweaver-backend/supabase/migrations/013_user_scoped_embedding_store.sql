@@ -0,0 +1,11 @@
+-- Scope the embedding store to the user who stored each entry. A store shared by every
+-- user let an upload's reuse count (returned by the document status endpoint) confirm
+-- that another user had uploaded a given chunk of text.
+-- Entries are only a cache of embeddings, so existing shared ones are dropped rather
+-- than attributed to a user.
+TRUNCATE embedding_store;
+
+ALTER TABLE embedding_store
+  ADD COLUMN IF NOT EXISTS user_id uuid NOT NULL,
+  DROP CONSTRAINT IF EXISTS embedding_store_pkey,
+  ADD PRIMARY KEY (user_id, content_hash, model);
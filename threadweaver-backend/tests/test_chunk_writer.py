@@ -0,0 +1,22 @@
+import struct
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.db.chunk_writer import decode_vector, encode_vector
+
+
+def test_vector_binary_encoding_round_trips():
+    """
+    Test that embeddings are encoded in pgvector's binary layout and decode to the same float32 values
+    """
+    # ARRANGE
+    embedding = [0.25, -1.5, 3.0]
+
+    # ACT
+    data = encode_vector(embedding)
+
+    # ASSERT
+    assert struct.unpack(">HH3f", data) == (3, 0, 0.25, -1.5, 3.0)
+    assert decode_vector(data) == embedding
@@ -0,0 +1,68 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.context_manager import ContextManager
+
+
+def test_truncate_tool_result_keeps_head_and_tail():
+    """
+    Test that oversized tool results are truncated to the limit
+    """
+    # ARRANGE
+    context_manager = ContextManager(token_budget=1000, tool_result_token_limit=50, summary_token_budget=100)
+    tool_result = {"type": "tool_result", "tool_use_id": "toolu_1", "content": "start " + "x" * 2000 + " end"}
+
+    # ACT
+    truncated = context_manager.truncate_tool_result(tool_result)
+
+    # ASSERT
+    assert truncated["tool_use_id"] == "toolu_1"
+    assert truncated["content"].startswith("start ")
+    assert truncated["content"].endswith(" end")
+    assert "tokens truncated" in truncated["content"]
+    assert context_manager.count_tokens(truncated["content"]) < 70
+
+
+def test_fit_returns_messages_within_budget_unchanged():
+    """
+    Test that conversations within the budget are not compacted
+    """
+    # ARRANGE
+    context_manager = ContextManager(token_budget=1000, tool_result_token_limit=50, summary_token_budget=100)
+    messages = [
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hello!"},
+        {"role": "user", "content": "What is on my roadmap?"},
+    ]
+
+    # ACT
+    compacted = context_manager.fit(messages, current_turn_index=2)
+
+    # ASSERT
+    assert compacted == messages
+
+
+def test_fit_summarizes_older_turns_and_keeps_current_turn():
+    """
+    Test that older turns are collapsed into a summary when over budget
+    """
+    # ARRANGE
+    context_manager = ContextManager(token_budget=300, tool_result_token_limit=50, summary_token_budget=100)
+    messages = []
+    for turn in range(10):
+        messages.append({"role": "user", "content": f"Question {turn}: " + "q" * 200})
+        messages.append({"role": "assistant", "content": f"Answer {turn}: " + "a" * 200})
+    messages.append({"role": "user", "content": "Latest question"})
+
+    # ACT
+    compacted = context_manager.fit(messages, current_turn_index=len(messages) - 1)
+
+    # ASSERT
+    assert sum(context_manager.message_tokens(message) for message in compacted) <= 300
+    assert compacted[-1]["content"] == "Latest question"
+    assert compacted[0]["role"] == "user"
+    assert "<conversation_summary>" in compacted[0]["content"]
+    assert all(first["role"] != second["role"] for first, second in zip(compacted, compacted[1:]))
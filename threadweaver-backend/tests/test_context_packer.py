@@ -0,0 +1,81 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.schemas.requests import SearchResult
+from app.services.context_packer import ContextPacker
+
+
+def _result(chunk_id: str, text: str, chunk_index: int, document_id: str = "doc-1", similarity: float = 0.5) -> SearchResult:
+    return SearchResult(chunk_text=text, chunk_index=chunk_index, similarity_score=similarity, document_id=document_id, chunk_id=chunk_id)
+
+
+def test_mmr_skips_near_duplicate_candidates():
+    """
+    Test that MMR prefers a diverse candidate over a near-duplicate of the top hit
+    """
+    # ARRANGE
+    packer = ContextPacker(mmr_lambda=0.3, max_chunks=2, token_budget=1000, max_overlap_chars=50)
+    results = [_result("a", "roadmap", 0), _result("a-copy", "roadmap again", 5), _result("b", "launch", 9)]
+    embeddings = {"a": [1.0, 0.0], "a-copy": [0.99, 0.01], "b": [0.6, 0.8]}
+
+    # ACT
+    selected = packer.select([1.0, 0.0], results, embeddings)
+
+    # ASSERT
+    assert [result.chunk_id for result in selected] == ["a", "b"]
+
+
+def test_candidates_without_embeddings_are_kept():
+    """
+    Test that a partial embedding fetch doesn't shrink the selection to the embedded candidates
+    """
+    # ARRANGE
+    packer = ContextPacker(mmr_lambda=0.7, max_chunks=3, token_budget=1000, max_overlap_chars=50)
+    results = [_result("a", "roadmap", 0), _result("b", "launch", 9), _result("c", "budget", 4)]
+
+    # ACT
+    one_embedded = packer.select([1.0, 0.0], results, {"b": [1.0, 0.0]})
+    two_embedded = packer.select([1.0, 0.0], results, {"b": [1.0, 0.0], "c": [0.0, 1.0]})
+
+    # ASSERT
+    assert [result.chunk_id for result in one_embedded] == ["a", "b", "c"]
+    assert [result.chunk_id for result in two_embedded] == ["b", "c", "a"]
+
+
+def test_adjacent_chunks_merge_without_duplicated_overlap():
+    """
+    Test that consecutive chunks of a document become one passage with the shared text kept once
+    """
+    # ARRANGE
+    packer = ContextPacker(mmr_lambda=0.7, max_chunks=5, token_budget=1000, max_overlap_chars=50)
+    first = _result("a", "The launch moved to March because of the audit.", 3, similarity=0.6)
+    second = _result("b", "because of the audit. Marketing starts in April.", 4, similarity=0.9)
+    other = _result("c", "Unrelated note.", 1, document_id="doc-2")
+
+    # ACT
+    passages = packer.merge_adjacent([second, other, first])
+
+    # ASSERT
+    assert len(passages) == 2
+    assert passages[0].chunk_text == "The launch moved to March because of the audit. Marketing starts in April."
+    assert passages[0].similarity_score == 0.9
+    assert passages[1].chunk_id == "c"
+
+
+def test_pack_keeps_passages_within_token_budget():
+    """
+    Test that passages beyond the budget are dropped and an oversized first passage is truncated
+    """
+    # ARRANGE
+    packer = ContextPacker(mmr_lambda=0.7, max_chunks=5, token_budget=10, max_overlap_chars=50)
+
+    # ACT
+    packed = packer.pack([_result("a", "x" * 24, 0), _result("b", "y" * 40, 1), _result("c", "z" * 8, 2)])
+    truncated = packer.pack([_result("a", "x" * 400, 0)])
+
+    # ASSERT
+    assert [passage.chunk_id for passage in packed] == ["a", "c"]
+    assert len(truncated) == 1 and "truncated" in truncated[0].chunk_text
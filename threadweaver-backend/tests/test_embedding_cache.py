@@ -0,0 +1,80 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.embedding_cache import QueryEmbeddingCache
+
+
+class FakeEmbedder:
+    """
+    Counts embedding calls
+    """
+    def __init__(self):
+        self.calls = 0
+
+    async def __call__(self, query: str) -> list[float]:
+        self.calls += 1
+        return [float(len(query)), 0.5]
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_cache_reuses_normalized_queries():
+    """
+    Test that whitespace variants of a query are embedded once
+    """
+    # ARRANGE
+    cache = QueryEmbeddingCache(max_entries=10)
+    embed = FakeEmbedder()
+
+    # ACT
+    first = await cache.get_or_embed("What is  the roadmap?", "text-embedding-3-small", embed)
+    second = await cache.get_or_embed(" What is the roadmap? ", "text-embedding-3-small", embed)
+
+    # ASSERT
+    assert first == second
+    assert embed.calls == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_cache_disk_tier_survives_restart(tmp_path):
+    """
+    Test that embeddings written to disk are served by a new cache instance
+    """
+    # ARRANGE
+    disk_path = str(tmp_path / "query_embeddings.sqlite")
+    embed = FakeEmbedder()
+    await QueryEmbeddingCache(max_entries=10, disk_path=disk_path).get_or_embed("roadmap", "text-embedding-3-small", embed)
+
+    # ACT
+    restarted = QueryEmbeddingCache(max_entries=10, disk_path=disk_path)
+    embedding = await restarted.get_or_embed("roadmap", "text-embedding-3-small", embed)
+
+    # ASSERT
+    assert embedding == [7.0, 0.5]
+    assert embed.calls == 1
+    assert restarted.disk_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_query_embedding_cache_embeds_batch_misses_in_one_call():
+    """
+    Test that a batch lookup embeds only the distinct misses, in a single request
+    """
+    # ARRANGE
+    cache = QueryEmbeddingCache(max_entries=10)
+    await cache.get_or_embed("roadmap", "text-embedding-3-small", FakeEmbedder())
+    batches = []
+
+    async def embed_many(queries: list[str]) -> list[list[float]]:
+        batches.append(queries)
+        return [[float(len(query)), 0.5] for query in queries]
+
+    # ACT
+    embeddings = await cache.get_or_embed_many(["roadmap", "launch date", "launch  date"], "text-embedding-3-small", embed_many)
+
+    # ASSERT
+    assert batches == [["launch date"]]
+    assert embeddings == [[7.0, 0.5], [11.0, 0.5], [11.0, 0.5]]
@@ -0,0 +1,69 @@
+import pytest
+import sys
+from pathlib import Path
+
+import httpx
+import openai
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.embedding_executor import EmbeddingExecutor
+
+
+def _rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "http://localhost/v1/embeddings")
+    return openai.RateLimitError("Rate limit reached", response=httpx.Response(429, headers={"retry-after": "0.01"}, request=request), body=None)
+
+
+class FakeEmbeddingAPI:
+    """
+    Embeds each text as [len(text)], rate limiting the first rate_limited_calls requests
+    """
+    def __init__(self, rate_limited_calls: int = 0):
+        self.rate_limited_calls = rate_limited_calls
+        self.requests: list[list[str]] = []
+
+    async def __call__(self, texts: list[str]) -> list[list[float]]:
+        self.requests.append(texts)
+        if len(self.requests) <= self.rate_limited_calls:
+            raise _rate_limit_error()
+        return [[float(len(text))] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_executor_batches_by_size_and_tokens_in_order():
+    """
+    Test that texts are split by batch size and token limit and results keep input order
+    """
+    # ARRANGE
+    api = FakeEmbeddingAPI()
+    executor = EmbeddingExecutor(api, max_batch_size=3, max_batch_tokens=35, max_concurrency=2, max_retries=0, backoff_seconds=0.01)
+    texts = ["a" * 40, "b" * 40, "c" * 40, "d" * 40, "e" * 100, "f" * 4]
+
+    # ACT
+    embeddings = await executor.embed(texts)
+
+    # ASSERT
+    assert embeddings == [[40.0], [40.0], [40.0], [40.0], [100.0], [4.0]]
+    assert sorted(len(batch) for batch in api.requests) == [1, 2, 3]
+    assert executor.stats()["chunks"] == 6
+
+
+@pytest.mark.asyncio
+async def test_executor_retries_only_rate_limited_batch_and_backs_off():
+    """
+    Test that a 429 retries just the failed batch and halves the concurrency limit
+    """
+    # ARRANGE
+    api = FakeEmbeddingAPI(rate_limited_calls=1)
+    executor = EmbeddingExecutor(api, max_batch_size=2, max_batch_tokens=1000, max_concurrency=4, max_retries=2, backoff_seconds=0.01)
+
+    # ACT
+    embeddings = await executor.embed(["one", "two", "three", "four"])
+
+    # ASSERT
+    assert embeddings == [[3.0], [3.0], [5.0], [4.0]]
+    # Two batches plus one retry of the rate-limited batch
+    assert len(api.requests) == 3
+    assert executor.stats()["rate_limited"] == 1
+    assert executor.stats()["concurrency_limit"] == 2
@@ -0,0 +1,105 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.services.embedding_store as embedding_store
+from app.services.embedding_executor import EmbeddingExecutor
+from app.services.embedding_store import ChunkEmbeddingStore
+
+
+class FakeResult:
+    def __init__(self, data: list[dict]):
+        self.data = data
+
+
+class FakeStoreTable:
+    """ Supports the select/eq/in_ lookup and upsert used by the store """
+    def __init__(self, rows: dict[tuple[str, str, str], str]):
+        self.rows = rows
+        self.filters = {}
+        self.upserted = None
+
+    def select(self, columns: str):
+        return self
+
+    def eq(self, column: str, value: str):
+        self.filters[column] = value
+        return self
+
+    def in_(self, column: str, values: list[str]):
+        self.filters[column] = values
+        return self
+
+    def upsert(self, rows: list[dict], on_conflict: str, ignore_duplicates: bool):
+        self.upserted = rows
+        return self
+
+    def execute(self):
+        if self.upserted is not None:
+            for row in self.upserted:
+                self.rows.setdefault((row["user_id"], row["content_hash"], row["model"]), row["embedding"])
+            return FakeResult(self.upserted)
+        user_id, model = self.filters["user_id"], self.filters["model"]
+        return FakeResult([
+            {"content_hash": content_hash, "embedding": self.rows[(user_id, content_hash, model)]}
+            for content_hash in self.filters["content_hash"] if (user_id, content_hash, model) in self.rows
+        ])
+
+
+class FakeSupabaseClient:
+    def __init__(self):
+        self.rows: dict[tuple[str, str, str], str] = {}
+
+    def table(self, name: str) -> FakeStoreTable:
+        return FakeStoreTable(self.rows)
+
+
+@pytest.mark.asyncio
+async def test_store_embeds_only_texts_it_has_not_seen(monkeypatch):
+    """
+    Test that a re-upload reuses stored vectors and only new (or repeated-once) texts are embedded
+    """
+    # ARRANGE
+    requests = []
+
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        requests.append(texts)
+        return [[float(len(text)), 1.0] for text in texts]
+
+    monkeypatch.setattr(embedding_store, "embedding_executor", EmbeddingExecutor(embed_batch, max_concurrency=1))
+    store = ChunkEmbeddingStore(FakeSupabaseClient(), lookup_batch_size=2)
+    await store.embed(["intro", "budget", "intro"], "user-1", model="test-model")
+
+    # ACT
+    embeddings, embedded = await store.embed(["intro", "budget", "roadmap"], "user-1", model="test-model")
+
+    # ASSERT
+    assert requests == [["intro", "budget"], ["roadmap"]]
+    assert embedded == 1
+    assert embeddings == [[5.0, 1.0], [6.0, 1.0], [7.0, 1.0]]
+    assert store.stats()["reused"] == 3 and store.stats()["embedded"] == 3
+
+
+@pytest.mark.asyncio
+async def test_store_is_keyed_by_model_and_user(monkeypatch):
+    """
+    Test that a vector stored for one embedding model or user is not reused for another
+    """
+    # ARRANGE
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        return [[1.0] for _ in texts]
+
+    monkeypatch.setattr(embedding_store, "embedding_executor", EmbeddingExecutor(embed_batch, max_concurrency=1))
+    store = ChunkEmbeddingStore(FakeSupabaseClient())
+    await store.embed(["intro"], "user-1", model="model-a")
+
+    # ACT
+    _, other_model_embedded = await store.embed(["intro"], "user-1", model="model-b")
+    # Another user uploading the same text learns nothing from the first user's entry
+    _, other_user_embedded = await store.embed(["intro"], "user-2", model="model-a")
+
+    # ASSERT
+    assert other_model_embedded == 1
+    assert other_user_embedded == 1
@@ -0,0 +1,125 @@
+import io
+import pytest
+import queue
+import sys
+import zipfile
+from concurrent.futures import Future
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.chunking import token_counter
+from app.services.extraction_pool import ChunkExtractionPool, _next_batch
+from app.services.extractors import get_extractor
+from app.services.ingestion import IngestionProgress
+from config import config
+
+
+def _extract(filename: str, content: bytes) -> str:
+    return "".join(get_extractor(filename).extract(io.BytesIO(content)))
+
+
+def test_text_extractor_keeps_multibyte_characters_across_blocks(monkeypatch):
+    """
+    Test that UTF-8 characters split across read blocks are decoded whole
+    """
+    # ARRANGE
+    monkeypatch.setattr(config, "ingestion_read_size_bytes", 3)
+
+    # ACT
+    text = _extract("notes.txt", "naïve café — ünïcode".encode("utf-8"))
+
+    # ASSERT
+    assert text == "naïve café — ünïcode"
+
+
+def test_markdown_and_html_extractors_keep_only_visible_text():
+    """
+    Test that Markdown markup and HTML tags, scripts and styles are removed
+    """
+    # ARRANGE
+    markdown = b"# Launch plan\n\nSee the **Q3** [roadmap](https://example.com) and `snake_case` ids.\n"
+    html = b"<html><head><style>p {}</style></head><body><h1>Launch plan</h1><p>Ship   in <b>Q3</b></p><script>x()</script></body></html>"
+
+    # ACT
+    markdown_text = _extract("plan.md", markdown)
+    html_text = _extract("plan.HTML", html)
+
+    # ASSERT
+    assert markdown_text == "Launch plan\n\nSee the Q3 roadmap and snake_case ids.\n"
+    assert html_text.split() == ["Launch", "plan", "Ship", "in", "Q3"]
+
+
+def test_docx_extractor_reads_paragraphs_in_order():
+    """
+    Test that .docx paragraphs, including table cells, are extracted in document order
+    """
+    # ARRANGE
+    w = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+    document = (
+        f'<w:document xmlns:w="{w}"><w:body>'
+        "<w:p><w:r><w:t>Quarterly</w:t></w:r><w:r><w:t xml:space=\"preserve\"> review</w:t></w:r></w:p>"
+        "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>Revenue</w:t></w:r></w:p></w:tc></w:tr></w:tbl>"
+        "</w:body></w:document>"
+    )
+    content = io.BytesIO()
+    with zipfile.ZipFile(content, "w") as archive:
+        archive.writestr("word/document.xml", document)
+
+    # ACT
+    text = _extract("review.docx", content.getvalue())
+
+    # ASSERT
+    assert text == "Quarterly review\n\nRevenue\n\n"
+
+
+def test_next_batch_drains_last_batch_put_as_worker_finishes():
+    """
+    Test that a batch put after the wait timed out, just before the worker finished, is still returned
+    """
+    # ARRANGE
+    future = Future()
+
+    class RacingQueue(queue.Queue):
+        def get(self, block=True, timeout=None):
+            if not future.done():
+                # The worker puts its final batch and returns while the consumer's wait times out
+                self.put((["last chunk"], 42))
+                future.set_result(None)
+                raise queue.Empty
+            return super().get(block, timeout)
+
+    batches = RacingQueue()
+
+    # ACT
+    first = _next_batch(batches, future)
+    second = _next_batch(batches, future)
+
+    # ASSERT
+    assert first == (["last chunk"], 42)
+    assert second is None
+
+
+@pytest.mark.asyncio
+async def test_pool_streams_chunks_from_worker_process(tmp_path):
+    """
+    Test that a file is extracted and chunked in a worker process and rejected files raise ValueError
+    """
+    # ARRANGE
+    path = tmp_path / "notes.md"
+    path.write_text("## Notes\n\n" + "Budget review for the launch. " * 400)
+    pool = ChunkExtractionPool(max_workers=1, queue_batches=1)
+    progress = IngestionProgress("doc-1", total_bytes=path.stat().st_size)
+
+    try:
+        # ACT
+        chunks = [chunk async for chunk in pool.chunks(str(path), "notes.md", progress)]
+        with pytest.raises(ValueError):
+            [chunk async for chunk in pool.chunks(str(path), "notes.exe")]
+    finally:
+        await pool.close()
+
+    # ASSERT
+    assert chunks[0].startswith("Notes")
+    assert all(token_counter("cl100k_base")(chunk) <= config.chunk_tokens for chunk in chunks)
+    assert progress.bytes_read == path.stat().st_size
@@ -0,0 +1,257 @@
+import pytest
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.services.ingestion as ingestion
+from app.services.chunking import StreamingChunker, TokenChunker
+from app.services.embedding_executor import EmbeddingExecutor
+from app.services.ingestion import DocumentIngestionPipeline, IngestionProgress
+from config import config
+
+
+class FakeResult:
+    def __init__(self, data: list[dict]):
+        self.data = data
+
+
+class FakeChunksTable:
+    """ In-memory chunks table supporting the reads and inserts of a re-ingestion """
+    def __init__(self, client: "FakeSupabaseClient"):
+        self.client = client
+        self.inserted = None
+
+    def select(self, columns: str):
+        return self
+
+    def eq(self, column: str, value: str):
+        return self
+
+    def order(self, column: str):
+        self.order_by = column
+        return self
+
+    def range(self, start: int, end: int):
+        self.page = (start, end)
+        return self
+
+    def insert(self, records: list[dict]):
+        self.inserted = records
+        return self
+
+    def execute(self):
+        if self.inserted is not None:
+            rows = [{**record, "id": f"chunk-{len(self.client.rows) + i}"} for i, record in enumerate(self.inserted)]
+            self.client.rows.extend(rows)
+            self.client.inserted.extend(record["original_text"] for record in self.inserted)
+            return FakeResult(rows)
+        rows = sorted(self.client.rows, key=lambda row: row[self.order_by])
+        return FakeResult(rows[self.page[0]:self.page[1] + 1])
+
+
+class FakeSupabaseClient:
+    def __init__(self):
+        self.rows: list[dict] = []
+        self.inserted: list[str] = []
+
+    def table(self, name: str) -> FakeChunksTable:
+        return FakeChunksTable(self)
+
+    def rpc(self, name: str, params: dict):
+        client = self
+
+        class Call:
+            def execute(self):
+                client.rows = [row for row in client.rows if row["id"] not in params["delete_ids"]]
+                for chunk_id, chunk_index in zip(params["move_ids"], params["move_indexes"]):
+                    next(row for row in client.rows if row["id"] == chunk_id)["chunk_index"] = chunk_index
+                return FakeResult([])
+
+        return Call()
+
+
+class FakeBulkWriter:
+    """ Records the statements of bulk write transactions in order with the embedding calls """
+    def __init__(self, events: list):
+        self.events = events
+
+    @asynccontextmanager
+    async def transaction(self):
+        writer = self
+
+        class Transaction:
+            async def insert_document(self, record: dict):
+                writer.events.append(("insert_document", record["id"]))
+
+            async def copy_chunks(self, records: list[dict]):
+                writer.events.append(("copy", [record["original_text"] for record in records]))
+
+        self.events.append(("begin",))
+        yield Transaction()
+        self.events.append(("commit",))
+
+
+def _pieces(text: str, size: int):
+    for start in range(0, len(text), size):
+        yield text[start:start + size]
+
+
+async def _pieces_list(chunks: list[str]):
+    for chunk in chunks:
+        yield chunk
+
+
+def test_streaming_chunker_matches_whole_document_split():
+    """
+    Test that chunking a stream gives the same chunks as splitting the whole text at once
+    """
+    # ARRANGE
+    text = Path(__file__).parent.parent.joinpath("test_data/sample_doc.txt").read_text() * 3
+    expected = RecursiveCharacterTextSplitter(chunk_size=700, chunk_overlap=100).split_text(text)
+
+    # ACT
+    chunks = list(StreamingChunker(chunk_size=700, chunk_overlap=100).chunk_iter(_pieces(text, 333)))
+
+    # ASSERT
+    assert chunks == expected
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+def test_token_chunker_cuts_at_paragraphs_within_budget():
+    """
+    Test that token chunks stay within the budget, prefer paragraph boundaries and overlap by whole sentences
+    """
+    # ARRANGE
+    paragraph = "The launch moves to March. Budget review is on Friday. Legal signs off next week.\n\n"
+    text = "".join(f"Section {index}. " + paragraph for index in range(30))
+    chunker = TokenChunker(chunk_tokens=40, overlap_tokens=8, count_tokens=_word_count)
+
+    # ACT
+    chunks = list(chunker.chunk_iter([text]))
+
+    # ASSERT
+    assert all(_word_count(chunk) <= 40 for chunk in chunks)
+    assert all(chunk.endswith("next week.") for chunk in chunks)
+    # Each chunk after the first starts with the last sentence of the previous one
+    assert all(chunk.startswith("Legal signs off next week.") for chunk in chunks[1:])
+    assert chunks[-1].endswith("Section 29. " + paragraph.strip())
+
+
+def test_token_chunker_gives_same_chunks_for_any_piece_size():
+    """
+    Test that streaming text in small pieces gives the same chunks as the whole text, including unbroken text
+    """
+    # ARRANGE
+    text = Path(__file__).parent.parent.joinpath("test_data/sample_doc.txt").read_text() * 3 + "x" * 5000
+    chunker = TokenChunker(chunk_tokens=50, overlap_tokens=10, count_tokens=_word_count)
+    expected = list(chunker.chunk_iter([text]))
+
+    # ACT
+    chunks = list(chunker.chunk_iter(_pieces(text, 37)))
+
+    # ASSERT
+    assert chunks == expected
+    assert all(_word_count(chunk) <= 50 for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_ingest_embeds_everything_before_opening_the_bulk_write_transaction(monkeypatch):
+    """
+    Test that a new document is embedded window by window first and then written in one short transaction
+    """
+    # ARRANGE
+    events = []
+
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        events.append(("embed", texts))
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(config, "embedding_store_enabled", False)
+    monkeypatch.setattr(ingestion, "embedding_executor", EmbeddingExecutor(embed_batch, max_concurrency=1))
+    monkeypatch.setattr(ingestion, "chunk_bulk_writer", FakeBulkWriter(events))
+    pipeline = DocumentIngestionPipeline(FakeSupabaseClient(), window_size=2)
+
+    # ACT
+    progress = await pipeline.ingest(
+        "doc-1", "user-1", _pieces_list(["intro", "budget", "roadmap"]), IngestionProgress("doc-1"), document={"title": "Plan"}
+    )
+
+    # ASSERT
+    assert events == [
+        ("embed", ["intro", "budget"]),
+        ("embed", ["roadmap"]),
+        ("begin",),
+        ("insert_document", "doc-1"),
+        ("copy", ["intro", "budget"]),
+        ("copy", ["roadmap"]),
+        ("commit",),
+    ]
+    assert progress.chunks_stored == 3
+
+
+@pytest.mark.asyncio
+async def test_reingest_only_writes_changed_chunks(monkeypatch):
+    """
+    Test that re-ingesting an edited document inserts new chunks, deletes removed ones and renumbers moved ones
+    """
+    # ARRANGE
+    embedded = []
+
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        embedded.extend(texts)
+        return [[1.0, 0.0] for _ in texts]
+
+    monkeypatch.setattr(config, "embedding_store_enabled", False)
+    monkeypatch.setattr(ingestion, "embedding_executor", EmbeddingExecutor(embed_batch, max_concurrency=1))
+    client = FakeSupabaseClient()
+    pipeline = DocumentIngestionPipeline(client, window_size=2)
+    await pipeline.ingest("doc-1", "user-1", _pieces_list(["intro", "budget", "roadmap", "risks"]), IngestionProgress("doc-1"))
+    embedded.clear()
+    client.inserted.clear()
+
+    # ACT
+    progress = await pipeline.reingest(
+        "doc-1", "user-1", _pieces_list(["intro", "hiring", "roadmap", "budget"]), IngestionProgress("doc-1")
+    )
+
+    # ASSERT
+    assert embedded == ["hiring"] and client.inserted == ["hiring"]
+    assert [row["original_text"] for row in sorted(client.rows, key=lambda row: row["chunk_index"])] == ["intro", "hiring", "roadmap", "budget"]
+    assert (progress.chunks_unchanged, progress.chunks_moved, progress.chunks_deleted) == (3, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_reingest_failing_partway_leaves_stored_version_intact(monkeypatch):
+    """
+    Test that a re-ingestion whose file fails to parse partway writes none of its new chunks
+    """
+    # ARRANGE
+    async def embed_batch(texts: list[str]) -> list[list[float]]:
+        return [[1.0, 0.0] for _ in texts]
+
+    async def broken_stream():
+        for chunk in ["hiring", "offsite", "intro"]:
+            yield chunk
+        raise ValueError("Could not extract text from plan.pdf")
+
+    monkeypatch.setattr(config, "embedding_store_enabled", False)
+    monkeypatch.setattr(ingestion, "embedding_executor", EmbeddingExecutor(embed_batch, max_concurrency=1))
+    client = FakeSupabaseClient()
+    pipeline = DocumentIngestionPipeline(client, window_size=2)
+    await pipeline.ingest("doc-1", "user-1", _pieces_list(["intro", "budget"]), IngestionProgress("doc-1"))
+    client.inserted.clear()
+
+    # ACT
+    with pytest.raises(ValueError):
+        await pipeline.reingest("doc-1", "user-1", broken_stream(), IngestionProgress("doc-1"))
+
+    # ASSERT
+    assert client.inserted == []
+    assert [(row["original_text"], row["chunk_index"]) for row in client.rows] == [("intro", 0), ("budget", 1)]
@@ -0,0 +1,147 @@
+import asyncio
+import io
+import os
+import pytest
+import sqlite3
+import sys
+from pathlib import Path
+
+from fastapi import UploadFile
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import app.services.ingestion_jobs as ingestion_jobs
+from app.services.ingestion_jobs import IngestionJobQueue, IngestionQueueFull
+
+
+class FakePipeline:
+    """
+    Stores chunks in memory; the first `failures` attempts raise
+    """
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.attempts = 0
+        self.chunks: dict[str, list[str]] = {}
+        self.deleted_documents = []
+
+    def delete_chunks(self, document_id: str, user_id: str):
+        self.chunks.pop(document_id, None)
+
+    def delete_document(self, document_id: str, user_id: str):
+        self.delete_chunks(document_id, user_id)
+        self.deleted_documents.append(document_id)
+
+    async def ingest(self, document_id, user_id, chunk_stream, progress, on_progress=None, document=None):
+        self.attempts += 1
+        async for chunk in chunk_stream:
+            self.chunks.setdefault(document_id, []).append(chunk)
+        if self.attempts <= self.failures:
+            raise ConnectionError("embedding API unavailable")
+        progress.chunks_stored = len(self.chunks[document_id])
+        return progress
+
+
+async def _wait_for_state(queue: IngestionJobQueue, document_id: str, state: str) -> dict:
+    for _ in range(200):
+        status = await queue.get_status(document_id)
+        if status and status["state"] == state:
+            return status
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job for {document_id} never reached {state}: {status}")
+
+
+def _upload(text: str) -> UploadFile:
+    content = text.encode("utf-8")
+    return UploadFile(io.BytesIO(content), size=len(content), filename="notes.txt")
+
+
+@pytest.mark.asyncio
+async def test_job_is_retried_after_transient_failure(tmp_path, monkeypatch):
+    """
+    Test that a failed attempt is retried with its partial chunks removed, then succeeds
+    """
+    # ARRANGE
+    pipeline = FakePipeline(failures=1)
+    monkeypatch.setattr(ingestion_jobs, "ingestion_pipeline", pipeline)
+    queue = IngestionJobQueue(str(tmp_path), workers=2, max_attempts=3, retry_backoff_seconds=0.01, max_queued_jobs=10)
+    await queue.start()
+
+    # ACT
+    await queue.enqueue("doc-1", "user-1", _upload("The launch moved to March."))
+    status = await _wait_for_state(queue, "doc-1", "succeeded")
+    await queue.close()
+
+    # ASSERT
+    assert status["attempts"] == 2
+    assert status["chunks_done"] == 1
+    assert pipeline.chunks["doc-1"] == ["The launch moved to March."]
+    assert queue.stats()["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_jobs_resume_after_restart(tmp_path, monkeypatch):
+    """
+    Test that a job queued before a shutdown is processed when the queue starts again
+    """
+    # ARRANGE
+    pipeline = FakePipeline()
+    monkeypatch.setattr(ingestion_jobs, "ingestion_pipeline", pipeline)
+    queue = IngestionJobQueue(str(tmp_path), workers=0, max_attempts=3, retry_backoff_seconds=0.01, max_queued_jobs=10)
+    await queue.start()
+    await queue.enqueue("doc-1", "user-1", _upload("Quarterly report"))
+    await queue.close()
+
+    # ACT
+    restarted = IngestionJobQueue(str(tmp_path), workers=1, max_attempts=3, retry_backoff_seconds=0.01, max_queued_jobs=10)
+    await restarted.start()
+    status = await _wait_for_state(restarted, "doc-1", "succeeded")
+    await restarted.close()
+
+    # ASSERT
+    assert status["attempts"] == 1
+    assert pipeline.chunks["doc-1"] == ["Quarterly report"]
+
+
+@pytest.mark.asyncio
+async def test_jobs_waiting_to_retry_count_toward_queue_bound(tmp_path, monkeypatch):
+    """
+    Test that a job in its retry backoff still takes a place in the queue
+    """
+    # ARRANGE
+    pipeline = FakePipeline(failures=1)
+    monkeypatch.setattr(ingestion_jobs, "ingestion_pipeline", pipeline)
+    queue = IngestionJobQueue(str(tmp_path), workers=1, max_attempts=3, retry_backoff_seconds=60, max_queued_jobs=1)
+    await queue.start()
+    await queue.enqueue("doc-1", "user-1", _upload("The launch moved to March."))
+    for _ in range(200):
+        if queue.stats()["retries"]:
+            break
+        await asyncio.sleep(0.01)
+
+    # ACT / ASSERT
+    with pytest.raises(IngestionQueueFull):
+        await queue.enqueue("doc-2", "user-1", _upload("Quarterly report"))
+    await queue.close()
+
+
+@pytest.mark.asyncio
+async def test_spooled_upload_is_removed_when_job_insert_fails(tmp_path, monkeypatch):
+    """
+    Test that an upload isn't left behind in the spool when its job row can't be written
+    """
+    # ARRANGE
+    queue = IngestionJobQueue(str(tmp_path), workers=0, max_attempts=3, retry_backoff_seconds=0.01, max_queued_jobs=10)
+    await queue.start()
+
+    def failing_execute(sql, parameters=()):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(queue, "_execute", failing_execute)
+
+    # ACT
+    with pytest.raises(sqlite3.OperationalError):
+        await queue.enqueue("doc-1", "user-1", _upload("Quarterly report"))
+    await queue.close()
+
+    # ASSERT
+    assert os.listdir(queue.spool_dir) == []
@@ -0,0 +1,72 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from langgraph.graph import END
+
+from app.agents.intent_classifier import _classify_with_rules
+from app.agents.intent_router_graph import RouteStats, route_after_classification
+
+
+@pytest.mark.parametrize("message", ["hi", "Thanks a lot!", "good morning :)", "What can you do?", "bye threadweaver"])
+def test_rules_route_small_talk_without_a_model_call(message):
+    """
+    Test that greetings, thanks and farewells are classified as conversational by the rules
+    """
+    # ACT
+    result = _classify_with_rules(message)
+
+    # ASSERT
+    assert result == ("conversational", 0.95)
+
+
+@pytest.mark.parametrize("message", ["hi, what did we decide about the launch?", "thanks, now create a Notion page", "summarize ENG-1234"])
+def test_rules_leave_requests_to_the_model(message):
+    """
+    Test that messages with a request beyond small talk are left to the model
+    """
+    # ACT
+    result = _classify_with_rules(message)
+
+    # ASSERT
+    assert result is None
+
+
+def test_route_after_classification_fans_out_by_intent():
+    """
+    Test that each intent runs only the nodes of its stages
+    """
+    # ACT
+    routes = {intent: route_after_classification({"intent": intent}) for intent in ("conversational", "retrieve", "action", "hybrid")}
+
+    # ASSERT
+    assert routes == {
+        "conversational": END,
+        "retrieve": ["rag_retrieval"],
+        "action": ["tool_selector"],
+        "hybrid": ["rag_retrieval", "tool_selector"],
+    }
+
+
+def test_route_stats_saving_is_net_of_the_classifier_call():
+    """
+    Test that the saving of a skipped stage is estimated from its average and reduced by the classifier latency
+    """
+    # ARRANGE
+    stats = RouteStats(smoothing=0.5)
+    stats.record("hybrid", {"retrieval": 300.0, "tools": 100.0, "intent": 150.0})
+    stats.record("hybrid", {"retrieval": 100.0, "tools": 300.0, "intent": 150.0})
+
+    # ACT
+    rule_routed = stats.record("conversational", {})
+    model_routed = stats.record("action", {"tools": 200.0, "intent": 250.0})
+
+    # ASSERT
+    # Averages after two hybrid requests: retrieval 200, tools 200; skipping both saves the longer (200)
+    assert rule_routed == 200.0
+    # Skipping retrieval saves 200 but the classifier call cost 250
+    assert model_routed == -50.0
+    assert stats.stats()["routes"] == {"conversational": 1, "retrieve": 0, "action": 1, "hybrid": 2}
+    assert stats.stats()["classifier_ms"] == 550.0
@@ -0,0 +1,116 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.schemas.requests import SearchMode
+from app.services.rag_service import RAGService
+
+
+class FakeRPCResult:
+    def __init__(self, data: list[dict]):
+        self.data = data
+
+
+class FakeSupabaseClient:
+    """ Records RPC calls and returns canned rows, failing for RPC names in fail """
+    def __init__(self, rows: dict[str, list[dict]], fail: tuple[str, ...] = ()):
+        self.rows = rows
+        self.fail = fail
+        self.calls = []
+
+    def rpc(self, name: str, params: dict):
+        self.calls.append((name, params))
+        client = self
+
+        class Call:
+            def execute(self):
+                if name in client.fail:
+                    raise RuntimeError(f"function {name} does not exist")
+                return FakeRPCResult(client.rows.get(name, []))
+
+        return Call()
+
+
+ROW = {"original_text": "Ticket ENG-1234 is blocked", "chunk_index": 0, "document_id": "doc-1"}
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_uses_single_rpc_with_user_filter():
+    """
+    Test that hybrid mode sends the query text and embedding in one RPC scoped to the user
+    """
+    # ARRANGE
+    rag_service = RAGService()
+    rag_service.supabase_client = FakeSupabaseClient({"hybrid_search": [{**ROW, "similarity": 0.42, "score": 0.03}]})
+
+    # ACT
+    response = await rag_service.search("ENG-1234", query_embedding=[0.1, 0.2], user_id="user-1", mode=SearchMode.HYBRID)
+
+    # ASSERT
+    assert [name for name, _ in rag_service.supabase_client.calls] == ["hybrid_search"]
+    assert rag_service.supabase_client.calls[0][1]["filter_user_id"] == "user-1"
+    assert response.results[0].similarity_score == 0.42
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_falls_back_to_vector_search():
+    """
+    Test that a failing hybrid RPC (e.g. migration not applied) falls back to match_documents
+    """
+    # ARRANGE
+    rag_service = RAGService()
+    rag_service.supabase_client = FakeSupabaseClient({"match_documents": [ROW]}, fail=("hybrid_search",))
+
+    # ACT
+    response = await rag_service.search("ENG-1234", query_embedding=[0.1, 0.2], mode=SearchMode.HYBRID)
+
+    # ASSERT
+    assert [name for name, _ in rag_service.supabase_client.calls] == ["hybrid_search", "match_documents"]
+    assert response.results[0].chunk_text == ROW["original_text"]
+
+
+@pytest.mark.asyncio
+async def test_vector_search_for_user_uses_user_scoped_function():
+    """
+    Test that a user's vector search goes through match_user_chunks with the user filter and ef_search
+    """
+    # ARRANGE
+    rag_service = RAGService()
+    rag_service.supabase_client = FakeSupabaseClient({"match_user_chunks": [{**ROW, "similarity": 0.8}]})
+
+    # ACT
+    response = await rag_service.search("blocked tickets", query_embedding=[0.1, 0.2], user_id="user-1", mode=SearchMode.VECTOR)
+
+    # ASSERT
+    name, params = rag_service.supabase_client.calls[0]
+    assert name == "match_user_chunks"
+    assert params["filter_user_id"] == "user-1"
+    assert "ef_search" in params
+    assert response.results[0].similarity_score == 0.8
+
+
+@pytest.mark.asyncio
+async def test_search_many_embeds_all_queries_in_one_request():
+    """
+    Test that a batch search embeds every query together and returns results per query
+    """
+    # ARRANGE
+    rag_service = RAGService()
+    rag_service.supabase_client = FakeSupabaseClient({"match_user_chunks": [{**ROW, "similarity": 0.8}]})
+    embedded = []
+
+    async def embed_user_queries(queries: list[str]) -> list[list[float]]:
+        embedded.append(queries)
+        return [[0.1, 0.2] for _ in queries]
+
+    rag_service._embed_user_queries = embed_user_queries
+
+    # ACT
+    responses = await rag_service.search_many(["ENG-1234 status", "launch date"], user_id="user-1", mode=SearchMode.VECTOR)
+
+    # ASSERT
+    assert embedded == [["ENG-1234 status", "launch date"]]
+    assert len(responses) == 2
+    assert len(rag_service.supabase_client.calls) == 2
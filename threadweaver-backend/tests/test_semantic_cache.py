@@ -0,0 +1,78 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.semantic_cache import SemanticResponseCache
+
+
+def test_semantic_cache_hit_for_similar_query():
+    """
+    Test that a near-identical query embedding returns the cached answer
+    """
+    # ARRANGE
+    cache = SemanticResponseCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("user-1", [1.0, 0.0, 0.0], "The launch is in March.")
+
+    # ACT
+    answer = cache.lookup("user-1", [0.99, 0.05, 0.0])
+
+    # ASSERT
+    assert answer == "The launch is in March."
+    assert cache.hits == 1
+
+
+def test_semantic_cache_miss_below_threshold_and_for_other_users():
+    """
+    Test that dissimilar queries and other users' queries miss
+    """
+    # ARRANGE
+    cache = SemanticResponseCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("user-1", [1.0, 0.0, 0.0], "The launch is in March.")
+
+    # ACT
+    dissimilar = cache.lookup("user-1", [0.0, 1.0, 0.0])
+    other_user = cache.lookup("user-2", [1.0, 0.0, 0.0])
+
+    # ASSERT
+    assert dissimilar is None
+    assert other_user is None
+
+
+def test_semantic_cache_invalidated_when_documents_change():
+    """
+    Test that bumping the document set version drops the user's answers
+    """
+    # ARRANGE
+    cache = SemanticResponseCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=10)
+    cache.store("user-1", [1.0, 0.0, 0.0], "The launch is in March.")
+
+    # ACT
+    cache.invalidate_user("user-1")
+
+    # ASSERT
+    assert cache.lookup("user-1", [1.0, 0.0, 0.0]) is None
+    assert cache.document_set_version("user-1") == 1
+
+
+def test_semantic_cache_evicts_by_size_and_ttl():
+    """
+    Test size-bounded LRU eviction and TTL expiry
+    """
+    # ARRANGE
+    now = [0.0]
+    cache = SemanticResponseCache(similarity_threshold=0.95, ttl_seconds=60, max_entries=2, clock=lambda: now[0])
+    cache.store("user-1", [1.0, 0.0, 0.0], "first")
+    cache.store("user-1", [0.0, 1.0, 0.0], "second")
+
+    # ACT
+    cache.store("user-1", [0.0, 0.0, 1.0], "third")
+    evicted = cache.lookup("user-1", [1.0, 0.0, 0.0])
+    now[0] = 61.0
+    expired = cache.lookup("user-1", [0.0, 0.0, 1.0])
+
+    # ASSERT
+    assert evicted is None
+    assert expired is None
+    assert cache.evictions == 1
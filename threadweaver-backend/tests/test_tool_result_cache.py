@@ -0,0 +1,106 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.tool_result_cache import ToolResultCache
+
+
+class FakeClock:
+    """
+    Manually advanced clock for TTL tests
+    """
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_tool_result_cache_hit_with_reordered_arguments():
+    """
+    Test that equivalent arguments share a cache entry
+    """
+    # ARRANGE
+    cache = ToolResultCache(max_entries=10, tool_ttls={"API-post-search": 60.0})
+    generation = cache.generation("workspace")
+    cache.put("workspace", "API-post-search", {"query": "roadmap", "page_size": 5}, "result", generation)
+
+    # ACT
+    result = cache.get("workspace", "API-post-search", {"page_size": 5, "query": "roadmap"})
+
+    # ASSERT
+    assert result == "result"
+    assert cache.hits == 1
+
+
+def test_tool_result_cache_expires_after_ttl():
+    """
+    Test that entries expire after their tool's TTL
+    """
+    # ARRANGE
+    clock = FakeClock()
+    cache = ToolResultCache(max_entries=10, tool_ttls={"API-post-search": 60.0}, clock=clock)
+    cache.put("workspace", "API-post-search", {"query": "roadmap"}, "result", cache.generation("workspace"))
+
+    # ACT
+    clock.now = 61.0
+    result = cache.get("workspace", "API-post-search", {"query": "roadmap"})
+
+    # ASSERT
+    assert result is None
+
+
+def test_tool_result_cache_evicts_least_recently_used():
+    """
+    Test that the cache stays within max_entries
+    """
+    # ARRANGE
+    cache = ToolResultCache(max_entries=2, tool_ttls={"API-retrieve-a-page": 60.0})
+    for page_id in ["a", "b"]:
+        cache.put("workspace", "API-retrieve-a-page", {"page_id": page_id}, page_id, 0)
+    cache.get("workspace", "API-retrieve-a-page", {"page_id": "a"})
+
+    # ACT
+    cache.put("workspace", "API-retrieve-a-page", {"page_id": "c"}, "c", 0)
+
+    # ASSERT
+    assert cache.get("workspace", "API-retrieve-a-page", {"page_id": "a"}) == "a"
+    assert cache.get("workspace", "API-retrieve-a-page", {"page_id": "b"}) is None
+    assert cache.evictions == 1
+
+
+def test_tool_result_cache_write_invalidates_workspace():
+    """
+    Test that a write drops the workspace's entries and rejects results fetched before it
+    """
+    # ARRANGE
+    cache = ToolResultCache(max_entries=10, tool_ttls={"API-post-search": 60.0})
+    stale_generation = cache.generation("workspace")
+    cache.put("workspace", "API-post-search", {"query": "roadmap"}, "result", stale_generation)
+    cache.put("other", "API-post-search", {"query": "roadmap"}, "other result", cache.generation("other"))
+
+    # ACT
+    cache.invalidate_workspace("workspace")
+    cache.put("workspace", "API-post-search", {"query": "notes"}, "stale", stale_generation)
+
+    # ASSERT
+    assert cache.get("workspace", "API-post-search", {"query": "roadmap"}) is None
+    assert cache.get("workspace", "API-post-search", {"query": "notes"}) is None
+    assert cache.get("other", "API-post-search", {"query": "roadmap"}) == "other result"
+
+
+def test_tool_result_cache_ignores_write_tools():
+    """
+    Test that tools outside the read-only allowlist are never cached
+    """
+    # ARRANGE
+    cache = ToolResultCache(max_entries=10, tool_ttls={"API-post-search": 60.0})
+
+    # ACT
+    cache.put("workspace", "API-patch-page", {"page_id": "a"}, "result", 0)
+
+    # ASSERT
+    assert not cache.is_cacheable("API-patch-page")
+    assert cache.get("workspace", "API-patch-page", {"page_id": "a"}) is None
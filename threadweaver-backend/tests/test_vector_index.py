@@ -0,0 +1,129 @@
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.services.vector_index import LocalVectorIndex, UserVectorIndex
+
+
+class FakeResponse:
+    def __init__(self, data: list[dict]):
+        self.data = data
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabaseClient", table: str):
+        self.client = client
+        self.table = table
+        self.page = (0, 0)
+
+    def select(self, columns: str):
+        return self
+
+    def eq(self, column: str, value: str):
+        return self
+
+    def order(self, column: str):
+        return self
+
+    def limit(self, count: int):
+        return self
+
+    def range(self, start: int, end: int):
+        self.page = (start, end)
+        return self
+
+    def execute(self) -> FakeResponse:
+        if self.table == "chunk_versions":
+            return FakeResponse([{"version": self.client.version}])
+        self.client.chunk_reads += 1
+        return FakeResponse(self.client.rows[self.page[0]:self.page[1] + 1])
+
+
+class FakeSupabaseClient:
+    """ One user's chunks and chunk_versions counter """
+    def __init__(self, rows: list[dict]):
+        self.rows = rows
+        self.version = 1
+        self.chunk_reads = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+
+def _chunk(chunk_id: str, embedding, chunk_index: int = 0) -> dict:
+    return {
+        "id": chunk_id,
+        "document_id": "doc-1",
+        "chunk_index": chunk_index,
+        "original_text": f"text of {chunk_id}",
+        "embedding": embedding,
+    }
+
+
+def test_vector_index_returns_most_similar_chunks_above_threshold():
+    """
+    Test that search ranks chunks by cosine similarity and applies the threshold and top_k
+    """
+    # ARRANGE
+    index = UserVectorIndex()
+    index.add([_chunk("a", [1.0, 0.0, 0.0]), _chunk("b", [0.8, 0.6, 0.0], 1)])
+    # Embeddings read back from PostgREST arrive as strings
+    index.add([_chunk("c", "[0.0, 0.0, 2.0]", 2)])
+
+    # ACT
+    results = index.search([1.0, 0.1, 0.0], match_threshold=0.2, top_k=5)
+    top_one = index.search([1.0, 0.1, 0.0], match_threshold=0.2, top_k=1)
+
+    # ASSERT
+    assert [result["id"] for result in results] == ["a", "b"]
+    assert results[0]["similarity"] > results[1]["similarity"]
+    assert [result["id"] for result in top_one] == ["a"]
+
+
+def test_vector_index_snapshot_round_trip(tmp_path):
+    """
+    Test that a saved snapshot loads back memory-mapped with the same results
+    """
+    # ARRANGE
+    index = UserVectorIndex()
+    index.add([_chunk("a", [1.0, 0.0]), _chunk("b", [0.0, 1.0], 1)])
+    prefix = str(tmp_path / "user-1")
+
+    # ACT
+    index.save(prefix)
+    loaded = UserVectorIndex.load(prefix)
+
+    # ASSERT
+    assert loaded is not None
+    assert len(loaded) == 2
+    assert loaded.search([0.0, 1.0], match_threshold=0.5, top_k=1)[0]["id"] == "b"
+    assert UserVectorIndex.load(str(tmp_path / "missing")) is None
+
+
+@pytest.mark.asyncio
+async def test_local_index_rebuilds_when_version_changes_with_same_row_count(tmp_path):
+    """
+    Test that a write by another process that keeps the row count is picked up, and stale snapshots are not loaded
+    """
+    # ARRANGE
+    client = FakeSupabaseClient([_chunk("a", [1.0, 0.0])])
+    local_index = LocalVectorIndex(client, snapshot_dir=str(tmp_path), refresh_seconds=0)
+    await local_index.ensure_loaded("user-1")
+    # Another process replaces chunk a with chunk b: same count, new version
+    client.rows = [_chunk("b", [0.0, 1.0])]
+    client.version = 2
+
+    # ACT
+    results = await local_index.search("user-1", [0.0, 1.0], match_threshold=0.5, top_k=1)
+    restarted = LocalVectorIndex(client, snapshot_dir=str(tmp_path), refresh_seconds=0)
+    client.version = 3
+    reads_before = client.chunk_reads
+    restarted_results = await restarted.search("user-1", [0.0, 1.0], match_threshold=0.5, top_k=1)
+
+    # ASSERT
+    assert [result["id"] for result in results] == ["b"]
+    assert [result["id"] for result in restarted_results] == ["b"]
+    # The snapshot saved at version 2 was not trusted at version 3
+    assert client.chunk_reads > reads_before
@@ -38,6 +38,9 @@ const ChatPage = () => {
 
     // State to manage access token
     const [accessToken, setAccessToken] = useState<string | null>(null);
+
+    // State to manage the ingestion status of the latest upload
+    const [uploadStatus, setUploadStatus] = useState<string | null>(null);
   
   
     // Get the session id from the backend
@@ -142,6 +145,34 @@ const ChatPage = () => {
       }
     }
     
+    // Poll an uploaded document's ingestion status until its job finishes
+    const pollUploadStatus = async (statusUrl: string) => {
+      while (true) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        try {
+          const response = await axios.get(`http://127.0.0.1:8000${statusUrl}`, {
+            headers: {
+              'Authorization': `Bearer ${accessToken}`,
+            },
+          });
+          const { state, chunks_done, error } = response.data;
+          if (state === 'succeeded') {
+            setUploadStatus(`Document ready: ${chunks_done} chunks created`);
+            return;
+          }
+          if (state === 'failed') {
+            setUploadStatus(`Document processing failed: ${error}`);
+            return;
+          }
+          setUploadStatus(state === 'queued' ? 'Document queued...' : `Processing document... ${chunks_done} chunks so far`);
+        } catch (error) {
+          console.error('Error getting document status:', error);
+          setUploadStatus('Could not get the document status');
+          return;
+        }
+      }
+    }
+
     const handleUploadDocument = async () => {
       if (!documentUpload) {
         console.error('No file selected');
@@ -159,7 +190,9 @@ const ChatPage = () => {
           },
         });
         console.log("Upload document response:", response.data);
-        alert(`Document uploaded successfully! ${response.data.chunks_created} chunks created`);
+        // The document is chunked and embedded in a background job (202 Accepted)
+        setUploadStatus('Document queued...');
+        pollUploadStatus(response.data.status_url);
 
         // Refresh file input
         setDocumentUpload(null);
@@ -208,8 +241,10 @@ const ChatPage = () => {
   
         <div className="search-bar-container flex justify-center">
           <QueryBar>
-            <input type="file" accept=".txt" onChange={handleFileSelect} />
+            {/* Keep in sync with supported_extensions() in the backend's app/services/extractors.py */}
+            <input type="file" accept=".docx,.htm,.html,.markdown,.md,.pdf,.txt" onChange={handleFileSelect} />
             <Button textContent='Upload Document' handleClick={handleUploadDocument} disabled={isDisabled} />
+            {uploadStatus && <div className="upload-status">{uploadStatus}</div>}
             <textarea className="query-input" placeholder="Enter your query" value={inputValue} onChange={handleInputChange} />       
             <Button textContent='Send' handleClick={handleSend} disabled={isDisabled} />
           </QueryBar>